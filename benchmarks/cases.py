@@ -0,0 +1,233 @@
+"""
+Benchmarks of the bot's hot paths
+"""
+import itertools
+from argparse import Namespace
+
+from benchmarks.runner import benchmark
+from gamebot.bots.flood import SendScheduler, TokenBucket
+from gamebot.bots.irc_simple import irc_connection
+from gamebot.coup.actions import ForeignAid
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import CoupGame, Instance
+from gamebot.coup.player import Player
+
+
+class FakeSocket(object):
+    """ Non-blocking socket that accepts everything it is sent and never has anything to read """
+    def __init__(self):
+        self.sent = 0
+
+    def setblocking(self, flag):
+        pass
+
+    def send(self, data):
+        self.sent += len(data)
+        return len(data)
+
+    def recv(self, size):
+        raise BlockingIOError()
+
+    def fileno(self):
+        return -1
+
+
+def started_game(players=4, seed=1):
+    instance = Instance(seed=seed)
+    cliparser = CoupCLIParser(instance)
+    names = ["player{0}".format(x) for x in range(players)]
+    cliparser.parse_input({'nick': names[0], 'command': 'create bench'})
+    for name in names[1:]:
+        cliparser.parse_input({'nick': name, 'command': 'join bench'})
+    cliparser.parse_input({'nick': names[0], 'command': 'start'})
+    instance.msgqueue.clear()
+    return instance, cliparser, instance.find_game_by_name('bench')
+
+
+def parse_commands(commands):
+    """ Cycles through (nick, command) pairs, a callable per operation """
+    def make(number):
+        instance, cliparser, game = started_game()
+        messages = itertools.cycle([{'nick': nick(game), 'command': command} for nick, command in commands])
+
+        def operation():
+            cliparser.parse_input(next(messages))
+            instance.msgqueue.clear()
+        return operation
+    return make
+
+
+def current(game):
+    return game.current_player_name()
+
+
+def not_playing(game):
+    return 'lurker'
+
+
+benchmark('parse_input.help', 500)(parse_commands([(not_playing, 'help')]))
+benchmark('parse_input.list', 20000)(parse_commands([(not_playing, 'list')]))
+benchmark('parse_input.malformed', 5000)(parse_commands([(not_playing, 'do')]))
+benchmark('parse_input.unknown', 5000)(parse_commands([(not_playing, 'frobnicate now')]))
+benchmark('parse_input.status', 20000)(parse_commands([(current, 'status')]))
+benchmark('parse_input.not_in_game', 20000)(parse_commands([(not_playing, 'do income')]))
+benchmark('parse_input.rejected_action', 20000)(parse_commands([(current, 'do embezzle')]))
+
+
+@benchmark('parse_input.create', 5000)
+def parse_create(number):
+    instance = Instance(seed=1)
+    cliparser = CoupCLIParser(instance)
+    messages = iter([{'nick': 'user{0}'.format(x), 'command': 'create game{0}'.format(x)} for x in range(number)])
+
+    def operation():
+        cliparser.parse_input(next(messages))
+        instance.msgqueue.clear()
+    return operation
+
+
+@benchmark('parse_input.join', 5000)
+def parse_join(number):
+    instance = Instance(seed=1)
+    cliparser = CoupCLIParser(instance)
+    games = -(-number // (CoupGame.PLAYER_LIMIT - 1))
+    for game in range(games):
+        cliparser.parse_input({'nick': 'owner{0}'.format(game), 'command': 'create game{0}'.format(game)})
+    messages = iter([{'nick': 'user{0}'.format(x), 'command': 'join game{0}'.format(x % games)}
+                     for x in range(number)])
+
+    def operation():
+        cliparser.parse_input(next(messages))
+        instance.msgqueue.clear()
+    return operation
+
+
+@benchmark('parse_input.do_income', 20000)
+def parse_income(number):
+    instance, cliparser, game = started_game()
+
+    def operation():
+        cliparser.parse_input({'nick': game.current_player_name(), 'command': 'do income'})
+        instance.msgqueue.clear()
+    return operation
+
+
+# Lookups do not change the instance, so every round shares one
+_lookup_instances = dict()
+
+
+def find_user_game(games):
+    def make(number):
+        if games in _lookup_instances:
+            return lookup(_lookup_instances[games], games)
+
+        instance = Instance(seed=1)
+        parameters = Namespace(name=None, password=None, inquisitor=True, ambassador=False, teams=False,
+                               guessing=False)
+        for x in range(games):
+            parameters.name = "game{0}".format(x)
+            game = CoupGame(instance, "owner{0}".format(x), parameters)
+            instance.add_game(parameters.name, game)
+            game.add_player(Player("owner{0}".format(x)), None)
+        _lookup_instances[games] = instance
+        return lookup(instance, games)
+    return make
+
+
+def lookup(instance, games):
+    users = itertools.cycle(["owner{0}".format(x) for x in range(games)])
+    find = instance.find_user_game
+
+    def operation():
+        find(next(users))
+    return operation
+
+
+for games in (10, 1000, 10000):
+    benchmark('find_user_game.{0}'.format(games), 100000)(find_user_game(games))
+
+
+def unstarted_games(number, players=4):
+    instance = Instance(seed=1)
+    parameters = Namespace(name=None, password=None, inquisitor=True, ambassador=False, teams=False, guessing=False)
+    games = []
+    for x in range(number):
+        parameters.name = "game{0}".format(x)
+        game = CoupGame(instance, "p{0}_0".format(x), parameters)
+        for seat in range(players):
+            game.add_player(Player("p{0}_{1}".format(x, seat)), None)
+        games.append(game)
+    return instance, games
+
+
+@benchmark('game.start', 2000)
+def game_start(number):
+    instance, games = unstarted_games(number)
+    games = iter(games)
+
+    def operation():
+        next(games).start()
+        instance.msgqueue.clear()
+    return operation
+
+
+@benchmark('game.populate_deck_and_actions', 5000)
+def populate_deck(number):
+    _, games = unstarted_games(number)
+    games = iter(games)
+
+    def operation():
+        next(games).populate_deck_and_actions()
+    return operation
+
+
+@benchmark('event_queue.add_trigger', 20000)
+def event_queue_cycle(number):
+    instance, _, game = started_game()
+    queue = game.event_queue
+
+    def operation():
+        queue.add(ForeignAid, game.players[game.current_player_name()])
+        queue.trigger()
+        instance.msgqueue.clear()
+    return operation
+
+
+@benchmark('irc.drain_game_queue', 200)
+def drain_game_queue(number, messages=100):
+    instance = Instance(seed=1)
+    cliparser = CoupCLIParser(instance)
+    connection = irc_connection(cliparser, ["#coup"], "coupbot", sock=FakeSocket())
+    # Flood control is measured by the flood tests; here it only must not hold lines back
+    connection.msgqueue = SendScheduler(bucket=TokenBucket(rate=1e12, burst=1e12))
+    events = [("private message", ("player{0}".format(x % 10), "Message number {0}".format(x)))
+              for x in range(messages)]
+
+    def operation():
+        instance.msgqueue.extend(events)
+        connection.process_game_queue()
+        connection.send_pending()
+    return operation
+
+
+@benchmark('beliefs.claimed', 100000)
+def beliefs_claimed(number):
+    _, _, game = started_game()
+    player = game.players[game.current_player_name()]
+    roles = frozenset(game.rules.cards[:1])
+    claimed = game.beliefs.claimed
+
+    def operation():
+        claimed(player, roles)
+    return operation
+
+
+@benchmark('beliefs.probabilities', 20000)
+def beliefs_probabilities(number):
+    _, _, game = started_game()
+    observer = game.players[game.current_player_name()]
+    probabilities = game.beliefs.probabilities
+
+    def operation():
+        probabilities(game, observer)
+    return operation
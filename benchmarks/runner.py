@@ -0,0 +1,108 @@
+"""
+Microbenchmark runner.
+
+A benchmark is a function that takes a number of operations, does whatever setup those operations need and returns a
+callable that performs one operation per call. The runner times the calls in several rounds and keeps the best round,
+then runs one more round under tracemalloc to measure the memory the operations allocate.
+
+Results are compared with a baseline by operations per second and by peak allocated memory. Either one moving the
+wrong way by more than the tolerance is a regression.
+"""
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+benchmarks = OrderedDict()
+
+Result = namedtuple('Result', 'name ops_per_sec peak_bytes_per_op retained_bytes_per_op')
+Comparison = namedtuple('Comparison', 'name speed memory regressed')
+
+
+def benchmark(name, number=1000):
+    """ Registers a benchmark that runs number operations per round """
+    def register(function):
+        benchmarks[name] = (function, number)
+        return function
+    return register
+
+
+def run_benchmark(name, rounds=5, scale=1.0):
+    function, number = benchmarks[name]
+    number = max(1, int(number * scale))
+
+    best = None
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            operation = function(number)
+            started = time.perf_counter()
+            for _ in range(number):
+                operation()
+            elapsed = time.perf_counter() - started
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        if collecting:
+            gc.enable()
+
+    operation = function(number)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        for _ in range(number):
+            operation()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Result(name, number / max(best, 1e-9), (peak - base) / float(number), (current - base) / float(number))
+
+
+def run_all(names=None, rounds=5, scale=1.0):
+    results = []
+    for name in benchmarks:
+        if names and not any(name.startswith(x) for x in names):
+            continue
+        results.append(run_benchmark(name, rounds, scale))
+    return results
+
+
+def save_baseline(path, results):
+    document = OrderedDict()
+    document['python'] = platform.python_version()
+    document['machine'] = platform.machine()
+    document['benchmarks'] = OrderedDict((result.name, result._asdict()) for result in results)
+    with open(path, 'w') as baseline:
+        json.dump(document, baseline, indent=2)
+        baseline.write("\n")
+
+
+def load_baseline(path):
+    with open(path, 'r') as baseline:
+        document = json.load(baseline)
+    return dict((name, Result(**values)) for name, values in document['benchmarks'].items())
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Speed is the ratio of ops/sec to the baseline's, memory the ratio of peak bytes per operation. Allocations of a few
+    bytes per operation are noise and are not compared
+    """
+    comparisons = []
+    for result in results:
+        reference = baseline.get(result.name)
+        if reference is None:
+            comparisons.append(Comparison(result.name, None, None, False))
+            continue
+        speed = result.ops_per_sec / reference.ops_per_sec
+        memory = None
+        if reference.peak_bytes_per_op >= 64 or result.peak_bytes_per_op >= 64:
+            memory = (result.peak_bytes_per_op + 1) / (reference.peak_bytes_per_op + 1)
+        regressed = speed < 1 - tolerance or (memory is not None and memory > 1 + tolerance)
+        comparisons.append(Comparison(result.name, speed, memory, regressed))
+    return comparisons
@@ -0,0 +1,171 @@
+"""
+Outbound flood control for IRC connections.
+
+Servers typically allow a 5 line burst and 2 lines per second afterward. It is implemented by giving you 2 credits a
+second, limited to 5. So if you pause a second, you can do a 4 line burst. If the backlog exceeds 20 lines, you get
+killed for excess flood.
+
+TokenBucket mirrors that credit model on our side so that we spend the burst whenever credits are available and never
+put a line on the wire that the server would have to queue. SendScheduler orders the outbound lines on top of the
+bucket. Lines are grouped into lanes, usually one per recipient, and a per-message delay only holds back later lines
+in the same lane rather than all outbound traffic. A delay of UNTIL_RELEASED holds the lane until release() is called,
+e.g. until the server answered the line.
+"""
+import time
+from collections import deque
+
+_NOT_READY = object()
+
+UNTIL_RELEASED = float('inf')
+
+
+class TokenBucket(object):
+    def __init__(self, rate=2.0, burst=5, clock=time.time):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.credits = self.burst
+        self.updated = clock()
+
+    def refill(self, now=None):
+        if now is None:
+            now = self.clock()
+        if now > self.updated:
+            self.credits = min(self.burst, self.credits + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def consume(self, now=None):
+        self.refill(now)
+        if self.credits < 1:
+            return False
+        self.credits -= 1
+        return True
+
+    def next_available(self, now=None):
+        if now is None:
+            now = self.clock()
+        self.refill(now)
+        if self.credits >= 1:
+            return now
+        return now + (1 - self.credits) / self.rate
+
+
+class SendScheduler(object):
+    """
+    Credit based outbound queue.
+
+    Lines are sent oldest first across all lanes that are not being held. Priority lines (e.g. PONG) jump ahead of
+    everything and ignore lane holds, but still spend a credit.
+    """
+    def __init__(self, bucket=None, clock=time.time):
+        if bucket is None:
+            bucket = TokenBucket(clock=clock)
+        self.bucket = bucket
+        self.clock = clock
+        self.priority = deque()
+        self.lanes = dict()
+        self.held = dict()
+        self.sequence = 0
+        self.length = 0
+        # Lane of the line pop() returned last
+        self.last_lane = None
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length > 0
+
+    __nonzero__ = __bool__
+
+    def push(self, msg, delay=None, lane=None, priority=False):
+        self.length += 1
+        if priority:
+            self.priority.append((msg, delay, lane))
+            return
+        self.sequence += 1
+        if lane not in self.lanes:
+            self.lanes[lane] = deque()
+        self.lanes[lane].append((self.sequence, msg, delay))
+
+    def release(self, lane):
+        """ Ends a hold on lane, whether it was held for a delay or UNTIL_RELEASED """
+        self.held.pop(lane, None)
+
+    def has_lane(self, lane):
+        return lane in self.lanes
+
+    def drain(self):
+        """ Removes every queued line that is not a priority line and returns (line, lane) pairs in sending order """
+        entries = sorted((sequence, msg, lane) for lane, queued in self.lanes.items() for sequence, msg, _ in queued)
+        self.priority.clear()
+        self.lanes.clear()
+        self.held.clear()
+        self.length = 0
+        return [(msg, lane) for _, msg, lane in entries]
+
+    def pending(self):
+        """ Returns every queued line in the order it would be sent if no lane were held """
+        queued = [msg for msg, _, _ in self.priority]
+        entries = sorted(entry for lane in self.lanes.values() for entry in lane)
+        return queued + [msg for _, msg, _ in entries]
+
+    def _ready_lane(self, now):
+        best_lane = _NOT_READY
+        best_sequence = None
+        for lane, entries in self.lanes.items():
+            if self.held.get(lane, 0) > now:
+                continue
+            if best_sequence is None or entries[0][0] < best_sequence:
+                best_lane = lane
+                best_sequence = entries[0][0]
+        return best_lane
+
+    def next_send_time(self, now=None):
+        """ Earliest time at which pop() can return a line, or None if nothing is queued that could be sent """
+        if not self.length:
+            return None
+        if now is None:
+            now = self.clock()
+        if self.priority:
+            ready = now
+        else:
+            ready = min(max(now, self.held.get(lane, 0)) for lane in self.lanes)
+            if ready == UNTIL_RELEASED:
+                # Every queued line waits for something to come in
+                return None
+        return max(ready, self.bucket.next_available(now))
+
+    def pop(self, now=None):
+        """ Returns the next line that may be sent right now, or None """
+        if not self.length:
+            return None
+        if now is None:
+            now = self.clock()
+
+        if self.priority:
+            lane = None
+            entries = self.priority
+        else:
+            lane = self._ready_lane(now)
+            if lane is _NOT_READY:
+                return None
+            entries = self.lanes[lane]
+
+        if not self.bucket.consume(now):
+            return None
+
+        if entries is self.priority:
+            msg, delay, lane = entries.popleft()
+        else:
+            _, msg, delay = entries.popleft()
+            if not entries:
+                del self.lanes[lane]
+
+        self.length -= 1
+        self.last_lane = lane
+        if delay:
+            self.held[lane] = max(self.held.get(lane, 0), now + delay)
+        elif lane in self.held and self.held[lane] <= now:
+            del self.held[lane]
+        return msg
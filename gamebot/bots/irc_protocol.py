@@ -0,0 +1,118 @@
+"""
+Wire level helpers for the IRC bots.
+"""
+import re
+from collections import namedtuple
+
+
+class LineFramer(object):
+    """
+    Incremental framer for inbound IRC traffic.
+
+    Bytes are buffered across reads and only complete lines are returned, so a line split over two reads is joined
+    back together and a read holding several lines yields all of them. Lines are terminated by CRLF, a bare LF is
+    accepted as well. Each line is decoded exactly once.
+    """
+    # RFC 1459 limits a line to 512 bytes; anything that runs this long without a terminator is garbage
+    max_buffer = 65536
+
+    def __init__(self, encoding="utf-8"):
+        self.encoding = encoding
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """ Adds received bytes and returns the list of complete lines, without their terminators """
+        buffer = self.buffer
+        buffer += data
+
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            if len(buffer) > self.max_buffer:
+                del buffer[:]
+            return []
+
+        complete = bytes(buffer[:end])
+        del buffer[:end + 1]
+
+        encoding = self.encoding
+        lines = []
+        for raw in complete.split(b"\n"):
+            if raw.endswith(b"\r"):
+                raw = raw[:-1]
+            if raw:
+                lines.append(raw.decode(encoding, "replace"))
+        return lines
+
+
+# <prefix> <command> <params> :<trailing>, every part but the command being optional
+_line_re = re.compile(r":(?P<prefix>[^ ]+) +(?P<command>[^ ]+)(?P<params>(?: +[^ :][^ ]*)*)(?: +:(?P<trailing>.*))? *$"
+                      r"|(?P<command2>[^ :][^ ]*)(?P<params2>(?: +[^ :][^ ]*)*)(?: +:(?P<trailing2>.*))? *$")
+
+
+class IRCMessage(namedtuple('IRCMessage', 'prefix command params trailing')):
+    """ One tokenized IRC line. params is a tuple of the middle parameters, trailing is None if absent """
+    __slots__ = ()
+
+    @property
+    def nick(self):
+        if self.prefix is None:
+            return None
+        return self.prefix.split("!", 1)[0]
+
+
+def tokenize(line):
+    """ Splits an IRC line into prefix/command/params/trailing. Returns None if the line is not valid IRC """
+    match = _line_re.match(line)
+    if match is None:
+        return None
+    prefix, command, params, trailing, command2, params2, trailing2 = match.groups()
+    if command is None:
+        command, params, trailing = command2, params2, trailing2
+    return IRCMessage(prefix, command.upper(), tuple(params.split()), trailing)
+
+
+class BotCommand(object):
+    """
+    A '.' prefixed command addressed to the bot, as handed to the parser's parse_input. Supports item access so that
+    it can be used wherever the parsers expect the old message dictionary
+    """
+    __slots__ = ('nick', 'user', 'host', 'sentto', 'command', 'raw', 'is_priv')
+
+    def __init__(self, nick, user, host, sentto, command, raw, is_priv):
+        self.nick = nick
+        self.user = user
+        self.host = host
+        self.sentto = sentto
+        self.command = command
+        self.raw = raw
+        self.is_priv = is_priv
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __repr__(self):
+        return "BotCommand({!r}, {!r})".format(self.nick, self.command)
+
+
+def parse_bot_command(line, botnick):
+    """
+    Returns a BotCommand if the line is a PRIVMSG whose text starts with '.', otherwise None.
+
+    Lines that cannot be a command leave through a substring check before any tokenizing, so ordinary channel
+    chatter and server numerics cost next to nothing
+    """
+    if " :." not in line:
+        return None
+    message = tokenize(line)
+    if message is None or message.command != "PRIVMSG" or not message.params or message.prefix is None:
+        return None
+    trailing = message.trailing
+    if trailing is None or not trailing.startswith("."):
+        return None
+    nick, _, userhost = message.prefix.partition("!")
+    user, _, host = userhost.partition("@")
+    sentto = message.params[0]
+    return BotCommand(nick, user, host, sentto, trailing[1:], line, sentto == botnick)
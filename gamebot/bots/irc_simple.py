@@ -1,20 +1,38 @@
 from __future__ import print_function
 
 import logging
-import re
+import selectors
 import socket
 import ssl
 import time
-from collections import deque
 
+from gamebot.bots.flood import SendScheduler, UNTIL_RELEASED
+from gamebot.bots.irc_protocol import LineFramer, parse_bot_command, tokenize
+from gamebot.bots.rooms import RoomPool
 
-class irc_connection():
-    def __init__(self, parser, channellist, botnick, botpass=None, server='chat.freenode.net', usessl=True, port=None):
+RPL_WELCOME = "001"
+RPL_LOGGEDIN = "900"
+ERR_NICKNAMEINUSE = "433"
+ERR_NOTREGISTERED = "451"
+# Replies to a JOIN the server refuses: too many channels, channel full, invite only, banned, bad key
+ERR_JOIN_REFUSED = ("405", "471", "473", "474", "475")
+
+
+def channel_of(message):
+    """ The channel of a JOIN or PART, which servers send as a parameter or as the trailing parameter """
+    return message.params[0] if message.params else message.trailing
 
-        # First time running the bot considering using register = True to take care of some irc setup automatically
-        register = False
-        email = ""
 
+class irc_link(object):
+    """ One connection to the server under a nick of its own, with its own outbound queue and flood budget """
+    recv_size = 65536
+    identify_timeout = 10.0
+    # Seconds to wait for RPL_WELCOME before warning and sending the held lines anyway
+    welcome_timeout = 30.0
+    # Nicks tried when the server says the nick is in use: the nick with up to this many underscores added
+    nick_attempts = 3
+
+    def __init__(self, botnick, server='chat.freenode.net', usessl=True, port=None, sock=None):
         if port is None:
             if usessl:
                 port = 6697
@@ -22,12 +40,16 @@ class irc_connection():
                 port = 6667
         self.server = server
         self.port = port
-        self.botnick = botnick
-        self.parser = parser
-        self.msgqueue = deque()
-        self.lastsent = 0
-        self.prevdelay = None
-        if usessl:
+        self.usessl = usessl
+        self.set_nick(botnick)
+        # Channels the server confirmed the nick is in, lower case
+        self.joined = set()
+        self.msgqueue = SendScheduler()
+        self.sendbuf = bytearray()
+        self.framer = LineFramer()
+        if sock is not None:
+            self.ircsocket = sock
+        elif usessl:
             raw_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.ircsocket = ssl.wrap_socket(raw_socket)
             self.ircsocket.connect((server, port))
@@ -35,160 +57,536 @@ class irc_connection():
             self.ircsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.ircsocket.connect((server, port))
         self.ircsocket.setblocking(False)
+
+    def set_nick(self, nick):
+        self.botnick = nick
+        # Lines about the link's own nick start with it. Nicks are case insensitive, so this is lower case
+        self.own_prefix = ":{0}!".format(nick.lower())
+
+    def is_own_nick(self, nick):
+        return nick is not None and nick.lower() == self.botnick.lower()
+
+    def sendraw(self, msg, priority=False, delay=None, lane=None):
+        # Messages in the same lane are sent in order and a delay only holds back that lane. Lane None carries the
+        # connection level commands (registration, joins, modes)
+        self.msgqueue.push(msg, delay=delay, lane=lane, priority=priority)
+
+    def sendmsg(self, name, msg, delay=None, lane=False):
+        if lane is False:
+            lane = name
+        for msgline in msg.split("\n"):
+            if msgline != "":
+                self.sendraw("PRIVMSG {} :{}\n".format(name, msgline), delay=delay, lane=lane)
+
+    def joinchan(self, channel):
+        self.sendraw("JOIN {}\n".format(channel))
+
+    def identify(self, nick, password, channels=()):
+        """
+        Registers with the server. Lane None, which carries the joins queued after this, is held until the server
+        welcomes the nick (RPL_WELCOME). With a password it is then held again until NickServ confirms the
+        identification, or for identify_timeout seconds if it does not. The link is ready once the server has
+        confirmed joining channels.
+
+        A nick that is in use is retried with underscores added. If the server has not welcomed the nick after
+        welcome_timeout seconds, check_welcome logs a warning and lets the held lines go
+        """
+        self.connected_at = time.time()
+        self.registration = (nick, password)
+        self.nick_attempt = 0
+        self.welcome_overdue = False
+        self.welcomed_at = None
+        self.identified_at = None
+        self.ready_at = None
+        self.awaiting_joins = set(channel.lower() for channel in channels)
+        if password:
+            self.sendraw("PASS {}\n".format(password))
+        self.sendraw("NICK {}\n".format(nick))
+        self.sendraw("USER {0} {0} {0} {0}\n".format(nick), delay=UNTIL_RELEASED)
+        if password:
+            self.sendmsg("nickserv", "identify {}".format(password), delay=self.identify_timeout, lane=None)
+
+    def handshake(self, line):
+        """ Follows registration on the lines the server sends until the link is ready """
+        message = tokenize(line)
+        if message is None:
+            return
+        now = time.time()
+        if message.command == RPL_WELCOME:
+            if message.params:
+                # The server may have shortened the nick, or answered the NICK of an earlier attempt
+                self.set_nick(message.params[0])
+            self.welcomed_at = now
+            self.msgqueue.release(None)
+            logging.info("Registered as %s after %.3fs", self.botnick, now - self.connected_at,
+                         extra={'nick': self.botnick})
+        elif message.command == RPL_LOGGEDIN or (message.command == "NOTICE" and message.nick is not None and
+                                                 message.nick.lower() == "nickserv" and
+                                                 "identified" in (message.trailing or "").lower()):
+            if self.identified_at is None:
+                self.identified_at = now
+                self.msgqueue.release(None)
+        elif message.command == ERR_NICKNAMEINUSE and self.welcomed_at is None:
+            self.retry_nick()
+        elif message.command == ERR_NOTREGISTERED:
+            # A line got out before registration. The server only takes NICK and USER until then, so send them again
+            logging.warning("%s: %s was sent before the server registered the nick", self.botnick,
+                            message.params[1] if len(message.params) > 1 else "a command",
+                            extra={'nick': self.botnick})
+            if self.welcomed_at is None:
+                self.register_nick(self.botnick)
+        elif message.command == "JOIN" and self.is_own_nick(message.nick):
+            self.awaiting_joins.discard(channel_of(message).lower())
+        if self.welcomed_at is not None and not self.awaiting_joins:
+            self.ready_at = now
+            logging.info("%s ready after %.3fs", self.botnick, self.time_to_ready(), extra={'nick': self.botnick})
+
+    def register_nick(self, nick):
+        # Ahead of the held lines, which wait for the welcome
+        self.sendraw("NICK {}\n".format(nick), priority=True)
+        self.sendraw("USER {0} {0} {0} {0}\n".format(nick), priority=True)
+
+    def retry_nick(self):
+        nick, password = self.registration
+        if self.nick_attempt >= self.nick_attempts:
+            logging.error("Nick %s and its alternatives are in use, giving up on registering", nick,
+                          extra={'nick': nick})
+            return
+        self.nick_attempt += 1
+        alternative = nick + "_" * self.nick_attempt
+        logging.warning("Nick %s is in use, trying %s", self.botnick, alternative, extra={'nick': nick})
+        if password:
+            logging.warning("NickServ will not identify %s with the password of %s", alternative, nick,
+                            extra={'nick': nick})
+        self.set_nick(alternative)
+        self.sendraw("NICK {}\n".format(alternative), priority=True)
+
+    def welcome_deadline(self):
+        """ When check_welcome has to look at the registration, or None """
+        if self.welcomed_at is not None or self.welcome_overdue:
+            return None
+        return self.connected_at + self.welcome_timeout
+
+    def check_welcome(self, now):
+        """ Warns once if the server has not welcomed the nick in time, and sends the lines that waited for it """
+        deadline = self.welcome_deadline()
+        if deadline is None or now < deadline:
+            return
+        self.welcome_overdue = True
+        logging.warning("%s has not been welcomed by %s after %.0fs, sending the held lines anyway", self.botnick,
+                        self.server, now - self.connected_at, extra={'nick': self.botnick})
+        self.msgqueue.release(None)
+
+    def time_to_ready(self):
+        """ Seconds from connecting until the link was ready, or None if it is not ready yet """
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.connected_at
+
+    def follow(self, line):
+        """
+        Keeps joined up to date with the JOINs, PARTs and KICKs of the nick. Returns the tokenized line if it came
+        from the nick itself or was a KICK, None for every other line
+        """
+        if line[:len(self.own_prefix)].lower() != self.own_prefix and " KICK " not in line:
+            return None
+        message = tokenize(line)
+        if message is None:
+            return None
+        own = self.is_own_nick(message.nick)
+        if message.command in ("JOIN", "PART") and own:
+            if message.command == "JOIN":
+                self.joined.add(channel_of(message).lower())
+            else:
+                self.joined.discard(channel_of(message).lower())
+        elif message.command == "KICK":
+            if len(message.params) > 1 and self.is_own_nick(message.params[1]):
+                self.joined.discard(message.params[0].lower())
+        elif not own:
+            return None
+        return message
+
+    def send_queued(self, now):
+        # Send as many messages as the flood credits allow, but only hand the socket a new line once the previous
+        # ones have left, so that credits are not spent on lines that are still sitting in our buffer
+        while True:
+            self.flush()
+            if self.sendbuf:
+                break
+            msg = self.msgqueue.pop(now)
+            if msg is None:
+                break
+            logging.debug(">> %s", msg, extra={'nick': self.botnick})
+            self.sendbuf += msg.encode("utf-8")
+
+    def flush(self):
+        if not self.sendbuf:
+            return
+        try:
+            sent = self.ircsocket.send(self.sendbuf)
+        except (BlockingIOError, ssl.SSLWantWriteError):
+            sent = 0
+        del self.sendbuf[:sent]
+
+    def busy_with(self, name):
+        """ True if a line to name may still be on its way out through this link """
+        return self.msgqueue.has_lane(name) or (bool(self.sendbuf) and self.msgqueue.last_lane == name)
+
+    def receive(self):
+        try:
+            return self.ircsocket.recv(self.recv_size)
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return None
+
+    def ping(self):
+        self.sendraw("PONG :pingis\n", priority=True)
+
+    def close(self):
+        try:
+            self.ircsocket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.ircsocket.close()
+
+
+class irc_connection(irc_link):
+    """
+    The bot's connection, which takes the commands and runs the game rooms. More links can be added with add_link,
+    each under a nick of its own that is registered with the same password. Private messages and room messages are
+    then spread over all of them, so each one's flood budget adds to the bot's outbound capacity. Every recipient
+    stays on the link that has lines queued for them, which keeps their lines in order; a recipient with nothing
+    queued goes to the link with the shortest queue among those that are ready and, for a channel, have joined it.
+    Service messages, invites, topics and modes stay on the bot's own connection. Commands sent privately to the
+    added nicks are run like the ones sent to the bot.
+    """
+    def __init__(self, parser, channellist, botnick, botpass=None, server='chat.freenode.net', usessl=True, port=None,
+                 event_driven=False, sock=None, readers=None, warm_rooms=2):
+
+        # First time running the bot considering using register = True to take care of some irc setup automatically
+        register = False
+        email = ""
+
+        super().__init__(botnick, server=server, usessl=usessl, port=port, sock=sock)
+        self.parser = parser
+        self.links = [self]
+
+        # In event driven mode the loop sleeps in select() until the socket is readable, the next send slot opens
+        # or the next game deadline is due, instead of spinning on a non-blocking recv()
+        self.event_driven = event_driven
+        self.selector = None
+        if event_driven:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.ircsocket, selectors.EVENT_READ)
+        # Returns the other sources of game events, such as the pipes of sharded game workers, that are still open
+        self.readers = readers
+        self.watched = set()
         if register:
             self.sendmsg("nickserv", "register {} {}".format(botpass, email))
             self.sendmsg("nickserv", "set enforce on")
-        self.identify(botnick, botpass)
-        self.game_rooms = deque()
+        self.identify(botnick, botpass, channellist)
+        self.register = register
         for channel in channellist:
             if channel[0] != '#':
                 raise SyntaxError("Channel names must start with #")
             self.joinchan(channel)
-        for game_number in range(1, 11):
-            # Non-primary rooms start with ##, as specified by irc standards
-            game_room_name = "#{}_gameroom_{}".format(channellist[0], game_number)
-            self.game_rooms.append(game_room_name)
-            self.joinchan(game_room_name)
-            if register:
-                self.sendmsg("chanserv", "register {}".format(game_room_name), delay=1)
-                self.sendmsg("chanserv", "FLAGS {} {} +O".format(game_room_name, botnick), delay=1)
-                self.modes(game_room_name, "+r")
-        self.assigned_game_rooms = {}
-
-    def sendraw(self, msg, priority=False, delay=None):
-        if priority:
-            self.msgqueue.appendleft((msg, delay))
-        else:
-            self.msgqueue.append((msg, delay))
+        # Channels that added links join as well, besides the game rooms
+        self.channels = list(channellist)
+        self.rooms = RoomPool(channellist[0], self.join_room, self.part_room, warm=warm_rooms)
+        # game name -> room
+        self.assigned_game_rooms = self.rooms.assigned
+        self.rooms.start()
 
-    def sendmsg(self, name, msg, delay=None):
-        for msgline in msg.split("\n"):
-            if msgline != "":
-                self.sendraw("PRIVMSG {} :{}\n".format(name, msgline), delay=delay)
+    def add_link(self, botnick, botpass=None, sock=None):
+        """ Connects under another nick, which joins every channel the bot is in and takes its share of messages """
+        link = irc_link(botnick, server=self.server, usessl=self.usessl, port=self.port, sock=sock)
+        link.identify(botnick, botpass, self.channels)
+        for channel in self.channels + self.rooms.rooms():
+            link.joinchan(channel)
+        self.links.append(link)
+        if self.selector is not None:
+            self.selector.register(link.ircsocket, selectors.EVENT_READ, link)
+        return link
 
-    def joinchan(self, channel):
-        self.sendraw("JOIN {}\n".format(channel))
+    def drop_link(self, link):
+        """ Closes an added link and moves the lines it still had queued to the bot's own connection """
+        self.links.remove(link)
+        if self.selector is not None:
+            self.selector.unregister(link.ircsocket)
+        # Only messages move; the link's own registration and joins would act on the bot's connection
+        moved = [(msg, lane) for msg, lane in link.msgqueue.drain() if lane is not None]
+        for msg, lane in moved:
+            self.sendraw(msg, lane=lane)
+        link.close()
+        logging.warning("Lost the connection of %s, %d queued line(s) moved to %s", link.botnick, len(moved),
+                        self.botnick)
+
+    def route(self, name):
+        """
+        The link that sends the next lines to name. Only links that are ready, and for a channel have joined it, take
+        new recipients; the bot's own connection takes the ones no other link can
+        """
+        if len(self.links) == 1:
+            return self
+        channel = name.lower() if name.startswith("#") else None
+        best = self
+        best_load = None
+        for link in self.links:
+            if link.busy_with(name):
+                return link
+            if link.ready_at is None or (channel is not None and channel not in link.joined):
+                continue
+            load = len(link.msgqueue) + len(link.sendbuf)
+            if best_load is None or load < best_load:
+                best, best_load = link, load
+        return best
+
+    def deliver(self, name, msg):
+        self.route(name).sendmsg(name, msg)
 
     def invitechan(self, name, channel):
-        self.sendraw("INVITE {} {}\n".format(name, channel), delay=1)
+        self.sendraw("INVITE {} {}\n".format(name, channel), delay=1, lane=channel)
 
     def modes(self, channel, mode):
         self.sendraw("MODE {} {}\n".format(channel, mode), delay=2)
 
+    def join_room(self, room):
+        for link in self.links:
+            link.joinchan(room)
+        if self.register:
+            self.sendmsg("chanserv", "register {}".format(room), delay=1)
+            self.sendmsg("chanserv", "FLAGS {} {} +O".format(room, self.botnick), delay=1)
+            self.modes(room, "+r")
+
+    def part_room(self, room):
+        for link in self.links:
+            link.sendraw("PART {}\n".format(room))
+        logging.debug("Leaving idle room %s", room)
+
     def create_room(self, game_name):
-        assigned_room = self.game_rooms.popleft()  # Todo: handle running out of rooms
-        self.assigned_game_rooms[game_name] = assigned_room
+        assigned_room = self.rooms.take(game_name)
         # Todo: add game options to topic
         self.sendmsg("chanserv", "TOPIC {} Coup game {}: Hosted by {}".format(assigned_room, game_name, self.botnick))
-        logging.debug("Assigning room {}: {}".format(assigned_room, game_name))
+        logging.debug("Assigning room %s", assigned_room, extra={'game': game_name})
 
     def add_player(self, name, game_name):
         assigned_room = self.assigned_game_rooms[game_name]
         self.invitechan(name, assigned_room)
-        logging.debug("Adding player room {}: {}".format(assigned_room, name))
+        logging.debug("Adding player to room %s", assigned_room, extra={'nick': name, 'game': game_name})
+
+    def join_refused(self, message):
+        """ The server would not let the bot into a room. A game that had it is moved to a new one """
+        room = message.params[1] if len(message.params) > 1 else message.trailing
+        logging.warning("Could not join %s: %s", room, message.trailing)
+        moved = self.rooms.failed(room)
+        if moved is None:
+            return
+        game_name, assigned_room = moved
+        self.sendmsg("chanserv", "TOPIC {} Coup game {}: Hosted by {}".format(assigned_room, game_name, self.botnick))
+        logging.warning("Moving to room %s", assigned_room, extra={'game': game_name})
+        game = self.parser.instance.games.get(game_name)
+        if game is not None:
+            for name in game.players:
+                self.invitechan(name, assigned_room)
 
     def destroy_room(self, game_name):
-        assigned_room = self.assigned_game_rooms[game_name]
-        del self.assigned_game_rooms[game_name]
-        self.game_rooms.append(assigned_room)
-        logging.debug("Clearing room {}: {}".format(assigned_room, game_name))
+        assigned_room = self.rooms.release(game_name)
+        logging.debug("Clearing room %s", assigned_room, extra={'game': game_name})
+
+    def process_game_queue(self):
+        # Translate every pending game event in one pass, so the send scheduler sees the whole backlog at once
+        # instead of being fed one event each time it runs dry
+        gamequeue = self.parser.instance.msgqueue
+        while gamequeue:
+            msg_type, payload = gamequeue.popleft()
+            if msg_type == "private message":
+                name, msg = payload
+                self.deliver(name, msg)
+            elif msg_type == "game message":
+                name, msg = payload
+                irc_room = self.assigned_game_rooms[name]
+                self.deliver(irc_room, msg)
+            elif msg_type == "create room":
+                self.create_room(payload)
+            elif msg_type == "invite":
+                name, game_name = payload
+                self.add_player(name, game_name)
+            elif msg_type == "destroy room":
+                self.destroy_room(payload)
+            else:
+                logging.error("Unrecognized queue event type: %s, %s", msg_type, payload)
+                raise TypeError
+
+    def next_send_time(self):
+        times = [x for x in (link.msgqueue.next_send_time() for link in self.links) if x is not None]
+        return min(times) if times else None
+
+    def send_pending(self):
+        now = time.time()
+        for link in self.links:
+            link.send_queued(now)
+
+    def next_timeout(self):
+        """
+        Seconds until the loop has something to do without input from the server, or None to sleep until the
+        socket becomes readable
+        """
+        deadlines = [self.next_send_time(), self.parser.instance.next_event_time(), self.rooms.next_deadline()]
+        deadlines.extend(link.welcome_deadline() for link in self.links)
+        deadlines = [x for x in deadlines if x is not None]
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - time.time())
+
+    def wait(self):
+        for link in self.links:
+            if isinstance(link.ircsocket, ssl.SSLSocket) and link.ircsocket.pending():
+                # Decrypted data is already buffered and will never show up as readable on the raw socket
+                return
+        for link in self.links:
+            events = selectors.EVENT_READ
+            if link.sendbuf:
+                events |= selectors.EVENT_WRITE
+            self.selector.modify(link.ircsocket, events, link)
+        self.watch_readers()
+        self.selector.select(self.next_timeout())
 
-    def identify(self, nick, password):
-        self.sendraw("USER {0} {0} {0} {0}\n".format(nick))
-        self.sendraw("NICK {}\n".format(nick), delay=2)
-        if password is not None:
-            self.sendraw("PASS {}\n".format(password), delay=2)
-        self.sendmsg("nickserv", "identify {}".format(password), delay=25)
+    def watch_readers(self):
+        """ Follows the readers that are open. One that has closed would be readable forever and spin the loop """
+        live = set(self.readers()) if self.readers is not None else set()
+        for reader in self.watched - live:
+            self.selector.unregister(reader)
+        for reader in live - self.watched:
+            self.selector.register(reader, selectors.EVENT_READ)
+        self.watched = live
+
+    def receive(self):
+        # Receive message
+        try:
+            return super().receive()
+        except socket.error:
+            if self.event_driven:
+                raise
+            return None
+
+    def receive_links(self):
+        """
+        Handles the lines of the added links: registration, keeping the connection alive, their channels and the
+        commands sent to their nicks. Channel lines reach every link, so only the bot's own connection takes commands
+        from them
+        """
+        for link in self.links[1:]:
+            try:
+                data = link.receive()
+            except socket.error:
+                data = b""
+            if data is None:
+                continue
+            lines = link.framer.feed(data) if data else ["ERROR :Connection closed"]
+            for line in lines:
+                if link.ready_at is None:
+                    link.handshake(line)
+                if line.startswith("PING"):
+                    link.ping()
+                elif line.startswith("ERROR"):
+                    self.drop_link(link)
+                    break
+                elif link.follow(line) is None:
+                    message = parse_bot_command(line, link.botnick)
+                    if message is not None and message.is_priv:
+                        self.run_command(message)
 
     def process_send_recv(self):
-        # The limits are 5 line burst, 2 lines per second afterward. It is
-        # implemented by giving you 2 credits a second, limited to 5. So if you
-        # pause a second, you can do a 4 line burst. if the backlog exceeds 20
-        # lines, you get killed for excess flood
+        """
+        Runs the send side until at least one complete line has been received. Returns the list of received lines,
+        or None once the server has closed the connection
+        """
+        # Outbound lines are rate limited by the server's credit model, see gamebot.bots.flood
 
-        default_msg_delay = .5  # seconds of delay between messages
-        ircmsg = None
-        while ircmsg is None:
+        lines = []
+        while not lines:
             # Check for pending events
             self.parser.instance.checkevents()
-            # Process game's message queue
-            if not self.msgqueue and self.parser.instance.msgqueue:
-                msg_type, payload = self.parser.instance.msgqueue.popleft()
-                if msg_type == "private message":
-                    name, msg = payload
-                    self.sendmsg(name, msg)
-                elif msg_type == "game message":
-                    name, msg = payload
-                    irc_room = self.assigned_game_rooms[name]
-                    self.sendmsg(irc_room, msg)
-                elif msg_type == "create room":
-                    self.create_room(payload)
-                elif msg_type == "invite":
-                    name, game_name = payload
-                    self.add_player(name, game_name)
-                elif msg_type == "destroy room":
-                    self.destroy_room(payload)
-                else:
-                    logging.error("Unrecognized queue event type: {}, {}, {}".format(msg_type, name, msg))
-                    raise TypeError
-            # Send message
-            if self.prevdelay is None:
-                msg_delay = default_msg_delay
-            else:
-                msg_delay = self.prevdelay
-            if self.msgqueue and time.time() - self.lastsent > msg_delay:
-                msg, delay = self.msgqueue.popleft()
-                self.lastsent = time.time()
-                self.prevdelay = delay
-                logging.debug(">> {}".format(msg))
-                self.ircsocket.send(msg.encode("utf-8"))
-            # Receive message
-            try:
-                ircmsg = self.ircsocket.recv(2048)
-            except socket.error:
-                pass
-        return ircmsg.decode("utf-8").strip("\n\r")
+            self.rooms.maintain()
+            now = time.time()
+            for link in self.links:
+                link.check_welcome(now)
+            self.process_game_queue()
+            self.send_pending()
+            if self.event_driven:
+                self.wait()
+            if len(self.links) > 1:
+                self.receive_links()
+            data = self.receive()
+            if data is None:
+                continue
+            if not data:
+                # The server closed the connection
+                return None
+            lines = self.framer.feed(data)
+        return lines
+
+    def handle_line(self, ircmsg):
+        """ Processes one line from the server. Returns False if the server is closing the connection """
+        logging.debug("<< %s", ircmsg)
+        if ircmsg.startswith("PING"):
+            self.ping()
+            return True
+        if ircmsg.startswith("ERROR"):
+            return False
+        if self.ready_at is None:
+            self.handshake(ircmsg)
+        message = self.follow(ircmsg)
+        if message is not None:
+            if message.command == "JOIN" and self.is_own_nick(message.nick):
+                self.rooms.joined(channel_of(message))
+            return True
+        command = ircmsg.split(" ", 2)[1:2]
+        if command and command[0] in ERR_JOIN_REFUSED:
+            message = tokenize(ircmsg)
+            if message is not None:
+                self.join_refused(message)
+            return True
+        message = parse_bot_command(ircmsg, self.botnick)
+        if message is not None:
+            self.run_command(message)
+        # TODO: Handle leavers (PART)
+        return True
+
+    def run_command(self, message):
+        started = time.perf_counter()
+        response = self.parser.parse_input(message)
+        logging.info("%s << .%s", message.nick, message.command,
+                     extra={'nick': message.nick, 'command': message.command,
+                            'latency': time.perf_counter() - started})
+        if response is not None:
+            logging.info("%s >> %s", message.nick, response, extra={'nick': message.nick})
+            self.deliver(message.nick, response)
 
     def run(self):
         logging.info("Listening")
         connected = True
+        ircmsg = None
         try:
             while connected:
-                ircmsg = self.process_send_recv()
-                logging.debug(ircmsg)
-                matchstr = ":(?P<nick>.*)!(?P<user>.*)@(?P<host>.*) PRIVMSG (?P<sentto>.*) :\.(?P<command>.*)"
-                privmsg = re.match(matchstr, ircmsg)
-                if privmsg is not None:
-                    message = {'nick': privmsg.group('nick'),
-                               'user': privmsg.group('user'),
-                               'host': privmsg.group('host'),
-                               'sentto': privmsg.group('sentto'),
-                               'command': privmsg.group('command'),
-                               'raw': ircmsg,
-                               'is_priv': privmsg.group('sentto') == self.botnick}
-                    logging.info("{} << .{}".format(message['nick'], message['command']))
-                    response = self.parser.parse_input(message)
-                    if response is not None:
-                        logging.info("{} >> {}".format(message['nick'], response))
-                        self.sendmsg(message['nick'], response)
-                matchstr = ":(?P<nick>.*)!(?P<user>.*)@(?P<host>.*) PART (?P<channel>.*)"
-                partmsg = re.match(matchstr, ircmsg)
-                if partmsg is not None:
-                    pass  # TODO: Handle leavers
-                if ircmsg.startswith("PING :"):
-                    self.ping()
-                if ircmsg.startswith("ERROR :"):
+                lines = self.process_send_recv()
+                if lines is None:
                     connected = False
+                    break
+                for ircmsg in lines:
+                    connected = self.handle_line(ircmsg)
+                    if not connected:
+                        break
         except KeyboardInterrupt:
             logging.info("Exiting: KeyboardInterrupt")
         else:
-            logging.info("Exiting: {},{}".format(connected, ircmsg))
+            logging.info("Exiting: %s,%s", connected, ircmsg)
         self.disconnect()
 
-    def ping(self):
-        self.sendraw("PONG :pingis\n", priority=True)
-
     def disconnect(self):
+        if self.selector is not None:
+            self.selector.close()
+        for link in self.links[1:]:
+            link.close()
         self.ircsocket.shutdown(socket.SHUT_RDWR)
         self.ircsocket.close()
 
@@ -0,0 +1,362 @@
+"""
+Loopback IRC server for load testing.
+
+LoopbackServer speaks the subset of IRC the bot uses (PASS, NICK, USER, JOIN, PART, PRIVMSG, NOTICE, INVITE, MODE,
+TOPIC, PING, PONG, QUIT) on a local port, from a thread of its own. Besides real socket clients such as the bot it
+hosts virtual users, which live inside the server and get their lines through a callback. That way a load test can
+simulate many users without a socket each.
+
+Lines from socket clients are subject to flood control the way servers typically apply it. A client earns rate credits
+per second up to burst, and every line costs a credit. Lines that arrive without a credit wait in a backlog, and a
+backlog longer than max_backlog is an excess flood. With kill_on_flood the client is then disconnected with
+"ERROR :Closing Link"; otherwise the server only records when it would have happened and carries on.
+"""
+import logging
+import selectors
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+
+from gamebot.bots.flood import TokenBucket
+from gamebot.bots.irc_protocol import LineFramer, tokenize
+
+FloodEvent = namedtuple('FloodEvent', 'nick elapsed lines backlog killed')
+
+
+class Client(object):
+    def __init__(self, sock=None, deliver=None, rate=2.0, burst=5, clock=time.time):
+        self.sock = sock
+        self.deliver = deliver
+        self.nick = None
+        self.user = None
+        self.registered = False
+        self.channels = set()
+        self.framer = LineFramer()
+        self.outbuf = bytearray()
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.backlog = deque()
+        self.lines = 0
+        self.flooded = False
+
+    @property
+    def virtual(self):
+        return self.sock is None
+
+    def prefix(self):
+        return "{0}!{1}@loopback".format(self.nick, self.user or self.nick)
+
+
+class LoopbackServer(object):
+    name = "loopback"
+
+    def __init__(self, host='127.0.0.1', port=0, rate=2.0, burst=5, max_backlog=20, kill_on_flood=False,
+                 clock=time.time):
+        self.rate = rate
+        self.burst = burst
+        self.max_backlog = max_backlog
+        self.kill_on_flood = kill_on_flood
+        self.clock = clock
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(16)
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+
+        # Other threads hand lines over through injected and wake the loop with the socket pair
+        self.injected = deque()
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ, None)
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ, None)
+
+        self.clients = []
+        self.nicks = dict()
+        self.channels = dict()
+        self.flood_events = []
+        self.started = None
+        self.running = False
+        self.thread = None
+        self.registered = threading.Condition()
+
+    # Thread interface
+    def start(self):
+        self.started = self.clock()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="loopback-irc", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake()
+        if self.thread is not None:
+            self.thread.join()
+        for client in list(self.clients):
+            if not client.virtual:
+                self.close(client)
+        self.selector.close()
+        self.listener.close()
+        self.wakeup_reader.close()
+        self.wakeup_writer.close()
+
+    def wake(self):
+        try:
+            self.wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def add_user(self, nick, deliver):
+        """ Adds a virtual user; deliver(line) is called from the server thread for every line it receives """
+        self.injected.append((None, (nick, deliver)))
+        self.wake()
+
+    def send_as(self, nick, line):
+        """ Runs line as if virtual user nick had sent it """
+        self.injected.append((nick, line))
+        self.wake()
+
+    def wait_for_nick(self, nick, timeout=None):
+        with self.registered:
+            return self.registered.wait_for(lambda: nick.lower() in self.nicks, timeout)
+
+    # Server loop
+    def run(self):
+        while self.running:
+            timeout = self.next_credit()
+            for key, events in self.selector.select(timeout):
+                if key.fileobj is self.listener:
+                    self.accept()
+                elif key.fileobj is self.wakeup_reader:
+                    try:
+                        self.wakeup_reader.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ:
+                        self.read(client)
+                    if events & selectors.EVENT_WRITE and client.sock is not None:
+                        self.write(client)
+            self.run_injected()
+            self.run_backlogs()
+
+    def next_credit(self):
+        """ Seconds until a client with a backlog earns its next credit, or None """
+        deadlines = [client.bucket.next_available() for client in self.clients if client.backlog]
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - self.clock())
+
+    def accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        client = Client(sock, rate=self.rate, burst=self.burst, clock=self.clock)
+        self.clients.append(client)
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def read(self, client):
+        try:
+            data = client.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.close(client)
+            return
+        now = self.clock()
+        for line in client.framer.feed(data):
+            client.lines += 1
+            if not client.backlog and client.bucket.consume(now):
+                self.handle(client, line)
+                if client not in self.clients:
+                    return
+            else:
+                client.backlog.append(line)
+                if len(client.backlog) > self.max_backlog:
+                    self.flood(client)
+                    if client not in self.clients:
+                        return
+
+    def write(self, client):
+        try:
+            sent = client.sock.send(client.outbuf)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.close(client)
+            return
+        del client.outbuf[:sent]
+        if not client.outbuf:
+            self.selector.modify(client.sock, selectors.EVENT_READ, client)
+
+    def run_injected(self):
+        while self.injected:
+            nick, item = self.injected.popleft()
+            if nick is None:
+                name, deliver = item
+                client = Client(deliver=deliver)
+                client.user = name
+                self.clients.append(client)
+                self.handle(client, "NICK {0}".format(name))
+            else:
+                client = self.nicks.get(nick.lower())
+                if client is not None:
+                    self.handle(client, item)
+
+    def run_backlogs(self):
+        now = self.clock()
+        for client in list(self.clients):
+            while client.backlog and client.bucket.consume(now):
+                self.handle(client, client.backlog.popleft())
+                if client not in self.clients:
+                    break
+
+    def flood(self, client):
+        event = FloodEvent(client.nick, self.clock() - self.started, client.lines, len(client.backlog),
+                           self.kill_on_flood)
+        if not client.flooded:
+            logging.warning("Excess flood from %s after %.2fs and %s lines", client.nick, event.elapsed, client.lines)
+            self.flood_events.append(event)
+        client.flooded = True
+        if self.kill_on_flood:
+            self.send(client, "ERROR :Closing Link: {0} (Excess Flood)".format(client.nick))
+            self.write(client)
+            self.close(client)
+
+    def close(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+        if client.nick is not None and self.nicks.get(client.nick.lower()) is client:
+            del self.nicks[client.nick.lower()]
+        for channel in client.channels:
+            self.channels.get(channel, set()).discard(client)
+        if client.sock is not None:
+            try:
+                self.selector.unregister(client.sock)
+            except (KeyError, ValueError):
+                pass
+            client.sock.close()
+
+    # Delivery
+    def send(self, client, line):
+        if client.virtual:
+            client.deliver(line)
+            return
+        if not client.outbuf:
+            self.selector.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+        client.outbuf += line.encode("utf-8") + b"\r\n"
+
+    def numeric(self, client, number, text):
+        self.send(client, ":{0} {1} {2} :{3}".format(self.name, number, client.nick or "*", text))
+
+    # Commands
+    def handle(self, client, line):
+        message = tokenize(line)
+        if message is None:
+            return
+        handler = getattr(self, "on_" + message.command.lower(), None)
+        if handler is None:
+            self.numeric(client, "421", "{0} Unknown command".format(message.command))
+            return
+        arguments = list(message.params)
+        if message.trailing is not None:
+            arguments.append(message.trailing)
+        handler(client, arguments)
+
+    def on_pass(self, client, arguments):
+        pass
+
+    def on_nick(self, client, arguments):
+        if not arguments:
+            return
+        nick = arguments[0]
+        if nick.lower() in self.nicks:
+            self.numeric(client, "433", "{0} Nickname is already in use".format(nick))
+            return
+        if client.nick is not None:
+            del self.nicks[client.nick.lower()]
+        client.nick = nick
+        with self.registered:
+            self.nicks[nick.lower()] = client
+            self.registered.notify_all()
+        if client.user is not None and not client.registered:
+            client.registered = True
+            self.numeric(client, "001", "Welcome to the loopback network {0}".format(client.prefix()))
+
+    def on_user(self, client, arguments):
+        if arguments:
+            client.user = arguments[0]
+        if client.nick is not None and not client.registered:
+            client.registered = True
+            self.numeric(client, "001", "Welcome to the loopback network {0}".format(client.prefix()))
+
+    def on_join(self, client, arguments):
+        if not arguments:
+            return
+        for channel in arguments[0].split(","):
+            members = self.channels.setdefault(channel.lower(), set())
+            if client in members:
+                continue
+            members.add(client)
+            client.channels.add(channel.lower())
+            for member in list(members):
+                self.send(member, ":{0} JOIN {1}".format(client.prefix(), channel))
+
+    def on_part(self, client, arguments):
+        if not arguments:
+            return
+        for channel in arguments[0].split(","):
+            members = self.channels.get(channel.lower(), set())
+            if client in members:
+                for member in list(members):
+                    self.send(member, ":{0} PART {1}".format(client.prefix(), channel))
+                members.discard(client)
+                client.channels.discard(channel.lower())
+
+    def on_privmsg(self, client, arguments, command="PRIVMSG"):
+        if len(arguments) < 2:
+            return
+        target, text = arguments[0], arguments[-1]
+        line = ":{0} {1} {2} :{3}".format(client.prefix(), command, target, text)
+        if target.startswith("#"):
+            for member in list(self.channels.get(target.lower(), ())):
+                if member is not client:
+                    self.send(member, line)
+        else:
+            recipient = self.nicks.get(target.lower())
+            if recipient is not None:
+                self.send(recipient, line)
+            # Messages to services and to users who are gone are dropped
+
+    def on_notice(self, client, arguments):
+        self.on_privmsg(client, arguments, "NOTICE")
+
+    def on_invite(self, client, arguments):
+        if len(arguments) < 2:
+            return
+        recipient = self.nicks.get(arguments[0].lower())
+        if recipient is not None:
+            self.send(recipient, ":{0} INVITE {1} :{2}".format(client.prefix(), recipient.nick, arguments[1]))
+
+    def on_mode(self, client, arguments):
+        pass
+
+    def on_topic(self, client, arguments):
+        pass
+
+    def on_ping(self, client, arguments):
+        self.send(client, ":{0} PONG {0} :{1}".format(self.name, arguments[-1] if arguments else ""))
+
+    def on_pong(self, client, arguments):
+        pass
+
+    def on_quit(self, client, arguments):
+        self.close(client)
@@ -0,0 +1,138 @@
+"""
+Game rooms.
+
+A RoomPool hands out the IRC channels games are played in, '#<lobby>_gameroom_<n>'. Rooms are joined when they are
+needed instead of all at startup. The pool keeps warm rooms free, i.e. joined or being joined and not assigned to a
+game, so a new game normally gets a room the bot is already in. Whenever assigning one leaves fewer than warm, the
+next free numbers are joined right away. There is no limit on the number of rooms; a game that finds no free room
+gets a new one, and its first lines may then reach the server before the bot's JOIN does.
+
+A room whose game ended goes back to the free rooms. Free rooms beyond warm are parted once they have been idle for
+idle_time seconds, oldest first, so the bot does not sit in the rooms of a busy evening forever. A room counts as
+joined once the server echoes the bot's JOIN (joined()). Channel names are case insensitive, so rooms are named in
+lower case and the echo is matched in lower case. A room the server refuses to let the bot join (failed()) is not
+used again; a game that had it is moved to a new room.
+
+The pool does not send anything itself: join(room) and part(room) are called to do that.
+"""
+import time
+from collections import deque
+
+
+class RoomPool(object):
+    def __init__(self, lobby, join, part, warm=2, idle_time=600.0, clock=time.time):
+        self.lobby = lobby
+        self.join = join
+        self.part = part
+        self.warm = warm
+        self.idle_time = idle_time
+        self.clock = clock
+
+        # game name -> room
+        self.assigned = dict()
+        # (room, time it was freed) of the joined free rooms, oldest first
+        self.free = deque()
+        # Rooms a JOIN was sent for that the server has not echoed yet, and whether a game has them
+        self.joining = dict()
+        self.numbers = set()
+        # Numbers of the rooms the bot could not join
+        self.refused = set()
+
+    def __len__(self):
+        """ Rooms the bot is in or joining """
+        return len(self.numbers)
+
+    def rooms(self):
+        return [self.name(number) for number in sorted(self.numbers)]
+
+    def name(self, number):
+        # Non-primary rooms start with ##, as specified by irc standards
+        return "#{}_gameroom_{}".format(self.lobby, number).lower()
+
+    def start(self):
+        self.top_up()
+
+    def available(self):
+        return len(self.free) + sum(1 for taken in self.joining.values() if not taken)
+
+    def top_up(self):
+        while self.available() < self.warm:
+            self.open_room(False)
+
+    def open_room(self, taken):
+        number = 1
+        while number in self.numbers or number in self.refused:
+            number += 1
+        self.numbers.add(number)
+        room = self.name(number)
+        self.joining[room] = taken
+        self.join(room)
+        return room
+
+    def take(self, game_name):
+        """ Assigns a room to a game and returns it """
+        room = self.assigned.get(game_name)
+        if room is not None:
+            return room
+        if self.free:
+            # The most recently freed room, so that the oldest ones are the ones that get idle
+            room, _ = self.free.pop()
+        else:
+            room = next((room for room, taken in self.joining.items() if not taken), None)
+            if room is not None:
+                self.joining[room] = True
+            else:
+                room = self.open_room(True)
+        self.assigned[game_name] = room
+        self.top_up()
+        return room
+
+    def release(self, game_name):
+        """ Takes a game's room back. Returns the room """
+        room = self.assigned.pop(game_name)
+        if room in self.joining:
+            self.joining[room] = False
+        else:
+            self.free.append((room, self.clock()))
+        return room
+
+    def joined(self, room):
+        """ The server confirmed that the bot joined room """
+        room = room.lower()
+        taken = self.joining.pop(room, None)
+        if taken is False:
+            self.free.append((room, self.clock()))
+
+    def failed(self, room):
+        """
+        The server refused to let the bot join room. Returns (game name, new room) if a game had it, else None
+        """
+        room = room.lower()
+        taken = self.joining.pop(room, None)
+        if taken is None:
+            return None
+        number = int(room.rsplit("_", 1)[1])
+        self.numbers.discard(number)
+        self.refused.add(number)
+        moved = None
+        if taken:
+            game_name = next(name for name, assigned in self.assigned.items() if assigned == room)
+            self.assigned[game_name] = self.open_room(True)
+            moved = (game_name, self.assigned[game_name])
+        self.top_up()
+        return moved
+
+    def next_deadline(self):
+        """ When the oldest surplus room may be parted, or None """
+        if len(self.free) <= self.warm:
+            return None
+        return self.free[0][1] + self.idle_time
+
+    def maintain(self, now=None):
+        """ Parts the surplus rooms that have been idle for idle_time """
+        if now is None:
+            now = self.clock()
+        while len(self.free) > self.warm and self.free[0][1] + self.idle_time <= now:
+            room, _ = self.free.popleft()
+            self.numbers.discard(int(room.rsplit("_", 1)[1]))
+            self.part(room)
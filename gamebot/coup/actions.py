@@ -1,5 +1,4 @@
 from gamebot.coup.exceptions import GameInvalidOperation
-from gamebot.coup.team import same_team
 from gamebot.game.actions import BaseAction
 
 
@@ -43,12 +42,11 @@ class Income(CoupAction):
     @staticmethod
     def run(game, source_player):
         game.broadcast_message("{} takes income for 1 coin".format(source_player))
-        responses = []
-        game.event_queue.add(Income, responses, source_player)
+        game.event_queue.add(Income, source_player)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        source_player.modify_coins_by_action(1)
+        source_player.modify_cash_by_action(1)
 
 
 @action_register(do_action)
@@ -59,12 +57,11 @@ class ForeignAid(CoupAction):
     @staticmethod
     def run(game, source_player):
         game.broadcast_message("{} takes foreign aid for 2 coins".format(source_player))
-        responses = [Counter]  # TODO: teammates cannot counter
-        game.event_queue.add(ForeignAid, responses, source_player)
+        game.event_queue.add(ForeignAid, source_player)  # TODO: teammates cannot counter
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        source_player.modify_coins_by_action(2)
+        source_player.modify_cash_by_action(2)
 
 
 @action_register(do_action)
@@ -75,12 +72,11 @@ class Tax(CoupAction):
     @staticmethod
     def run(game, source_player):
         game.broadcast_message("{} takes tax for 3 coins".format(source_player))
-        responses = [Challenge]
-        game.event_queue.add(Tax, responses, source_player)
+        game.event_queue.add(Tax, source_player)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        source_player.modify_coins_by_action(3)
+        source_player.modify_cash_by_action(3)
 
 
 @action_register(do_action)
@@ -89,26 +85,24 @@ class Steal(CoupAction):
     description = "Take 2 coins from another player"
 
     @staticmethod
-    def run(game, source_player, target_player):
-        if target_player == source_player:
+    def run(game, source_player, target):
+        if target == source_player:
             raise GameInvalidOperation("Cannot steal from yourself. Choose a different action")
-        if target_player.dead():
-            raise GameInvalidOperation("{} is dead. Choose a different action".format(target_player))
-        if same_team(source_player, target_player):
-            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target_player))
-        if target_player.cash() < 1:
-            raise GameInvalidOperation("{} has no cash. Choose a different action".format(target_player))
-        cash_to_steal = max(target_player.cash(), 2)
-        game.broadcast_message("{} steals {} coins from {}".format(source_player, cash_to_steal, target_player))
-        game.add_message_to_queue(target_player.name, "Please challenge, counter, or accept with .accept")
-        responses = [Challenge, Counter, Accept]
-        game.event_queue.add(Steal, responses, source_player, target=target_player)
+        if target.dead():
+            raise GameInvalidOperation("{} is dead. Choose a different action".format(target))
+        if game.allied(source_player, target):
+            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target))
+        if target.cash() < 1:
+            raise GameInvalidOperation("{} has no cash. Choose a different action".format(target))
+        cash_to_steal = min(target.cash(), 2)
+        game.broadcast_message("{} steals {} coins from {}".format(source_player, cash_to_steal, target))
+        game.event_queue.add(Steal, source_player, target=target)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        cash_to_steal = max(target_player.cash(), 2)
-        source_player.modify_coins_by_action(cash_to_steal)
-        target_player.modify_coins_by_action(-cash_to_steal)
+        cash_to_steal = min(target_player.cash(), 2)
+        source_player.modify_cash_by_action(cash_to_steal)
+        target_player.modify_cash_by_action(-cash_to_steal)
 
 
 @action_register(do_action)
@@ -117,27 +111,20 @@ class Assassinate(CoupAction):
     description = "Pay 3 coins, choose player to lose influence"
 
     @staticmethod
-    def run(game, source_player, target_player, guess=None):
-        if target_player == source_player:
+    def run(game, source_player, target, guess=None):
+        if target == source_player:
             raise GameInvalidOperation("Cannot assassinate from yourself. Choose a different action")
-        if target_player.dead():
-            raise GameInvalidOperation("{} is dead. Choose a different action".format(target_player))
-        if same_team(source_player, target_player):
-            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target_player))
-        source_player.modify_coins(-3)
-        game.broadcast_message("{} assassinates {}".format(source_player, target_player))
-        if len(target_player.available_influence) > 1:
-            game.add_message_to_queue(target_player.name, "Please challenge, counter, or select which card to "
-                                                          "provide with .select 1 or .select 2")
-            responses = [Challenge, Counter, Select]
-        else:
-            game.add_message_to_queue(target_player.name, "Please challenge, counter, or accept with .accept")
-            responses = [Challenge, Counter, Accept]
-        game.event_queue.add(Assassinate, responses, source_player, target=target_player)
+        if target.dead():
+            raise GameInvalidOperation("{} is dead. Choose a different action".format(target))
+        if game.allied(source_player, target):
+            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target))
+        source_player.modify_cash(-3)
+        game.broadcast_message("{} assassinates {}".format(source_player, target))
+        game.event_queue.add(Assassinate, source_player, target=target)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.lose_influence(target_player)
 
 
 @action_register(do_action)
@@ -148,12 +135,11 @@ class ExchangeOne(CoupAction):
     @staticmethod
     def run(game, source_player):
         game.broadcast_message("{} exchanges influence; draws an influence card".format(source_player))
-        responses = [Challenge]
-        game.event_queue.add(ExchangeOne, responses, source_player)
+        game.event_queue.add(ExchangeOne, source_player)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.exchange(source_player, 1)
 
 
 @action_register(do_action)
@@ -164,12 +150,11 @@ class ExchangeTwo(CoupAction):
     @staticmethod
     def run(game, source_player):
         game.broadcast_message("{} exchanges influence; draws two influence cards".format(source_player))
-        responses = [Challenge]
-        game.event_queue.add(ExchangeTwo, responses, source_player)
+        game.event_queue.add(ExchangeTwo, source_player)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.exchange(source_player, 2)
 
 
 @action_register(do_action)
@@ -178,26 +163,19 @@ class Examine(CoupAction):
     description = "Choose player; look at one card, may force Exchange"
 
     @staticmethod
-    def run(game, source_player, target_player):
-        if target_player == source_player:
+    def run(game, source_player, target):
+        if target == source_player:
             raise GameInvalidOperation("Cannot examine from yourself. Choose a different action")
-        if target_player.dead():
-            raise GameInvalidOperation("{} is dead. Choose a different action".format(target_player))
-        if same_team(source_player, target_player):
-            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target_player))
-        game.broadcast_message("{} examines one of {}'s cards".format(source_player, target_player))
-        if len(target_player.available_influence) > 1:
-            game.add_message_to_queue(target_player.name, "Please challenge, counter, or select which card to "
-                                                          "provide with .select 1 or .select 2")
-            responses = [Challenge, Counter, Select]
-        else:
-            game.add_message_to_queue(target_player.name, "Please challenge, counter, or accept with .accept")
-            responses = [Challenge, Counter, Accept]
-        game.event_queue.add(Examine, responses, source_player, target=target_player)
+        if target.dead():
+            raise GameInvalidOperation("{} is dead. Choose a different action".format(target))
+        if game.allied(source_player, target):
+            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target))
+        game.broadcast_message("{} examines one of {}'s cards".format(source_player, target))
+        game.event_queue.add(Examine, source_player, target=target)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.examine(source_player, target_player)
 
 
 @action_register(do_action)
@@ -206,28 +184,20 @@ class Coup(CoupAction):
     description = "Pay 7 coins, choose player to lose influence"
 
     @staticmethod
-    def run(game, source_player, target_player, guess=None):
-        if target_player == source_player:
+    def run(game, source_player, target, guess=None):
+        if target == source_player:
             raise GameInvalidOperation("Cannot coup from yourself. Choose a different action")
-        if target_player.dead():
-            raise GameInvalidOperation("{} is dead. Choose a different action".format(target_player))
-        if same_team(source_player, target_player):
-            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target_player))
-        source_player.modify_coins(-7)
-        game.broadcast_message("{} coups {}".format(source_player, target_player))
-        game.add_message_to_queue(target_player.name, "Please challenge, counter, or accept with .accept")
-        if len(target_player.available_influence) > 1:
-            game.add_message_to_queue(target_player.name, "Please select which card to lose "
-                                                          "with .select 1 or .select 2")
-            responses = [Select]
-        else:
-            game.add_message_to_queue(target_player.name, "Please challenge, counter, or accept with .accept")
-            responses = []
-        game.event_queue.add(Coup, responses, source_player, target=target_player)
+        if target.dead():
+            raise GameInvalidOperation("{} is dead. Choose a different action".format(target))
+        if game.allied(source_player, target):
+            raise GameInvalidOperation("{} is on your team. Choose a different action".format(target))
+        source_player.modify_cash(-7)
+        game.broadcast_message("{} coups {}".format(source_player, target))
+        game.event_queue.add(Coup, source_player, target=target)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.lose_influence(target_player)
 
 
 @action_register(do_action)
@@ -236,17 +206,17 @@ class Convert(CoupAction):
     description = "Change Allegiance.  Place 1 coin yourself or 2 coins for another player on Treasury Reserve"
 
     @staticmethod
-    def run(game, source_player, target_player):
-        if target_player.dead():
-            raise GameInvalidOperation("{} is dead. Choose a different action".format(target_player))
+    def run(game, source_player, target):
+        if target.dead():
+            raise GameInvalidOperation("{} is dead. Choose a different action".format(target))
         cost = 1
-        if target_player != source_player:
+        if target != source_player:
             cost = 2
 
-        source_player.modify_coins(-cost)
-        game.broadcast_message("{} changes {}'s allegiance".format(source_player, target_player))
-        responses = []
-        game.event_queue.add(Convert, responses, source_player, target=target_player)
+        source_player.modify_cash(-cost)
+        game.treasury += cost
+        game.broadcast_message("{} changes {}'s allegiance".format(source_player, target))
+        game.event_queue.add(Convert, source_player, target=target)
 
     @staticmethod
     def do_success(game, source_player, target_player):
@@ -262,12 +232,11 @@ class Embezzle(CoupAction):
     def run(game, source_player):
         coins = game.treasury
         game.broadcast_message("{} takes coins from the treasury.  Gains {} coins.".format(source_player, coins))
-        responses = [Challenge]
-        game.event_queue.add(Embezzle, responses, source_player)
+        game.event_queue.add(Embezzle, source_player)
 
     @staticmethod
     def do_success(game, source_player, target_player):
-        source_player.modify_coin_by_action(game.treasury)
+        source_player.modify_cash_by_action(game.treasury)
         game.treasury = 0
 
 
@@ -279,12 +248,7 @@ class Counter(CoupAction):
 
     @staticmethod
     def run(game, source_player, with_role):
-        responses = [Challenge]
-        game.event_queue.add(Counter, responses, is_response=True)
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.respond(Counter, source_player, with_role=with_role)
 
 
 @action_register(response_action)
@@ -293,13 +257,8 @@ class Challenge(CoupAction):
     description = "Challenge a player's claimed influence"
 
     @staticmethod
-    def run(game, source_player, target_player):
-        responses = []
-        game.event_queue.add(Challenge, responses, is_response=True)
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+    def run(game, source_player, target):
+        game.event_queue.respond(Challenge, source_player, target=target)
 
 
 @action_register(response_action)
@@ -309,12 +268,7 @@ class Accept(CoupAction):
 
     @staticmethod
     def run(game, source_player):
-        responses = []
-        game.event_queue.add(Accept, responses, is_response=True)
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.respond(Accept, source_player)
 
 
 @action_register(response_action)
@@ -324,12 +278,7 @@ class KeepExamine(CoupAction):
 
     @staticmethod
     def run(game, source_player):
-        responses = []
-        game.event_queue.add(KeepExamine, responses, is_response=True)
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.respond(KeepExamine, source_player)
 
 
 @action_register(response_action)
@@ -339,12 +288,7 @@ class ChangeExamine(CoupAction):
 
     @staticmethod
     def run(game, source_player):
-        responses = []
-        game.event_queue.add(ChangeExamine, responses, is_response=True)
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.respond(ChangeExamine, source_player)
 
 
 @action_register(response_action)
@@ -354,12 +298,7 @@ class Select(CoupAction):
 
     @staticmethod
     def run(game, source_player, cards):
-        responses = []
-        game.event_queue.add(Select, responses, is_response=True)
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+        game.event_queue.respond(Select, source_player, cards=cards)
 
 
 # Miscellaneous game actions
@@ -370,11 +309,21 @@ class Status(CoupAction):
 
     @staticmethod
     def run(game, source_player):
-        game.add_message_to_queue(source_player, game.status())
+        game.add_message_to_queue(source_player.name, game.status())
+
+
+@action_register(game_action)
+class Hint(CoupAction):
+    name = "Hint"
+    description = "Guesses which roles the other players hold from what they have claimed and shown"
 
     @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
+    def run(game, source_player):
+        if not game.is_started:
+            raise GameInvalidOperation("The game has not started yet")
+        if game.beliefs is None:
+            raise GameInvalidOperation("Hints are not available: NumPy is not installed")
+        game.add_message_to_queue(source_player.name, game.beliefs.describe(game, source_player))
 
 
 @action_register(game_action)
@@ -385,9 +334,10 @@ class Forfeit(CoupAction):
     @staticmethod
     def run(game, source_player):
         game.broadcast_message("{} has quit".format(source_player))
-        game.to_forfeit.append(source_player)  # Resolved at turn end to prevent oddities
-
-    @staticmethod
-    def do_success(game, source_player, target_player):
-        raise NotImplementedError
-
+        game.instance.unindex_player(source_player.name, game)
+        if not game.is_started:
+            game.remove_player(source_player.name)
+        elif not source_player.dead():
+            source_player.kill()
+            game.player_died(source_player)
+            game.event_queue.player_left(source_player)
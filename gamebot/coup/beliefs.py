@@ -0,0 +1,218 @@
+"""
+Hidden card beliefs.
+
+A BeliefTracker keeps, for every seat of a game, how likely each possible hand is given the public history of the
+game. A hand is a multiset of the roles of the variant, so with five roles there are 15 hands of two cards and 5 of
+one. They are rows of two small count matrices, and the tracker keeps one row of log-likelihoods per seat and hand
+size. Every piece of evidence is a precomputed row added to a seat's row, a single NumPy operation:
+
+  claimed  the player claimed a role (or, for Embezzle, not to hold one). Hands that back the claim keep their
+           weight, the others are scaled by bluff_rate
+  shown    a challenge showed that the player does (or does not) hold one of the roles; the other hands are ruled out
+  revealed the player lost a card. Each one card hand takes the weight of the two card hand it was left from
+  reset    the player drew cards nobody saw, after proving a claim, an exchange or an examination
+
+The deck itself is not part of the rows. probabilities() weighs the hands by how many ways each can be drawn from
+the cards the observer cannot see: the deck built by populate_deck_and_actions less every revealed card and less the
+observer's own hand. Each opponent is weighed against that pool on its own, so the result is per opponent, not joint.
+
+The matrices and the evidence rows only depend on the variant and the deck, so they are built once and shared by
+every game (HandTables); starting a game only allocates its log-likelihoods.
+
+NumPy is optional. Without it games keep no beliefs, and '.hint' says so.
+"""
+import math
+from itertools import combinations_with_replacement
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Weight left to a hand that does not back a claim: roughly how often players bluff
+BLUFF_RATE = 0.3
+# Log-likelihood of a hand a challenge ruled out. Finite, so a seat whose every hand was ruled out is still defined
+IMPOSSIBLE = -50.0
+
+
+def hands(roles, size):
+    """ Every hand of size cards as rows of role counts """
+    return numpy.array([numpy.bincount(hand, minlength=roles)
+                        for hand in combinations_with_replacement(range(roles), size)], dtype=numpy.intp)
+
+
+class HandTables(object):
+    """
+    The tables of a variant and deck, which every game with them shares (see hand_tables):
+
+      hands[size]  count matrix of the hands of size cards
+      holds[size]  whether each hand holds at least one card of each role
+      up[role][i]  the two card hand that one card hand i was left from after role was revealed
+      choose[n, k] C(n, k) for every count n a role can have left and every k a hand can hold
+      evidence     (size, roles, holds, hard, bluff_rate) -> evidence row, filled in as the evidence comes up
+    """
+    def __init__(self, roles, counts):
+        self.roles = roles
+        self.counts = counts
+        self.role_index = dict((role, index) for index, role in enumerate(roles))
+        self.deck = numpy.array(counts, dtype=numpy.intp)
+
+        self.hands = {1: hands(len(roles), 1), 2: hands(len(roles), 2)}
+        self.holds = dict((size, matrix > 0) for size, matrix in self.hands.items())
+
+        by_counts = dict((tuple(row), index) for index, row in enumerate(self.hands[2]))
+        added = numpy.eye(len(roles), dtype=numpy.intp)
+        self.up = [numpy.array([by_counts[tuple(row + added[role])] for row in self.hands[1]], dtype=numpy.intp)
+                   for role in range(len(roles))]
+
+        top = sum(counts) + 1
+        self.choose = numpy.array([[math.comb(n, k) for k in range(3)] for n in range(top)], dtype=numpy.float64)
+        self.evidence = dict()
+
+    def __reduce__(self):
+        # Shared, so a pickled game refers to the tables instead of carrying a copy
+        return hand_tables, (self.roles, self.counts)
+
+    def row(self, size, roles, holds, hard, bluff_rate):
+        key = (size, roles, holds, hard, bluff_rate)
+        row = self.evidence.get(key)
+        if row is None:
+            columns = [self.role_index[role] for role in roles if role in self.role_index]
+            backed = self.holds[size][:, columns].any(axis=1)
+            if not holds:
+                backed = ~backed
+            row = numpy.where(backed, 0.0, IMPOSSIBLE if hard else numpy.log(bluff_rate))
+            self.evidence[key] = row
+        return row
+
+
+# (roles, counts) -> HandTables
+_tables = dict()
+
+
+def hand_tables(roles, counts):
+    tables = _tables.get((roles, counts))
+    if tables is None:
+        tables = _tables[(roles, counts)] = HandTables(roles, counts)
+    return tables
+
+
+class BeliefTracker(object):
+    def __init__(self, game, bluff_rate=BLUFF_RATE):
+        roles = game.rules.cards
+        counts = tuple(game.deck.count(role) for role in roles)
+        self.tables = hand_tables(roles, counts)
+        self.roles = roles
+        self.seat = dict((name, index) for index, name in enumerate(game.players))
+        self.bluff_rate = bluff_rate
+        # size -> one row of log-likelihoods per seat, the only tables of a game's own
+        self.logs = dict((size, numpy.zeros((len(self.seat), len(matrix))))
+                         for size, matrix in self.tables.hands.items())
+
+    @property
+    def role_index(self):
+        return self.tables.role_index
+
+    @property
+    def deck(self):
+        """ Cards per role in the deck the game was dealt from """
+        return self.tables.deck
+
+    def _update(self, player, roles, holds, hard):
+        size = len(player.available_influence)
+        seat = self.seat.get(player.name)
+        if size in self.logs and seat is not None:
+            self.logs[size][seat] += self.tables.row(size, roles, holds, hard, self.bluff_rate)
+
+    # Evidence
+    def claimed(self, player, roles, holds=True):
+        self._update(player, roles, holds, False)
+
+    def shown(self, player, roles, holds):
+        self._update(player, roles, holds, True)
+
+    def revealed(self, player, card):
+        """ player has just lost card, and has one card left """
+        seat = self.seat.get(player.name)
+        if seat is not None and len(player.available_influence) == 1:
+            self.logs[1][seat] = self.logs[2][seat, self.tables.up[self.role_index[card]]]
+
+    def reset(self, player):
+        seat = self.seat.get(player.name)
+        if seat is not None:
+            for logs in self.logs.values():
+                logs[seat] = 0.0
+
+    # Queries
+    def unseen(self, game, observer=None):
+        """ Cards per role that observer cannot see """
+        counts = self.deck.copy()
+        for player in game.players.values():
+            for card in player.revealed_influence:
+                counts[self.role_index[card]] -= 1
+        if observer is not None:
+            for card in observer.available_influence:
+                counts[self.role_index[card]] -= 1
+        return numpy.clip(counts, 0, None)
+
+    def weights(self, size, seats, pool):
+        """ Normalized weights of every hand of size cards for each of seats, drawn from pool """
+        prior = self.tables.choose[pool, self.tables.hands[size]].prod(axis=1)
+        logs = self.logs[size][seats]
+        weights = prior * numpy.exp(logs - logs.max(axis=1, keepdims=True))
+        totals = weights.sum(axis=1, keepdims=True)
+        # Evidence that contradicts the pool (a hand that cannot be drawn any more) falls back on the pool alone
+        weights = numpy.where(totals > 0, weights, prior)
+        return weights / numpy.maximum(weights.sum(axis=1, keepdims=True), 1e-300)
+
+    def probabilities(self, game, observer=None):
+        """ {opponent name: array of the chance they hold at least one card of each role}, for the living opponents """
+        pool = self.unseen(game, observer)
+        result = dict()
+        for size in self.tables.hands:
+            players = [player for player in game.players.values()
+                       if player is not observer and len(player.available_influence) == size
+                       and player.name in self.seat]
+            if not players:
+                continue
+            weights = self.weights(size, [self.seat[player.name] for player in players], pool)
+            for player, chances in zip(players, weights.dot(self.tables.holds[size])):
+                result[player.name] = chances
+        return result
+
+    def draw(self, player, pool, rng):
+        """
+        Removes a hand for player from pool, a list of cards, and returns it. The hand is drawn by the weights of
+        player's hands for the cards in pool, with the random.Random rng
+        """
+        size = len(player.available_influence)
+        counts = numpy.zeros(len(self.roles), dtype=numpy.intp)
+        for card in pool:
+            counts[self.role_index[card]] += 1
+        if size not in self.tables.hands or player.name not in self.seat or counts.sum() < size:
+            return None
+        weights = self.weights(size, [self.seat[player.name]], counts)[0]
+        cumulative = numpy.cumsum(weights)
+        chosen = min(int(numpy.searchsorted(cumulative, rng.random() * cumulative[-1], side='right')),
+                     len(weights) - 1)
+        hand = []
+        for index, count in enumerate(self.tables.hands[size][chosen]):
+            for _ in range(count):
+                card = self.roles[index]
+                pool.remove(card)
+                hand.append(card)
+        return hand
+
+    def describe(self, game, observer, top=3):
+        chances = self.probabilities(game, observer)
+        parts = []
+        for name in game.seats:
+            if name not in chances:
+                continue
+            ranked = sorted(range(len(self.roles)), key=lambda index: -chances[name][index])[:top]
+            parts.append("{0}: {1}".format(name, ", ".join(
+                "{0} {1:.0f}%".format(self.roles[index], 100 * chances[name][index]) for index in ranked)))
+        if not parts:
+            return "Nobody is left to guess about"
+        return "Likely cards. {0}".format("; ".join(parts))
+
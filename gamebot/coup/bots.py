@@ -0,0 +1,190 @@
+"""
+Bot players.
+
+'.start --bots N' seats N BotPlayers before the game starts. A BotService attached to the instance plays them: on every
+checkevents it looks for decisions the bots of its games have to make, and searches each one with
+gamebot.coup.ismcts in a process pool.
+
+A decision has a hard wall-clock budget, think_time, capped at half the game's action_time. Its searches stop at the
+deadline, and the service collects whatever the searches finished by then. A search that had not started by then is
+cancelled, so a busy pool costs the decision quality, not time. The more bots think at once, the fewer and the shorter
+searches each decision gets. The loop is woken at the deadline through next_deadline, and never waits for the pool.
+
+The chosen move is run as a command from the bot's nick through the parser, like a user's command, so it is journaled
+and replayed like one. If the engine rejects it, the next most visited move is tried, then every other option, so a
+bot always answers. Decisions with a single option are answered without a search.
+
+With workers=0 the searches run in the calling process, which then blocks for the budget. The worker processes of
+gamebot.coup.sharding each have a pool of their own. They spawn its processes: a forked process cannot use the
+forkserver of the process it was forked from.
+"""
+import logging
+import multiprocessing
+import random
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from gamebot.coup.ismcts import freeze, move_key, search
+from gamebot.coup.simulation import command_text, pending_decisions
+
+
+class Decision(object):
+    def __init__(self, game, player, deadline, futures):
+        self.game = game
+        self.player = player
+        self.deadline = deadline
+        self.futures = futures
+
+
+def merge_results(results):
+    """ Adds up the visit and win counts of several searches of one decision """
+    merged = dict()
+    for moves, _ in results:
+        for key, (visits, wins) in moves.items():
+            total = merged.get(key, (0, 0))
+            merged[key] = (total[0] + visits, total[1] + wins)
+    return merged
+
+
+class BotService(object):
+    def __init__(self, parser, workers=2, think_time=1.0, grace=0.05, seed=None, start_method='forkserver'):
+        self.parser = parser
+        self.instance = parser.instance
+        self.workers = workers
+        self.think_time = think_time
+        self.grace = grace
+        self.rng = random.Random(seed)
+        # The bot process has threads (logging, statistics), which a forked worker must not inherit mid-operation
+        self.pool = None
+        if workers > 0:
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method))
+            # Starts the worker processes now rather than on the first decision, in the middle of the IRC loop
+            for _ in range(workers):
+                self.pool.submit(int)
+
+        # Names of the games that have bots
+        self.games = set()
+        # bot name -> Decision being searched
+        self.thinking = dict()
+        self.stats = {'decisions': 0, 'searches': 0, 'cancelled': 0, 'iterations': 0, 'fallbacks': 0}
+
+        self.instance.bots = self
+        for game in self.instance.games.values():
+            if any(player.is_bot for player in game.players.values()):
+                self.watch(game)
+
+    def watch(self, game):
+        self.games.add(game.name)
+
+    def next_deadline(self):
+        if not self.thinking:
+            return None
+        return min(decision.deadline for decision in self.thinking.values()) + self.grace
+
+    def poll(self, now):
+        for name, decision in list(self.thinking.items()):
+            if now >= decision.deadline + self.grace or all(future.done() for future in decision.futures):
+                del self.thinking[name]
+                self.decide(decision)
+
+        # Answering one decision may give a bot the next one right away
+        waiting = True
+        while waiting:
+            waiting = False
+            for name in list(self.games):
+                game = self.instance.games.get(name)
+                if game is None or game.is_finished:
+                    self.games.discard(name)
+                    continue
+                for player, options in pending_decisions(game):
+                    if player.is_bot and player.name not in self.thinking and self.think(game, player, options, now):
+                        # The game moved on, so its other decisions are out of date
+                        waiting = True
+                        break
+
+    def think(self, game, player, options, now):
+        """ Starts searching a decision. Returns True if it was answered right away """
+        self.stats['decisions'] += 1
+        if len(options) == 1:
+            return self.play(game, player, [])
+
+        deadline = now + min(self.think_time, game.action_time / 2.0)
+        data = freeze(game)
+        if self.pool is None:
+            result = search(data, player.name, deadline, self.rng.getrandbits(64))
+            self.stats['searches'] += 1
+            self.stats['iterations'] += result[1]
+            return self.play(game, player, self.ranked([result]))
+
+        # With more decisions than workers, the searches queue up; shorter ones let the later decisions search too
+        concurrent = len(self.thinking) + 1
+        searches = max(1, self.workers // concurrent)
+        budget = (deadline - now) * min(1.0, float(self.workers) / concurrent)
+        try:
+            futures = [self.pool.submit(search, data, player.name, deadline, self.rng.getrandbits(64), budget)
+                       for _ in range(searches)]
+        except BrokenProcessPool:
+            logging.exception("The search pool is broken, %s plays without searching", player.name)
+            return self.play(game, player, [])
+        self.thinking[player.name] = Decision(game, player, deadline, futures)
+        return False
+
+    def decide(self, decision):
+        results = []
+        for future in decision.futures:
+            if not future.done():
+                future.cancel()
+                self.stats['cancelled'] += 1
+                continue
+            try:
+                result = future.result()
+            except CancelledError:
+                self.stats['cancelled'] += 1
+                continue
+            except Exception:
+                logging.exception("Search for %s failed", decision.player.name)
+                continue
+            self.stats['searches'] += 1
+            self.stats['iterations'] += result[1]
+            results.append(result)
+        if self.instance.games.get(decision.game.name) is decision.game:
+            self.play(decision.game, decision.player, self.ranked(results))
+
+    @staticmethod
+    def ranked(results):
+        merged = merge_results(results)
+        return sorted(merged, key=lambda key: merged[key][0], reverse=True)
+
+    def play(self, game, player, ranked):
+        """
+        Runs the best ranked move that is still open to player, falling back on any other option. Returns True if a
+        move was made
+        """
+        options = None
+        for decider, decider_options in pending_decisions(game):
+            if decider is player:
+                options = decider_options
+        if options is None:
+            # The deadline passed while the bot was thinking
+            return False
+
+        by_key = dict((move_key(*option), option) for option in options)
+        candidates = [by_key[key] for key in ranked if key in by_key]
+        fallback = [option for option in options if option not in candidates]
+        for number, option in enumerate(candidates + fallback):
+            response = self.parser.parse_input({'nick': player.name, 'command': command_text(*option)})
+            if response is None or not response.startswith("Error:"):
+                if number >= len(candidates):
+                    self.stats['fallbacks'] += 1
+                return True
+        logging.error("Bot %s found no move it could make", player.name,
+                      extra={'nick': player.name, 'game': game.name})
+        return False
+
+    def close(self):
+        for decision in self.thinking.values():
+            for future in decision.futures:
+                future.cancel()
+        self.thinking.clear()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
@@ -7,10 +7,11 @@ Players may create a game by sending a message to coup-bot in the following synt
 
 The game's creator may start the game by issuing the following message to coup-bot:
 
-  start <name>
+  start <name> [--bots <count>]
 
   * start requests may fail if there are not enough players or there is not a game
     with the provided name
+  * --bots fills that many empty seats with bot players first
 
 Any player may join a game by sending the following message to coup-bot:
 
@@ -38,6 +39,10 @@ Once a player is in a game, they may do any of the following commands on their t
 
   status [player]
 
+  hint
+
+  * hint guesses which roles each other player holds from what they have claimed, shown and lost so far
+
   do <action>
     where <action> can be any one of the following:
 
@@ -67,9 +72,12 @@ Once a player is in a game, they may do any of the following commands on their t
 
 A player loses once they have lost all of their influence. At this point, they may leave to join another game.
 """
+from argparse import Namespace
+
 from gamebot.coup.exceptions import InvalidCLICommand, GameNotFoundException, CoupException, MalformedCLICommand
 from gamebot.coup.events import completion
 from gamebot.coup.commands import command_list
+from gamebot.coup.dispatch import DispatchTable
 from gamebot.coup.parsers import command_parser
 
 
@@ -77,24 +85,30 @@ class CoupCLIParser(object):
     def __init__(self, instance):
         self.recognized_base_actions = command_list
 
-        self.recognized_game_actions = ['do', 'challenge', 'counter', 'accept', 'status', 'forfeit']
+        self.recognized_game_actions = ['do', 'challenge', 'counter', 'accept', 'keep', 'change', 'select', 'status',
+                                        'hint', 'forfeit']
+
+        handlers = dict((name, command) for name, command in command_list.items())
+        handlers.update((name, None) for name in self.recognized_game_actions)
+        self.dispatch = DispatchTable(command_parser, handlers)
 
         self.instance = instance
 
-    @staticmethod
-    def complete_command(arguments, game_active):
+    def complete_command(self, arguments, game_active):
         try:
-            command_namespace = command_parser.parse_args(arguments)
+            values = self.dispatch.parse(arguments)
         except MalformedCLICommand as e:
             # TODO: Attempt to resolve by command completion
             raise e
 
-        return command_namespace
+        return values
 
     def parse_input(self, message):
         arguments = message['command'].lower().split()
 
         user = message['nick']
+        if self.instance.recorder is not None:
+            self.instance.recorder.command(user, message['command'])
         try:
             game = self.instance.find_user_game(user)
             game_active = game.is_started
@@ -103,14 +117,14 @@ class CoupCLIParser(object):
             game_active = False
 
         try:
-            command_namespace = self.complete_command(arguments, game_active)
-            action = command_namespace.command
+            additional = self.complete_command(arguments, game_active)
+            action = additional['command']
             if action in self.recognized_base_actions:
-                ret = self.recognized_base_actions[action].run(self.instance, user, arguments[1:])
+                del additional['command']
+                ret = self.dispatch.lookup(action).process_args(self.instance, user, Namespace(**additional))
             elif action in self.recognized_game_actions:
                 if game is None:
                     raise GameNotFoundException("You are not in a game and cannot use {}".format(action))
-                additional = vars(command_namespace)
                 if 'target' in additional:
                     additional['target'] = game.find_player_by_name(additional['target'])
                 player = game.find_player_by_name(user)
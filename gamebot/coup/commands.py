@@ -4,7 +4,7 @@ from six import with_metaclass
 
 from gamebot.coup.parsers import create_parser, start_parser, join_parser, list_parser, stats_parser, help_parser
 from gamebot.coup.exceptions import GamePermissionError, InvalidCLICommand, MalformedCLICommand, GameInvalidOperation
-from gamebot.coup.player import Player
+from gamebot.coup.player import BotPlayer, Player
 from gamebot.coup.game import CoupGame
 from gamebot.coup.actions import do_action, response_action, game_action
 
@@ -70,6 +70,22 @@ class Start(BaseCommand):
         if not game.is_creator(user):
             raise GamePermissionError("Only the owner of the game may start the game")
 
+        if args.bots is not None:
+            if not args.bots.isdigit():
+                raise MalformedCLICommand("--bots takes a number of bot players")
+            if game.is_started:
+                raise GameInvalidOperation("Game already started.")
+            count = int(args.bots)
+            if count > game.max_players - len(game.players):
+                raise GameInvalidOperation("Only {0} more players fit in this game".format(
+                    game.max_players - len(game.players)))
+            # After the bots of an earlier start that did not go through
+            first = sum(1 for player in game.players.values() if player.is_bot) + 1
+            for number in range(first, first + count):
+                game.add_player(BotPlayer("{0}.bot{1}".format(game.name, number)), game.password)
+            if instance.bots is not None:
+                instance.bots.watch(game)
+
         game.start()
         return "Game '{0}' started".format(game.name)
 
@@ -121,13 +137,13 @@ class Help(BaseCommand):
                 output_list.append(" "*3 + command.usage())
             output_list.append("In-game actions:")
             output_list.append("   Turn actions:")
-            for action in do_action:
+            for _, action in do_action:
                 output_list.append(" "*6 + ".do " + action.name.lower().replace(" ", "_"))
             output_list.append("   Response actions:")
-            for action in response_action:
+            for _, action in response_action:
                 output_list.append(" "*6 + "." + action.name.lower().replace(" ", "_"))
             output_list.append("   Game actions:")
-            for action in game_action:
+            for _, action in game_action:
                 output_list.append(" "*6 + "." + action.name.lower().replace(" ", "_"))
             return "\n".join(output_list)
         else:
@@ -0,0 +1,173 @@
+"""
+Precompiled command dispatch.
+
+The argparse parsers in gamebot.coup.parsers remain the single definition of the command syntax, but running argparse
+for every chat message is expensive. compile_parser walks a parser once and produces a CommandSpec: a flat table of
+positionals, option strings, defaults and subcommands. CommandSpec.parse tokenizes nothing and builds no Namespace;
+it assigns the already split words straight into a dictionary of values.
+
+The fast path only accepts input whose meaning is unambiguous. Anything else (unknown or abbreviated options, '--',
+values that look like options, wrong arity, conflicting exclusive options, ...) falls back to the original argparse
+parser, so accepted commands produce exactly the values argparse would have produced and rejected commands produce
+exactly the same error text from ThrowingArgumentParser.
+"""
+import argparse
+
+
+class _Fallback(Exception):
+    pass
+
+
+_STORE = object()
+
+
+class CommandSpec(object):
+    __slots__ = ('positionals', 'options', 'groups', 'defaults', 'subdest', 'subcommands', 'simple_positionals')
+
+    def __init__(self):
+        self.positionals = []
+        self.options = {}
+        self.groups = {}
+        self.defaults = {}
+        self.subdest = None
+        self.subcommands = None
+        self.simple_positionals = True
+
+    def parse(self, tokens, values):
+        """ Assigns tokens into values. Raises _Fallback if argparse has to decide """
+        values.update(self.defaults)
+
+        if self.subcommands is not None:
+            if not tokens or tokens[0] not in self.subcommands:
+                raise _Fallback
+            values[self.subdest] = tokens[0]
+            self.subcommands[tokens[0]].parse(tokens[1:], values)
+            return
+
+        options = self.options
+        positional_tokens = []
+        seen_groups = None
+        index = 0
+        count = len(tokens)
+        while index < count:
+            token = tokens[index]
+            if token[0] != '-':
+                positional_tokens.append(token)
+                index += 1
+                continue
+
+            if token not in options or not self.simple_positionals:
+                raise _Fallback
+            dest, const = options[token]
+            group = self.groups.get(dest)
+            if group is not None:
+                if seen_groups is None:
+                    seen_groups = {}
+                if seen_groups.setdefault(group, dest) != dest:
+                    raise _Fallback
+            if const is _STORE:
+                index += 1
+                if index == count or tokens[index][0] == '-':
+                    raise _Fallback
+                values[dest] = tokens[index]
+            else:
+                values[dest] = const
+            index += 1
+
+        self._assign_positionals(positional_tokens, values)
+
+    def _assign_positionals(self, tokens, values):
+        positionals = self.positionals
+        # Tokens still needed by the positionals that follow each position
+        required_after = [0] * (len(positionals) + 1)
+        for index in range(len(positionals) - 1, -1, -1):
+            nargs = positionals[index][1]
+            required_after[index] = required_after[index + 1] + (1 if nargs is None or nargs == '+' else 0)
+
+        if len(tokens) < required_after[0]:
+            raise _Fallback
+
+        position = 0
+        for index, (dest, nargs) in enumerate(positionals):
+            available = len(tokens) - position - required_after[index + 1]
+            if nargs is None:
+                values[dest] = tokens[position]
+                position += 1
+            elif nargs == '?':
+                if available > 0:
+                    values[dest] = tokens[position]
+                    position += 1
+            else:
+                values[dest] = tokens[position:position + available]
+                position += available
+
+        if position != len(tokens):
+            raise _Fallback
+
+
+def compile_parser(parser):
+    """ Builds a CommandSpec from an argparse parser and its subparsers """
+    spec = CommandSpec()
+
+    for group_number, group in enumerate(parser._mutually_exclusive_groups):
+        for action in group._group_actions:
+            spec.groups[action.dest] = group_number
+
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            spec.subdest = action.dest
+            spec.subcommands = dict((name, compile_parser(subparser)) for name, subparser in action.choices.items())
+            spec.defaults[action.dest] = action.default
+            continue
+
+        if action.type is not None or action.choices is not None:
+            raise TypeError("Cannot precompile argument {}".format(action.dest))
+
+        if action.dest is not argparse.SUPPRESS:
+            spec.defaults[action.dest] = action.default
+
+        if action.option_strings:
+            if isinstance(action, argparse._StoreConstAction):
+                const = action.const
+            elif isinstance(action, argparse._StoreAction) and action.nargs is None:
+                const = _STORE
+            else:
+                raise TypeError("Cannot precompile option {}".format(action.dest))
+            for option_string in action.option_strings:
+                spec.options[option_string] = (action.dest, const)
+        else:
+            if action.nargs not in (None, '?', '+', '*'):
+                raise TypeError("Cannot precompile argument {}".format(action.dest))
+            spec.positionals.append((action.dest, action.nargs))
+
+    spec.defaults.update(parser._defaults)
+
+    if spec.options and any(nargs is not None for _, nargs in spec.positionals):
+        # argparse's handling of variable length positionals around options is subtle; leave those to argparse
+        spec.simple_positionals = False
+
+    return spec
+
+
+class DispatchTable(object):
+    """
+    Maps each command word to its handler and parses a split command line exactly once.
+
+    handlers maps command names to whatever the caller wants back for them (e.g. a command class)
+    """
+    def __init__(self, parser, handlers):
+        self.parser = parser
+        self.spec = compile_parser(parser)
+        self.handlers = dict(handlers)
+
+    def parse(self, arguments):
+        """ Returns the dictionary of parsed values for a split command line """
+        values = {}
+        try:
+            self.spec.parse(arguments, values)
+        except _Fallback:
+            values = vars(self.parser.parse_args(arguments))
+        return values
+
+    def lookup(self, command):
+        return self.handlers.get(command)
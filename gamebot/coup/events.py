@@ -1,5 +1,6 @@
 import time
 
+from gamebot.coup import resolution
 from gamebot.coup.exceptions import GameInvalidOperation
 
 
@@ -15,25 +16,72 @@ def completion(query_str, possible):
 
 
 class EventQueue(object):
-    def __init__(self, default_timeout=30):
-        self.queue = []
+    """
+    Front end of the turn resolution state machine (gamebot.coup.resolution) for one game.
+
+    Turn actions are declared with add(), responses are routed with respond() and the phase deadline fires trigger()
+    through the instance's TimerService.
+    """
+    def __init__(self, default_timeout=30, timers=None, key=None, game=None):
+        self.state = resolution.TurnState()
         self.default_timeout = default_timeout
         self.next_event = None
+        # The instance's TimerService fires trigger() once next_event is due
+        self.timers = timers
+        self.key = key
+        self.game = game
+
+    @property
+    def phase(self):
+        return self.state.phase
 
-    def add(self, action, responses, source, target=None, timeout=None, is_response=False):
-        if self.queue and not is_response:
+    def expect_idle(self):
+        """ Raises unless a turn action may be declared. '.do' calls it before the action announces itself or pays """
+        if self.state.phase != resolution.IDLE:
             raise GameInvalidOperation("Primary action already done this turn")
-        if not self.queue and is_response:
-            raise GameInvalidOperation("Primary action not yet done this turn")
 
-        if not is_response:
-            if timeout is None:
-                timeout = self.default_timeout
-            if not responses:
-                timeout = 0
-            self.next_event = time.time() + timeout
-            self.queue.append((action))
+    def add(self, action, source, target=None):
+        self.expect_idle()
+        resolution.declare(self.game, self.state, action, source, target)
 
-    def trigger(self):
-        pass
+    def respond(self, response, player, **arguments):
+        state = self.state
+        handler = resolution.transitions.get((state.phase, state.action, response))
+        if handler is None:
+            if state.phase == resolution.IDLE:
+                raise GameInvalidOperation("Primary action not yet done this turn")
+            raise GameInvalidOperation("You cannot use {0} right now".format(response.command_name()))
+        handler(self.game, state, player, **arguments)
+
+    def lose_influence(self, player):
+        resolution.lose_influence(self.game, self.state, player, resolution.END_TURN)
+
+    def exchange(self, player, count):
+        resolution.begin_exchange(self.game, self.state, player, count)
+
+    def examine(self, source, target):
+        resolution.begin_examine(self.game, self.state, source, target)
+
+    def player_left(self, player):
+        resolution.player_left(self.game, self.state, player)
 
+    def schedule_timeout(self, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        self.schedule(time.time() + timeout)
+
+    def schedule(self, when):
+        self.next_event = when
+        if self.timers is not None:
+            self.timers.schedule(self.key, when, self.trigger)
+
+    def cancel(self):
+        self.next_event = None
+        if self.timers is not None:
+            self.timers.cancel(self.key)
+
+    def trigger(self):
+        self.next_event = None
+        handler = resolution.timeouts.get(self.state.phase)
+        if handler is not None:
+            handler(self.game, self.state)
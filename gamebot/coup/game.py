@@ -28,13 +28,15 @@ import random
 from collections import OrderedDict
 
 from gamebot.game import BaseGame
+from gamebot.game.seating import SeatRing
 from gamebot.game.instance import BaseInstance
 
-from gamebot.coup.influence import ambassador, assassin, contessa, captain, duke, inquisitor
-from gamebot.coup.actions import Income, ForeignAid, Coup, Embezzle, Convert
+from gamebot.coup.actions import Coup
+from gamebot.coup.beliefs import BeliefTracker, numpy
 from gamebot.coup.exceptions import GameInvalidOperation
-from gamebot.coup.actions import response_action, game_action
 from gamebot.coup.events import EventQueue
+from gamebot.coup.rules import rule_variant
+from gamebot.coup.team import Team, same_team
 
 
 class CoupGame(BaseGame):
@@ -49,38 +51,31 @@ class CoupGame(BaseGame):
         if parameters.teams:
             self.treasury = 0
 
-        self.inquisitor = parameters.inquisitor
+        # --amb leaves the (default) inquisitor flag set, so it has to take precedence
+        self.inquisitor = parameters.inquisitor and not getattr(parameters, 'ambassador', False)
         self.teams = parameters.teams  # Todo: To implement
         self.guessing = parameters.guessing  # Todo: To implement
+        self.rules = rule_variant(self.inquisitor, self.teams, self.guessing)
 
         self.action_time = 30
-        self.event_queue = EventQueue(self.action_time)
-        self.to_forfeit = []
+        self.event_queue = EventQueue(self.action_time, instance.timers, self.name, game=self)
+        self.is_finished = False
+        self.winner = None
+        self.rng = random.Random(instance.rng.getrandbits(64))
+        # What the table can infer about every hand, when NumPy is available (gamebot.coup.beliefs)
+        self.beliefs = None
 
     def populate_deck_and_actions(self):
-        cards = [contessa, duke, captain, assassin]
-        self.valid_player_actions = [Income, ForeignAid, Coup]
+        self.valid_player_actions = self.rules.player_actions
 
-        if self.inquisitor:
-            cards.append(inquisitor)
-        else:
-            cards.append(ambassador)
-
-        if self.teams:
-            self.valid_player_actions.extend([Embezzle, Convert])
-
-        for card in cards:
-            num_cards_each = 3
-            if 6 < len(self.players) <= 8:
-                num_cards_each = 4
-            elif len(self.players) > 8:
-                num_cards_each = 5
-
-            for x in range(0, num_cards_each):
-                self.deck.append(card)
+        num_cards_each = 3
+        if 6 < len(self.players) <= 8:
+            num_cards_each = 4
+        elif len(self.players) > 8:
+            num_cards_each = 5
 
-            for action in card.actions:
-                    self.valid_player_actions.append(action)
+        for card in self.rules.cards:
+            self.deck.extend([card] * num_cards_each)
 
     def start(self):
         if len(self.players) < 2:
@@ -88,15 +83,21 @@ class CoupGame(BaseGame):
 
         # Randomize player order
         player_items = list(self.players.items())
-        random.shuffle(player_items)
+        self.rng.shuffle(player_items)
         self.players = OrderedDict(player_items)
-        self.current_player = 0
+        self.seats = SeatRing(self.players)
+
+        if self.teams:
+            for number, player in enumerate(self.players.values()):
+                player.set_team(Team.REFORMIST if number % 2 == 0 else Team.LOYALIST)
 
         # create the deck
         self.populate_deck_and_actions()
+        if numpy is not None:
+            self.beliefs = BeliefTracker(self)
 
         # shuffle the deck
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
         # deal each player two cards
         for _, player in self.players.items():
@@ -116,71 +117,74 @@ class CoupGame(BaseGame):
 
         self.add_message_to_queue(self.current_player_name(), "You are the first player. Please choose an action.")
 
-    def long_name(self):
-        if self.password is None:
-            return self.name
-
-        return "{0} (private)".format(self.name)
-
     def get_action_by_name(self, name):
-        for action in self.valid_player_actions:
-            if name.lower() == action.command_name():
-                return action
-        raise GameInvalidOperation("You have picked an invalid option. "
-                                   "Please choose from {0}.".format(", ".join(self.valid_player_actions.command_name())))
-
-    def find_player_by_name(self, name):
-        if name not in self.players.keys():
-            raise GameInvalidOperation("You are not part of this game.")
-
-        return self.players[name]
-
-    def my_turn(self, user):
-        return user == list(self.players.items())[self.current_player][0]
-
-    def advance_to_next_player(self):
-        self.current_player = (self.current_player + 1) % len(self.players)
-
-    def progress_to_next_turn(self):
-        # TODO: remove forfeit players
-        alive_players = [x for x in self.players if not x.dead()]
-
-        if len(alive_players) == 1:
-            for player in self.players:
-                self.add_message_to_queue(player.name, "Player {0} has won!".format(alive_players[0]))
-        else:
-            self.advance_to_next_player()
-            while self.players[self.current_player_name()].dead():
-                print("{0} is dead... skipping".format(self.current_player_name()))
-                self.advance_to_next_player()
-
-            self.add_message_to_queue(self.current_player_name(), "It is your turn. Please choose an action.")
+        action = self.rules.actions.get(name.lower())
+        if action is None:
+            raise GameInvalidOperation("You have picked an invalid option. "
+                                       "Please choose from {0}.".format(self.rules.action_choices))
+        return action
+
+    def allied(self, player, other):
+        """ Teammates may not target each other, unless every remaining player is on the same team """
+        if not self.teams or not same_team(player, other):
+            return False
+        return any(self.players[name].team != player.team for name in self.seats)
+
+    def player_died(self, player):
+        self.eliminate_player(player.name)
+        if len(self.seats) == 1 and not self.is_finished:
+            self.finish(self.players[next(iter(self.seats))])
+
+    def finish(self, winner):
+        self.is_finished = True
+        self.winner = winner
+        self.event_queue.cancel()
+        for name in self.players:
+            self.add_message_to_queue(name, "Player {0} has won!".format(winner))
+        self.broadcast_message("Player {0} has won!".format(winner))
+        self.instance.finish_game(self)
 
     def face_up_cards(self):
         face_up = list()
-        for player in self.players:
-            face_up.extend(player.face_up_cards())
+        for player in self.players.values():
+            face_up.extend(str(card) for card in player.face_up_cards())
 
         return ", ".join(face_up)
 
     def run_command(self, action, player, arguments):
-        if action.lower() == 'do':
+        if action == 'do':
+            if not self.is_started:
+                raise GameInvalidOperation("The game has not started yet")
             if not self.my_turn(player.name):
                 raise GameInvalidOperation("Not your turn")
+            # Before the action announces itself or takes payment
+            self.event_queue.expect_idle()
             actionvar = self.get_action_by_name(arguments['do'])
-            if actionvar not in self.valid_player_actions:
-                raise GameInvalidOperation("Action not available given current rules")
-        elif action in dict(response_action):
-            actionvar = dict(response_action)[action]
-        elif action in dict(game_action):
-            actionvar = dict(game_action)[action]
+            if player.cash() >= 10 and actionvar is not Coup:
+                raise GameInvalidOperation("You have 10 or more coins and must coup")
         else:
-            raise GameInvalidOperation
+            actionvar = self.rules.commands.get(action)
+            if actionvar is None:
+                raise GameInvalidOperation
         additional = {x: y for x, y in arguments.items() if x not in ('command', 'do')}
         actionvar.run(self, player, **additional)
 
     def status(self):
-        return "Status not implemented"  # TODO
+        if not self.is_started:
+            return "Waiting for players: {0}".format(", ".join(self.players))
+
+        players = []
+        for name in self.seats:
+            player = self.players[name]
+            players.append("{0} ({1} coins, {2} influence)".format(name, player.cash(), player.influence_remaining()))
+        status = "Turn: {0}. Players: {1}".format(self.current_player_name(), ", ".join(players))
+
+        face_up = self.face_up_cards()
+        if face_up:
+            status += ". Revealed: {0}".format(face_up)
+        if self.teams:
+            status += ". Treasury: {0}".format(self.treasury)
+        return status
 
 
 class Instance(BaseInstance):
@@ -16,6 +16,10 @@ class Influence(object):
     def short_description(self):
         return self.name
 
+    def __reduce__(self):
+        # Cards are compared by identity, so an unpickled card has to be the module's own instance
+        return self.name.lower()
+
     def __repr__(self):
         return self.__str__()
 
@@ -27,4 +31,6 @@ duke = Influence("Duke", actions=[Tax], counteractions=[ForeignAid])
 captain = Influence("Captain", actions=[Steal], counteractions=[Steal])
 ambassador = Influence("Ambassador", actions=[ExchangeTwo], counteractions=[Steal])
 assassin = Influence("Assassin", actions=[Assassinate], counteractions=[])
-inquisitor = Influence("Inquisitor", actions=[ExchangeOne, Examine], counteractions=[Steal])
\ No newline at end of file
+inquisitor = Influence("Inquisitor", actions=[ExchangeOne, Examine], counteractions=[Steal])
+
+roles = (contessa, duke, captain, ambassador, assassin, inquisitor)
@@ -0,0 +1,243 @@
+"""
+Information set Monte Carlo tree search for bot players.
+
+The search plays the real engine forward: freeze() pickles a game without its instance, and every iteration of search()
+thaws a copy of it into an Instance of its own, with no other games and a NullSink for outbound events. Unpickling is
+the cheapest full copy of a game there is; gamebot.coup.state.PackedState is smaller still, but it only holds the board
+between turns and not the resolution of a turn in progress, the beliefs or the seat order, which a search that starts in
+the middle of a challenge needs. Each iteration first determinizes the copy for the observer: every card the observer
+cannot see (the court deck, the other players' hands and another player's exchange draw) is shuffled and dealt out again
+in the same counts. When the game keeps beliefs (gamebot.coup.beliefs), the other players' hands are drawn by how well
+they fit their claims. It then walks one tree shared by all determinizations (single observer ISMCTS). Each step asks
+gamebot.coup.simulation.pending_decisions who has a move, and picks among the moves that are legal in this
+determinization by UCB1, counting a child as available whenever it was legal. Moves the engine rejects are dropped for
+the step. The first move that is not in the tree yet is added, and from there the game is played out with random moves.
+Every node on the path gets a win if the player who made its move won the playout.
+
+search() runs until a wall-clock deadline and returns the visit and win counts of the observer's moves at the root, so
+several searches of the same decision, e.g. in different processes, can be merged by adding them up.
+"""
+import io
+import math
+import pickle
+import random
+import time
+
+from gamebot.coup import resolution
+from gamebot.coup.exceptions import CoupException
+from gamebot.coup.game import Instance
+from gamebot.coup.simulation import NullSink, pending_decisions
+
+
+def move_key(action, arguments):
+    """ A hashable form of an (action, arguments) move that does not depend on the game it was made in """
+    items = []
+    for name, value in sorted(arguments.items()):
+        if name == 'command':
+            continue
+        if isinstance(value, list):
+            value = tuple(value)
+        elif hasattr(value, 'name'):
+            value = value.name
+        items.append((name, value))
+    return action, tuple(items)
+
+
+class _SandboxPickler(pickle.Pickler):
+    """ Pickles a game without its instance, which thaw() replaces with one of its own """
+
+    def __init__(self, file, game):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.instance = game.instance
+
+    def persistent_id(self, obj):
+        if obj is self.instance:
+            return 'instance'
+        if obj is self.instance.timers:
+            return 'timers'
+        return None
+
+
+class _SandboxUnpickler(pickle.Unpickler):
+    def __init__(self, file, instance):
+        pickle.Unpickler.__init__(self, file)
+        self.instance = instance
+
+    def persistent_load(self, pid):
+        if pid == 'instance':
+            return self.instance
+        return self.instance.timers
+
+
+def freeze(game):
+    """ The pickled sandbox of game, taken in one pass without copying game first """
+    users = [name for name in game.players if game.instance.user_games.get(name) is game]
+    buffer = io.BytesIO()
+    _SandboxPickler(buffer, game).dump((game, users))
+    return buffer.getvalue()
+
+
+def thaw(data):
+    """ A new sandbox from freeze()'s data """
+    instance = Instance(seed=0)
+    instance.msgqueue = NullSink()
+    game, users = _SandboxUnpickler(io.BytesIO(data), instance).load()
+    instance.games[game.name] = game
+    for name in users:
+        instance.user_games[name] = game
+    return game
+
+
+def sandbox(game):
+    """ A copy of game in an Instance of its own, which shares nothing with game's instance """
+    return thaw(freeze(game))
+
+
+def determinize(game, observer, rng):
+    """ Deals out again every card observer cannot see """
+    state = game.event_queue.state
+    known = set([observer])
+    if state.phase == resolution.EXAMINE_DECIDE and state.actor.name == observer:
+        # The examiner has seen one of the target's cards; leaving the whole hand alone is close enough
+        known.add(state.target.name)
+
+    opponents = [player for name, player in game.players.items() if name not in known]
+    hands = [player.available_influence for player in opponents]
+    if state.drawn and (state.chooser is None or state.chooser.name != observer):
+        hands.append(state.drawn)
+    hands.append(game.court_deck)
+
+    pool = [card for hand in hands for card in hand]
+    rng.shuffle(pool)
+    if game.beliefs is not None:
+        # Opponents get hands that fit what they have claimed and shown; the rest is dealt at random
+        dealt = []
+        rng.shuffle(opponents)
+        for player in opponents:
+            hand = game.beliefs.draw(player, pool, rng)
+            if hand is not None:
+                player.available_influence[:] = hand
+                dealt.append(player.available_influence)
+        hands = [hand for hand in hands if not any(hand is other for other in dealt)]
+    position = 0
+    for hand in hands:
+        count = len(hand)
+        hand[:] = pool[position:position + count]
+        position += count
+
+
+class Node(object):
+    __slots__ = ('player', 'move', 'children', 'visits', 'wins', 'available')
+
+    def __init__(self, player=None, move=None):
+        self.player = player
+        self.move = move
+        self.children = dict()
+        self.visits = 0
+        self.wins = 0
+        self.available = 0
+
+
+def _play(game, player, options, pick):
+    """ Runs the move pick(options) returns, dropping moves the engine rejects. Returns the move or None """
+    while options:
+        choice = pick(options)
+        action, arguments = choice
+        try:
+            game.run_command(action, player, dict(arguments))
+        except CoupException:
+            options.remove(choice)
+            continue
+        return choice
+    return None
+
+
+def _wait(game):
+    """ Lets the phase deadline pass when nobody has a move. Returns False if nothing is waiting on one """
+    if game.event_queue.phase not in resolution.timeouts:
+        return False
+    game.event_queue.trigger()
+    return True
+
+
+def iterate(game, root, observer, rng, exploration, max_moves):
+    """ Runs one iteration on a determinized game and updates the tree """
+    path = []
+    node = root
+    in_tree = True
+    moves = 0
+    while not game.is_finished and moves < max_moves:
+        decisions = pending_decisions(game)
+        if not decisions:
+            if not _wait(game):
+                break
+            continue
+        if node is root and not path:
+            decisions = [decision for decision in decisions if decision[0].name == observer]
+            if not decisions:
+                break
+        player, options = decisions[rng.randrange(len(decisions))]
+        options = list(options)
+        moves += 1
+
+        if not in_tree:
+            if _play(game, player, options, rng.choice) is None:
+                break
+            continue
+
+        def select(candidates):
+            keys = [(player.name, move_key(*candidate)) for candidate in candidates]
+            untried = [candidate for candidate, key in zip(candidates, keys) if key not in node.children]
+            if untried:
+                return rng.choice(untried)
+            best = None
+            best_score = None
+            for candidate, key in zip(candidates, keys):
+                child = node.children[key]
+                score = child.wins / child.visits + exploration * math.sqrt(
+                    math.log(max(child.available, 1)) / child.visits)
+                if best_score is None or score > best_score:
+                    best, best_score = candidate, score
+            return best
+
+        choice = _play(game, player, options, select)
+        if choice is None:
+            break
+        for candidate in options:
+            child = node.children.get((player.name, move_key(*candidate)))
+            if child is not None:
+                child.available += 1
+        key = (player.name, move_key(*choice))
+        child = node.children.get(key)
+        if child is None:
+            child = Node(player.name, key[1])
+            child.available = 1
+            node.children[key] = child
+            in_tree = False
+        path.append(child)
+        node = child
+
+    winner = game.winner.name if game.is_finished else None
+    for node in path:
+        node.visits += 1
+        if node.player == winner:
+            node.wins += 1
+
+
+def search(data, observer, deadline, seed, budget=None, exploration=0.7, max_moves=200, max_iterations=None):
+    """
+    Searches the decision observer has in freeze()'s data until deadline (a time.time() value), or for at most
+    budget seconds from when it starts. Returns ({move key: (visits, wins)} for observer's moves, iterations)
+    """
+    if budget is not None:
+        deadline = min(deadline, time.time() + budget)
+    rng = random.Random(seed)
+    root = Node()
+    iterations = 0
+    while time.time() < deadline and (max_iterations is None or iterations < max_iterations):
+        game = thaw(data)
+        game.rng.seed(rng.getrandbits(64))
+        determinize(game, observer, rng)
+        iterate(game, root, observer, rng, exploration, max_moves)
+        iterations += 1
+    return dict((child.move, (child.visits, child.wins)) for child in root.children.values()), iterations
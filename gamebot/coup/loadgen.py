@@ -0,0 +1,265 @@
+"""
+Load generator for the IRC bot.
+
+Runs the bot in a thread against a LoopbackServer and has virtual users play M games of N players through it. The
+users play like the simulation agents: each move is picked among the moves the engine is waiting for
+(gamebot.coup.simulation.pending_decisions) and sent as a '.' command over IRC.
+
+Each game has at most one command in flight. The bot's parser is wrapped to report the first line each command makes
+the bot send to a user or a game room. The command completes when that line reaches one of the game's users, and the
+time from sending the command to that moment is its latency. Lines the bot still had queued for earlier commands do
+not count. Commands that make the bot say nothing at all, e.g. an accept while other players still have to answer,
+complete as soon as they have run, without a latency sample.
+
+With connections > 1 the bot spreads its outbound lines over that many connections (irc_connection.add_link), and
+the report counts the lines each of its nicks delivered.
+
+The game state is read from the bot's instance in this process. It is only read for games without a command in
+flight, which the bot thread does not touch, apart from deadlines firing.
+"""
+import random
+import socket
+import threading
+import time
+
+from gamebot.bots.flood import TokenBucket
+from gamebot.bots.irc_simple import irc_connection
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.replay import percentile
+from gamebot.coup.simulation import RandomAgent, command_text, pending_decisions
+
+
+def first_line(text):
+    for line in text.split("\n"):
+        if line:
+            return line
+    return None
+
+
+def first_output(response, events):
+    """ The first line the bot says to a user or room for a command's response and game events, or None """
+    if response is not None:
+        line = first_line(response)
+        if line is not None:
+            return line
+    for msg_type, payload in events:
+        if msg_type in ("private message", "game message"):
+            line = first_line(payload[1])
+            if line is not None:
+                return line
+    return None
+
+
+class ReportingParser(object):
+    """ Wraps a parser and tells listener(nick, line) the first line the bot will say for every command it ran """
+    def __init__(self, parser, listener):
+        self.parser = parser
+        self.instance = parser.instance
+        self.listener = listener
+
+    def parse_input(self, message):
+        msgqueue = self.instance.msgqueue
+        before = len(msgqueue)
+        response = self.parser.parse_input(message)
+        events = [msgqueue[x] for x in range(before, len(msgqueue))]
+        self.listener(message['nick'], first_output(response, events))
+        return response
+
+
+class LoadGame(object):
+    def __init__(self, name, users, agent):
+        self.name = name
+        self.users = users
+        self.agent = agent
+        self.script = ["create {0}".format(name)] + ["join {0}".format(name)] * (len(users) - 1) + ["start"]
+        self.script_users = list(users) + [users[0]]
+        self.in_flight = None
+        self.expected = None
+        self.sent = None
+        self.player = None
+        self.options = None
+        self.commands = 0
+        self.done = False
+
+
+class LoadReport(object):
+    def __init__(self):
+        self.latencies = []
+        self.silent = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.commands = 0
+        self.games = 0
+        self.finished = 0
+        self.elapsed = 0.0
+        self.flood_events = []
+        # Seconds from connecting until the bot had registered and joined its channels
+        self.time_to_ready = None
+        # bot nick -> lines it delivered to the users
+        self.lines_by_nick = dict()
+
+    def percentiles(self):
+        """ Latency percentiles in ms, or None if no command was answered """
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return dict((name, percentile(ordered, fraction) * 1000) for name, fraction in
+                    (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)))
+
+    def latency_summary(self):
+        percentiles = self.percentiles()
+        if percentiles is None:
+            return "n/a"
+        return "p50 {p50:.1f}  p90 {p90:.1f}  p99 {p99:.1f}  max {max:.1f}".format(**percentiles)
+
+
+class LoadGenerator(object):
+    def __init__(self, server, games=10, players=4, seed=None, think=0.0, command_timeout=10.0, max_commands=400,
+                 botnick="coupbot", bot_rate=None, bot_burst=None, connections=1):
+        self.server = server
+        self.think = think
+        self.command_timeout = command_timeout
+        self.max_commands = max_commands
+        self.botnick = botnick
+        self.rng = random.Random(seed)
+
+        self.instance = Instance(seed=self.rng.getrandbits(64))
+        self.condition = threading.Condition()
+        parser = ReportingParser(CoupCLIParser(self.instance), self.processed)
+        sock = socket.create_connection(server.address)
+        self.connection = irc_connection(parser, ["#coup"], botnick, sock=sock, event_driven=True)
+        for number in range(2, connections + 1):
+            self.connection.add_link("{0}_{1}".format(botnick, number),
+                                     sock=socket.create_connection(server.address))
+        self.botnicks = set(link.botnick for link in self.connection.links)
+        if bot_rate is not None:
+            # Lets the bot send faster than the server allows, to find where it gets killed
+            for link in self.connection.links:
+                link.msgqueue.bucket = TokenBucket(bot_rate, bot_burst or bot_rate)
+
+        self.games = []
+        self.user_games = dict()
+        for number in range(games):
+            users = ["u{0}_{1}".format(number, seat) for seat in range(players)]
+            game = LoadGame("load{0}".format(number), users, RandomAgent(random.Random(self.rng.getrandbits(64))))
+            self.games.append(game)
+            for user in users:
+                self.user_games[user] = game
+                server.add_user(user, self.deliverer(user))
+        self.report = LoadReport()
+        self.report.games = games
+
+    # Called from the server and bot threads
+    def deliverer(self, user):
+        def deliver(line):
+            parts = line.split(" ", 3)
+            if len(parts) < 3 or parts[1] not in ("PRIVMSG", "INVITE"):
+                return
+            if parts[1] == "INVITE":
+                self.server.send_as(user, "JOIN {0}".format(line.rsplit(":", 1)[-1]))
+                return
+            sender = parts[0][1:].split("!", 1)[0]
+            if sender not in self.botnicks:
+                return
+            text = parts[3][1:] if len(parts) > 3 else ""
+            with self.condition:
+                self.report.lines_by_nick[sender] = self.report.lines_by_nick.get(sender, 0) + 1
+                game = self.user_games[user]
+                if game.in_flight is None or game.expected is None or text != game.expected:
+                    return
+                self.report.latencies.append(time.perf_counter() - game.sent)
+                if text.startswith("Error:"):
+                    self.report.errors += 1
+                    self.rejected(game)
+                else:
+                    game.options = None
+                self.complete(game)
+        return deliver
+
+    def processed(self, nick, line):
+        with self.condition:
+            game = self.user_games.get(nick)
+            if game is None or game.in_flight is None or game.in_flight[0] != nick:
+                return
+            if line is None:
+                self.report.silent += 1
+                game.options = None
+                self.complete(game)
+            else:
+                game.expected = line
+
+    def complete(self, game):
+        game.in_flight = None
+        game.expected = None
+        self.condition.notify()
+
+    # Load generator thread
+    def rejected(self, game):
+        if game.options is not None:
+            choice = game.in_flight[1]
+            game.options = [x for x in game.options if x is not choice]
+
+    def next_command(self, game):
+        if game.script:
+            return game.script_users[len(game.script_users) - len(game.script)], game.script.pop(0), None
+
+        bot_game = self.instance.games.get(game.name)
+        if bot_game is None or bot_game.is_finished or game.commands >= self.max_commands:
+            return None
+        if not game.options:
+            decisions = pending_decisions(bot_game)
+            if not decisions:
+                return None
+            player, options = decisions[game.agent.rng.randrange(len(decisions))]
+            game.player = player.name
+            game.options = list(options)
+        choice = game.agent.choose(bot_game, bot_game.players[game.player], game.options)
+        return game.player, command_text(*choice), choice
+
+    def run(self, duration=60.0):
+        bot = threading.Thread(target=self.connection.run, name="coupbot", daemon=True)
+        bot.start()
+        for nick in self.botnicks:
+            if not self.server.wait_for_nick(nick, 10):
+                raise RuntimeError("{0} did not register with the loopback server".format(nick))
+
+        started = time.perf_counter()
+        deadline = started + duration
+        with self.condition:
+            while time.perf_counter() < deadline:
+                now = time.perf_counter()
+                active = False
+                wait = self.think or None
+                for game in self.games:
+                    if game.done:
+                        continue
+                    active = True
+                    if game.in_flight is not None:
+                        if now - game.sent > self.command_timeout:
+                            self.report.timeouts += 1
+                            game.options = None
+                            self.complete(game)
+                        continue
+                    if game.sent is not None and now - game.sent < self.think:
+                        continue
+                    command = self.next_command(game)
+                    if command is None:
+                        game.done = True
+                        bot_game = self.instance.games.get(game.name)
+                        if bot_game is None or bot_game.is_finished:
+                            self.report.finished += 1
+                        continue
+                    nick, text, choice = command
+                    game.in_flight = (nick, choice)
+                    game.sent = time.perf_counter()
+                    game.commands += 1
+                    self.report.commands += 1
+                    self.server.send_as(nick, "PRIVMSG {0} :.{1}".format(self.botnick, text))
+                if not active:
+                    break
+                self.condition.wait(wait if wait is not None else 0.1)
+        self.report.elapsed = time.perf_counter() - started
+        self.report.time_to_ready = self.connection.time_to_ready()
+        self.report.flood_events = list(self.server.flood_events)
+        return self.report
@@ -25,6 +25,7 @@ create_parser.add_argument('-g', '--guess', dest='guessing', action='store_true'
                            help='Requires guessing an opponent\'s card to coup or assassinate')
 
 start_parser = command_subparser.add_parser('start', add_help=False, description="Starts a game you own")
+start_parser.add_argument('-b', '--bots', dest='bots', help='Fill this many empty seats with bot players first')
 
 join_parser = command_subparser.add_parser('join', add_help=False, description="Joins a game")
 join_parser.add_argument('name', help='The game name to join')
@@ -85,4 +86,6 @@ select_parser.add_argument('cards', nargs='+')
 # Misc. Game Actions
 status_parser = command_subparser.add_parser('status', add_help=False)
 
+hint_parser = command_subparser.add_parser('hint', add_help=False)
+
 forfeit_parser = command_subparser.add_parser('forfeit', add_help=False)
@@ -0,0 +1,240 @@
+"""
+Crash-safe game state.
+
+A Recorder keeps an instance's games recoverable with two kinds of files in its directory:
+
+  snapshot.pickle           the whole instance, with the number of the last journal segment it includes
+  journal.<segment>.jsonl   every command the instance received and every deadline it fired since that snapshot
+
+Games are deterministic given their instance's random generator, so replaying the journal on top of the snapshot
+rebuilds the exact same state. Every command is journaled before it runs, rejected ones included, as a rejected
+command can still have changed state. Fired deadlines are journaled by key and replayed with TimerService.fire, so
+replay does not depend on the wall clock.
+
+Journal records are written as they come and fsynced in batches: once batch records are pending or sync_interval
+seconds after the first pending one, whichever comes first. A crash loses at most that window. A new snapshot is taken
+after snapshot_records records or snapshot_interval seconds, and the journal restarts with a new segment, which bounds
+how much has to be replayed on startup.
+"""
+import gc
+import json
+import logging
+import os
+import pickle
+import time
+
+from gamebot.coup.cli import CoupCLIParser
+
+
+class Journal(object):
+    """ Append-only JSON lines file whose records are fsynced in batches """
+    def __init__(self, path, batch=64, sync_interval=0.05):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        self.batch = batch
+        self.sync_interval = sync_interval
+        self.unsynced = 0
+        self.first_unsynced = None
+        self.syncs = 0
+
+    def append(self, record, now):
+        self.file.write(json.dumps(record, separators=(',', ':')))
+        self.file.write("\n")
+        if not self.unsynced:
+            self.first_unsynced = now
+        self.unsynced += 1
+        if self.unsynced >= self.batch:
+            self.sync()
+
+    def sync_deadline(self):
+        if not self.unsynced:
+            return None
+        return self.first_unsynced + self.sync_interval
+
+    def sync(self):
+        if not self.unsynced:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.first_unsynced = None
+        self.syncs += 1
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+def read_journal(path):
+    records = []
+    with open(path, 'r', encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A record cut short by a crash. It was never synced, so nothing after it was either
+                logging.warning("Ignoring torn journal record in %s: %r", path, line)
+                break
+    return records
+
+
+def replay_record(instance, parser, record):
+    if 'c' in record:
+        parser.parse_input({'nick': record['n'], 'command': record['c']})
+    elif 'f' in record:
+        instance.timers.fire(record['f'])
+
+
+def restore_rooms(instance):
+    """ Replaces the events produced while recovering with the room setup every game still in play needs """
+    # Games that ended during replay announce their room's destruction when they are collected
+    gc.collect()
+    instance.msgqueue.clear()
+    for name, game in instance.games.items():
+        instance.msgqueue.append(("create room", name))
+        for player in game.players:
+            if instance.user_games.get(player) is game:
+                instance.msgqueue.append(("invite", (player, name)))
+
+
+class Recorder(object):
+    snapshot_name = "snapshot.pickle"
+
+    def __init__(self, directory, snapshot_records=1000, snapshot_interval=60, batch=64, sync_interval=0.05,
+                 clock=time.time):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_records = snapshot_records
+        self.snapshot_interval = snapshot_interval
+        self.batch = batch
+        self.sync_interval = sync_interval
+        self.clock = clock
+
+        self.instance = None
+        self.journal = None
+        self.segment = 0
+        self.records = 0
+        self.last_snapshot = None
+        self.stats = {'records': 0, 'journal_seconds': 0.0, 'syncs': 0, 'snapshots': 0, 'snapshot_seconds': 0.0,
+                      'snapshot_bytes': 0, 'recovered_records': 0, 'recovery_seconds': 0.0}
+
+    def journal_path(self, segment):
+        return os.path.join(self.directory, "journal.{0:08d}.jsonl".format(segment))
+
+    def segments(self):
+        segments = []
+        for filename in os.listdir(self.directory):
+            parts = filename.split('.')
+            if len(parts) == 3 and parts[0] == 'journal' and parts[2] == 'jsonl' and parts[1].isdigit():
+                segments.append(int(parts[1]))
+        return sorted(segments)
+
+    def recover(self, factory):
+        """
+        Loads the latest snapshot, or an instance from factory() if there is none, replays the journal on top of it and
+        starts recording it
+        """
+        started = time.perf_counter()
+        segment = 0
+        instance = None
+        snapshot_path = os.path.join(self.directory, self.snapshot_name)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as snapshot:
+                segment, instance = pickle.load(snapshot)
+        if instance is None:
+            instance = factory()
+
+        parser = CoupCLIParser(instance)
+        replayed = 0
+        segments = self.segments()
+        for number in segments:
+            if number <= segment:
+                continue
+            for record in read_journal(self.journal_path(number)):
+                replay_record(instance, parser, record)
+                replayed += 1
+        restore_rooms(instance)
+
+        self.instance = instance
+        self.segment = max(segments + [segment])
+        instance.recorder = self
+        instance.timers.listener = self.fired
+        # Folds the replayed journal into a fresh snapshot, so the next start does not replay it again
+        self.snapshot()
+
+        self.stats['recovered_records'] = replayed
+        self.stats['recovery_seconds'] = time.perf_counter() - started
+        logging.info("Recovered %s game(s) from snapshot %s and %s journal record(s) in %.1f ms",
+                     len(instance.games), segment, replayed, self.stats['recovery_seconds'] * 1000)
+        return instance
+
+    def command(self, user, command):
+        self._append({'t': self.clock(), 'n': user, 'c': command})
+
+    def fired(self, key):
+        self._append({'t': self.clock(), 'f': key})
+
+    def _append(self, record):
+        started = time.perf_counter()
+        self.journal.append(record, record['t'])
+        self.records += 1
+        self.stats['records'] += 1
+        self.stats['journal_seconds'] += time.perf_counter() - started
+
+    def next_deadline(self):
+        deadline = self.journal.sync_deadline()
+        if self.records:
+            snapshot_deadline = self.last_snapshot + self.snapshot_interval
+            if deadline is None or snapshot_deadline < deadline:
+                deadline = snapshot_deadline
+        return deadline
+
+    def poll(self, now):
+        if self.records >= self.snapshot_records or (self.records and now >= self.last_snapshot +
+                                                     self.snapshot_interval):
+            self.snapshot()
+            return
+        deadline = self.journal.sync_deadline()
+        if deadline is not None and now >= deadline:
+            started = time.perf_counter()
+            self.journal.sync()
+            self.stats['journal_seconds'] += time.perf_counter() - started
+
+    def snapshot(self):
+        """ Writes the instance to a new snapshot and starts the next journal segment """
+        started = time.perf_counter()
+        if self.journal is not None:
+            self.journal.close()
+            self.stats['syncs'] += self.journal.syncs
+
+        data = pickle.dumps((self.segment, self.instance), pickle.HIGHEST_PROTOCOL)
+        path = os.path.join(self.directory, self.snapshot_name)
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as snapshot:
+            snapshot.write(data)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+        for number in self.segments():
+            if number <= self.segment:
+                os.unlink(self.journal_path(number))
+        self.segment += 1
+        self.journal = Journal(self.journal_path(self.segment), self.batch, self.sync_interval)
+        self.records = 0
+        self.last_snapshot = self.clock()
+
+        self.stats['snapshots'] += 1
+        self.stats['snapshot_bytes'] = len(data)
+        self.stats['snapshot_seconds'] += time.perf_counter() - started
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.stats['syncs'] += self.journal.syncs
+            self.journal = None
@@ -12,6 +12,10 @@ class Player(BasePlayer):
         self.available_influence = list()
         self.revealed_influence = list()
 
+        # Claims of a role the player did not hold, and how many of them were challenged
+        self.bluffs = 0
+        self.bluffs_caught = 0
+
     def give_card(self, card):
         self.available_influence.append(card)
 
@@ -56,8 +60,13 @@ class Player(BasePlayer):
             raise GameInvalidOperation("System Error: No team assigned")
 
         if self.team == Team.REFORMIST:
-            self.team = Team.LOYALIST
+            self.set_team(Team.LOYALIST)
         elif self.team == Team.LOYALIST:
-            self.team = Team.REFORMIST
+            self.set_team(Team.REFORMIST)
         else:
             raise GameInvalidOperation("System Error: Unknown team assigned")
+
+
+class BotPlayer(Player):
+    """ A seat played by gamebot.coup.bots rather than by an IRC user """
+    is_bot = True
@@ -0,0 +1,133 @@
+"""
+Replays recorded command streams.
+
+A recording is a JSON lines file in the journal format of gamebot.coup.persistence: one record per command
+({"t": time, "n": nick, "c": command}) or fired deadline ({"t": time, "f": key}). A record may also carry "o", the
+output it produced: the command's reply followed by the msgqueue events it caused.
+
+Replay runs the records through CoupCLIParser.parse_input and TimerService.fire back to back, ignoring the recorded
+times, on an instance with a fixed seed. The output of each record is compared with the recorded one if there is any,
+so a recording whose output was written by a known good version is a regression oracle for the parser, the actions
+and the engine. The time spent on each record is kept per command, so the same recording doubles as a benchmark.
+
+Garbage collection is disabled while replaying. Finished games announce their room's destruction when collected, and
+leaving that to the collector would make the output depend on when it happens to run.
+"""
+import gc
+import json
+import time
+from collections import namedtuple, OrderedDict
+
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.persistence import read_journal
+
+Mismatch = namedtuple('Mismatch', 'index record expected actual')
+
+
+def normalize(output):
+    """ Output as it reads back from JSON, so tuples and lists compare equal """
+    return json.loads(json.dumps(output))
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ReplayResult(object):
+    def __init__(self):
+        self.records = 0
+        self.elapsed = 0.0
+        # command name -> seconds spent on each record of that command
+        self.latencies = OrderedDict()
+        self.mismatches = []
+        self.checked = 0
+        self.outputs = []
+
+    def add_latency(self, name, seconds):
+        latencies = self.latencies.get(name)
+        if latencies is None:
+            latencies = self.latencies[name] = []
+        latencies.append(seconds)
+
+    def summary(self):
+        """ [(name, count, mean, p50, p99, max)] with times in microseconds, slowest mean first """
+        rows = []
+        for name, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            rows.append((name, len(ordered), sum(ordered) / len(ordered) * 1e6, percentile(ordered, 0.5) * 1e6,
+                         percentile(ordered, 0.99) * 1e6, ordered[-1] * 1e6))
+        rows.sort(key=lambda row: -row[2])
+        return rows
+
+
+def command_name(record):
+    if 'f' in record:
+        return "(deadline)"
+    words = record['c'].split()
+    return words[0].lower() if words else ""
+
+
+class Replay(object):
+    def __init__(self, seed=0, factory=Instance, max_mismatches=10):
+        self.seed = seed
+        self.factory = factory
+        self.max_mismatches = max_mismatches
+
+    def run(self, records, keep_output=False):
+        instance = self.factory(seed=self.seed)
+        parser = CoupCLIParser(instance)
+        msgqueue = instance.msgqueue
+        fire = instance.timers.fire
+        parse_input = parser.parse_input
+        clock = time.perf_counter
+        result = ReplayResult()
+
+        collecting = gc.isenabled()
+        gc.disable()
+        started = clock()
+        try:
+            for index, record in enumerate(records):
+                before = clock()
+                if 'f' in record:
+                    fire(record['f'])
+                    output = []
+                else:
+                    output = [parse_input({'nick': record['n'], 'command': record['c']})]
+                result.add_latency(command_name(record), clock() - before)
+
+                output.extend(msgqueue)
+                msgqueue.clear()
+                if keep_output:
+                    result.outputs.append(output)
+                expected = record.get('o')
+                if expected is not None:
+                    result.checked += 1
+                    actual = normalize(output)
+                    if actual != expected and len(result.mismatches) < self.max_mismatches:
+                        result.mismatches.append(Mismatch(index, record, expected, actual))
+            result.records = len(records)
+            result.elapsed = clock() - started
+        finally:
+            if collecting:
+                gc.enable()
+        return result
+
+
+def load_recording(paths):
+    records = []
+    for path in paths:
+        records.extend(read_journal(path))
+    return records
+
+
+def write_recording(path, records, outputs):
+    """ Writes records with the output they produced, for later replays to check against """
+    with open(path, 'w', encoding='utf-8') as recording:
+        for record, output in zip(records, outputs):
+            record = dict(record)
+            record['o'] = normalize(output)
+            recording.write(json.dumps(record, separators=(',', ':')))
+            recording.write("\n")
@@ -0,0 +1,456 @@
+"""
+Turn resolution state machine.
+
+A turn moves through a small set of phases:
+
+  IDLE            waiting for the current player's turn action
+  DECLARED        an action was declared; other players may challenge the claim, counter it or accept it
+  COUNTERED       a counter was declared; players may challenge the counter or accept it
+  LOSE_INFLUENCE  a player must select the card they lose
+  EXCHANGE        the actor selects which cards to keep after drawing from the court deck
+  EXAMINE_SHOW    the examined player selects the card they show
+  EXAMINE_DECIDE  the examiner decides whether the shown card is kept or changed
+  RESOLVING       the action's effect is being applied
+
+Everything that only depends on the rules -- which actions claim which roles, who may counter them, and which
+responses are meaningful in which phase -- is computed once at import time. transitions maps
+(phase, action, response) to the handler for that response, so an incoming response is routed with a single lookup;
+a missing key means the response is not allowed at this point of the turn. timeouts maps each phase to what happens
+when nobody answers before the deadline.
+
+Losing an influence can interrupt any phase. The state records what to continue with afterward: end the turn
+(END_TURN), apply the action (RESOLVE), or let the remaining players counter an action whose claim survived a
+challenge (REOPEN).
+"""
+from gamebot.coup.actions import do_action, Counter, Challenge, Accept, Select, KeepExamine, ChangeExamine, Embezzle
+from gamebot.coup.exceptions import GameInvalidOperation
+from gamebot.coup.influence import roles
+
+IDLE, DECLARED, COUNTERED, LOSE_INFLUENCE, EXCHANGE, EXAMINE_SHOW, EXAMINE_DECIDE, RESOLVING = range(8)
+
+END_TURN, RESOLVE, REOPEN = range(3)
+
+role_by_name = dict((role.name.lower(), role) for role in roles)
+
+
+def _roles_with(attribute, action):
+    return frozenset(role for role in roles if action in getattr(role, attribute))
+
+
+# Roles an action claims, and roles that may counter it
+claims = dict((action, _roles_with('actions', action)) for _, action in do_action)
+blockers = dict((action, _roles_with('counteractions', action)) for _, action in do_action)
+# Embezzle claims *not* to hold a Duke
+claims[Embezzle] = frozenset(role for role in roles if role.name == "Duke")
+inverse_claims = frozenset([Embezzle])
+
+
+class TurnState(object):
+    """ Resolution state of the current turn. One instance per game, reset in place between turns """
+    __slots__ = ('phase', 'action', 'actor', 'target', 'challenge_open', 'blocker', 'block_roles', 'waiting',
+                 'chooser', 'after', 'drawn', 'shown')
+
+    def __init__(self):
+        self.waiting = set()
+        self.drawn = []
+        self.reset()
+
+    def reset(self):
+        self.phase = IDLE
+        self.action = None
+        self.actor = None
+        self.target = None
+        self.challenge_open = False
+        self.blocker = None
+        self.block_roles = None
+        self.waiting.clear()
+        self.chooser = None
+        self.after = None
+        del self.drawn[:]
+        self.shown = None
+
+
+def truthful_claim(player, action):
+    holds = any(card in claims[action] for card in player.available_influence)
+    return holds != (action in inverse_claims)
+
+
+def living_others(game, player):
+    return [game.players[name] for name in game.seats if name != player.name]
+
+
+def counter_candidates(game, state):
+    if not blockers[state.action]:
+        return []
+    if state.target is not None:
+        return [state.target] if not state.target.dead() else []
+    return living_others(game, state.actor)
+
+
+def _await(game, state, phase, players):
+    state.phase = phase
+    state.waiting.clear()
+    state.waiting.update(player.name for player in players)
+    game.event_queue.schedule_timeout()
+
+
+# Declaration
+def declare(game, state, action, actor, target):
+    state.reset()
+    state.action = action
+    state.actor = actor
+    state.target = target
+    state.challenge_open = bool(claims[action])
+    if state.challenge_open and not truthful_claim(actor, action):
+        actor.bluffs += 1
+    if state.challenge_open and game.beliefs is not None:
+        game.beliefs.claimed(actor, claims[action], action not in inverse_claims)
+
+    if state.challenge_open:
+        responders = living_others(game, actor)
+    else:
+        responders = counter_candidates(game, state)
+
+    if not responders:
+        resolve(game, state)
+        return
+
+    _await(game, state, DECLARED, responders)
+    options = []
+    if state.challenge_open:
+        options.append(".challenge {0}".format(actor))
+    if blockers[action]:
+        options.append(".counter")
+    options.append(".accept")
+    game.broadcast_message("Respond with {0}".format(", ".join(options)))
+
+
+def _challenge_action(game, state, player, target=None):
+    _check_waiting(state, player)
+    if not state.challenge_open:
+        raise GameInvalidOperation("The claim has already been challenged")
+    actor = state.actor
+    if target is not None and target is not actor:
+        raise GameInvalidOperation("{0} has not claimed an influence".format(target))
+
+    game.broadcast_message("{0} challenges {1}".format(player, actor))
+    if truthful_claim(actor, state.action):
+        if state.action not in inverse_claims:
+            _prove(game, actor, claims[state.action])
+        elif game.beliefs is not None:
+            game.beliefs.shown(actor, claims[state.action], False)
+        game.broadcast_message("{0} told the truth".format(actor))
+        state.challenge_open = False
+        lose_influence(game, state, player, REOPEN)
+    else:
+        game.broadcast_message("{0} was bluffing".format(actor))
+        actor.bluffs_caught += 1
+        if game.beliefs is not None:
+            game.beliefs.shown(actor, claims[state.action], state.action in inverse_claims)
+        lose_influence(game, state, actor, END_TURN)
+
+
+def _counter(game, state, player, with_role=None):
+    if player.name not in state.waiting or player not in counter_candidates(game, state):
+        raise GameInvalidOperation("You cannot counter this action")
+    possible = blockers[state.action]
+    if with_role is not None:
+        role = role_by_name.get(with_role.lower())
+        if role not in possible:
+            raise GameInvalidOperation("{0} cannot counter {1}. Choose from {2}".format(
+                with_role, state.action.name, ", ".join(sorted(x.name for x in possible))))
+        possible = frozenset([role])
+
+    state.blocker = player
+    state.block_roles = possible
+    if not any(card in possible for card in player.available_influence):
+        player.bluffs += 1
+    if game.beliefs is not None:
+        game.beliefs.claimed(player, possible)
+    _await(game, state, COUNTERED, [x for x in living_others(game, player)])
+    game.broadcast_message("{0} counters with {1}. Respond with .challenge {0} or .accept".format(
+        player, " or ".join(sorted(x.name for x in possible))))
+
+
+def _accept(game, state, player):
+    _check_waiting(state, player)
+    state.waiting.discard(player.name)
+    if not state.waiting:
+        timeouts[state.phase](game, state)
+
+
+def _challenge_counter(game, state, player, target=None):
+    _check_waiting(state, player)
+    blocker = state.blocker
+    if target is not None and target is not blocker:
+        raise GameInvalidOperation("{0} has not claimed an influence".format(target))
+
+    game.broadcast_message("{0} challenges {1}".format(player, blocker))
+    if any(card in state.block_roles for card in blocker.available_influence):
+        _prove(game, blocker, state.block_roles)
+        game.broadcast_message("{0} told the truth. {1} is countered".format(blocker, state.action.name))
+        lose_influence(game, state, player, END_TURN)
+    else:
+        game.broadcast_message("{0} was bluffing".format(blocker))
+        blocker.bluffs_caught += 1
+        if game.beliefs is not None:
+            game.beliefs.shown(blocker, state.block_roles, False)
+        lose_influence(game, state, blocker, RESOLVE)
+
+
+def _check_waiting(state, player):
+    if player.name not in state.waiting:
+        raise GameInvalidOperation("You have nothing to respond to right now")
+
+
+def _prove(game, player, possible):
+    """ A player who was truthfully challenged shows the card, shuffles it back and draws a replacement """
+    card = next(card for card in player.available_influence if card in possible)
+    player.available_influence.remove(card)
+    game.court_deck.append(card)
+    game.rng.shuffle(game.court_deck)
+    player.give_card(game.court_deck.pop())
+    if game.beliefs is not None:
+        game.beliefs.reset(player)
+    game.add_message_to_queue(player.name, "You have {0}.".format(" and ".join(
+        card.short_description() for card in player.available_influence)))
+
+
+# Losing influence
+def lose_influence(game, state, player, after):
+    if player.influence_remaining() > 1:
+        state.phase = LOSE_INFLUENCE
+        state.chooser = player
+        state.after = after
+        state.waiting.clear()
+        game.event_queue.schedule_timeout()
+        game.add_message_to_queue(player.name, "Select which card to lose: {0}".format(_numbered(
+            player.available_influence)))
+        return
+
+    if player.influence_remaining() == 1:
+        _reveal(game, player, 0)
+    proceed(game, state, after)
+
+
+def _reveal(game, player, index):
+    card = player.available_influence.pop(index)
+    player.revealed_influence.append(card)
+    if game.beliefs is not None:
+        game.beliefs.revealed(player, card)
+    game.broadcast_message("{0} loses {1}".format(player, card))
+    if player.dead():
+        game.player_died(player)
+
+
+def _select_lost(game, state, player, cards):
+    if player is not state.chooser:
+        raise GameInvalidOperation("It is not your choice")
+    index = _card_index(cards, len(player.available_influence))
+    _reveal(game, player, index)
+    proceed(game, state, state.after)
+
+
+def _timeout_lose(game, state):
+    _reveal(game, state.chooser, 0)
+    proceed(game, state, state.after)
+
+
+def proceed(game, state, after):
+    if game.is_finished:
+        return
+    state.chooser = None
+    if after == RESOLVE:
+        resolve(game, state)
+    elif after == REOPEN:
+        responders = counter_candidates(game, state)
+        if not responders:
+            resolve(game, state)
+        else:
+            _await(game, state, DECLARED, responders)
+            game.broadcast_message("Respond with .counter or .accept")
+    else:
+        end_turn(game, state)
+
+
+# Effects
+def resolve(game, state):
+    if state.target is not None and state.target.dead():
+        end_turn(game, state)
+        return
+    state.phase = RESOLVING
+    state.waiting.clear()
+    state.action.do_success(game, state.actor, state.target)
+    if state.phase == RESOLVING and not game.is_finished:
+        end_turn(game, state)
+
+
+def end_turn(game, state):
+    state.reset()
+    game.event_queue.cancel()
+    if not game.is_finished:
+        game.progress_to_next_turn()
+
+
+def begin_exchange(game, state, player, count):
+    for _ in range(min(count, len(game.court_deck))):
+        state.drawn.append(game.court_deck.pop())
+    state.phase = EXCHANGE
+    state.chooser = player
+    game.event_queue.schedule_timeout()
+    game.add_message_to_queue(player.name, "Select {0} card(s) to keep: {1}".format(
+        player.influence_remaining(), _numbered(player.available_influence + state.drawn)))
+
+
+def _select_exchange(game, state, player, cards):
+    if player is not state.chooser:
+        raise GameInvalidOperation("It is not your choice")
+    hand = player.available_influence + state.drawn
+    keep = player.influence_remaining()
+    indexes = set(_card_index([card], len(hand)) for card in cards)
+    if len(indexes) != keep or len(cards) != keep:
+        raise GameInvalidOperation("Select exactly {0} different card(s)".format(keep))
+
+    player.available_influence[:] = [hand[x] for x in sorted(indexes)]
+    game.court_deck.extend(hand[x] for x in range(len(hand)) if x not in indexes)
+    game.rng.shuffle(game.court_deck)
+    if game.beliefs is not None:
+        game.beliefs.reset(player)
+    game.broadcast_message("{0} has exchanged".format(player))
+    end_turn(game, state)
+
+
+def _timeout_exchange(game, state):
+    game.court_deck.extend(state.drawn)
+    game.rng.shuffle(game.court_deck)
+    end_turn(game, state)
+
+
+def begin_examine(game, state, source, target):
+    if target.influence_remaining() == 1:
+        _show(game, state, 0)
+        return
+    state.phase = EXAMINE_SHOW
+    state.chooser = target
+    game.event_queue.schedule_timeout()
+    game.add_message_to_queue(target.name, "Select which card {0} examines: {1}".format(source, _numbered(
+        target.available_influence)))
+
+
+def _show(game, state, index):
+    state.shown = index
+    state.phase = EXAMINE_DECIDE
+    state.chooser = state.actor
+    game.event_queue.schedule_timeout()
+    game.add_message_to_queue(state.actor.name,
+                              "{0} has {1}. Use .keep to let them keep it or .change to force an exchange".format(
+                                  state.target, state.target.available_influence[index]))
+
+
+def _select_shown(game, state, player, cards):
+    if player is not state.chooser:
+        raise GameInvalidOperation("It is not your choice")
+    _show(game, state, _card_index(cards, len(player.available_influence)))
+
+
+def _timeout_show(game, state):
+    _show(game, state, 0)
+
+
+def _keep(game, state, player):
+    if player is not state.chooser:
+        raise GameInvalidOperation("It is not your choice")
+    end_turn(game, state)
+
+
+def _change(game, state, player):
+    if player is not state.chooser:
+        raise GameInvalidOperation("It is not your choice")
+    target = state.target
+    game.court_deck.append(target.available_influence.pop(state.shown))
+    game.rng.shuffle(game.court_deck)
+    target.give_card(game.court_deck.pop())
+    if game.beliefs is not None:
+        game.beliefs.reset(target)
+    game.add_message_to_queue(target.name, "You have {0}.".format(" and ".join(
+        card.short_description() for card in target.available_influence)))
+    game.broadcast_message("{0} forces {1} to change a card".format(player, target))
+    end_turn(game, state)
+
+
+def _timeout_keep(game, state):
+    end_turn(game, state)
+
+
+def _numbered(cards):
+    return ", ".join("{0}: {1}".format(number, card) for number, card in enumerate(cards, 1))
+
+
+def _card_index(cards, count):
+    if len(cards) != 1:
+        raise GameInvalidOperation("Select one card")
+    try:
+        index = int(cards[0]) - 1
+    except ValueError:
+        index = -1
+    if not 0 <= index < count:
+        raise GameInvalidOperation("Select a card between 1 and {0}".format(count))
+    return index
+
+
+def _timeout_declared(game, state):
+    resolve(game, state)
+
+
+def _timeout_countered(game, state):
+    game.broadcast_message("{0} is countered".format(state.action.name))
+    end_turn(game, state)
+
+
+def player_left(game, state, player):
+    """ A player forfeited; nobody waits for them any longer """
+    if game.is_finished:
+        return
+    if state.phase == EXCHANGE and state.chooser is player:
+        # The cards they drew go back to the court deck
+        _timeout_exchange(game, state)
+    elif game.seats.current_name() == player.name:
+        end_turn(game, state)
+    elif state.chooser is player:
+        if state.phase == LOSE_INFLUENCE:
+            proceed(game, state, state.after)
+        else:
+            end_turn(game, state)
+    elif player.name in state.waiting:
+        state.waiting.discard(player.name)
+        if not state.waiting:
+            timeouts[state.phase](game, state)
+
+
+def _build_transitions():
+    table = {}
+    for _, action in do_action:
+        if claims[action]:
+            table[(DECLARED, action, Challenge)] = _challenge_action
+        if blockers[action]:
+            table[(DECLARED, action, Counter)] = _counter
+            table[(COUNTERED, action, Challenge)] = _challenge_counter
+            table[(COUNTERED, action, Accept)] = _accept
+        table[(DECLARED, action, Accept)] = _accept
+        table[(LOSE_INFLUENCE, action, Select)] = _select_lost
+        table[(EXCHANGE, action, Select)] = _select_exchange
+        table[(EXAMINE_SHOW, action, Select)] = _select_shown
+        table[(EXAMINE_DECIDE, action, KeepExamine)] = _keep
+        table[(EXAMINE_DECIDE, action, ChangeExamine)] = _change
+    return table
+
+transitions = _build_transitions()
+
+timeouts = {
+    DECLARED: _timeout_declared,
+    COUNTERED: _timeout_countered,
+    LOSE_INFLUENCE: _timeout_lose,
+    EXCHANGE: _timeout_exchange,
+    EXAMINE_SHOW: _timeout_show,
+    EXAMINE_DECIDE: _timeout_keep,
+}
@@ -0,0 +1,61 @@
+"""
+Per-variant rule tables.
+
+A game's variant is the combination of its creation options (inquisitor or ambassador, teams, guessing). Everything
+that only depends on the variant -- the court cards, the turn actions that are legal and the command name -> action
+maps used to route commands -- is built once at import time into an immutable RuleVariant. Every CoupGame of a
+variant shares the same tables, so routing a command is a single dictionary lookup.
+"""
+from collections import namedtuple
+from itertools import product
+from types import MappingProxyType
+
+from gamebot.coup.actions import Income, ForeignAid, Coup, Embezzle, Convert, response_action, game_action
+from gamebot.coup.influence import ambassador, assassin, contessa, captain, duke, inquisitor
+
+
+class RuleVariant(namedtuple('RuleVariant', 'inquisitor teams guessing cards player_actions actions commands '
+                                            'action_choices')):
+    """
+    cards: influence cards in the court deck
+    player_actions: turn actions available with this variant
+    actions: command name -> turn action, for '.do <action>'
+    commands: command name -> response or game action
+    action_choices: printable list of the turn actions, for error messages
+    """
+    __slots__ = ()
+
+    def __reduce__(self):
+        return rule_variant, (self.inquisitor, self.teams, self.guessing)
+
+
+def _build_variant(use_inquisitor, teams, guessing):
+    cards = (contessa, duke, captain, assassin, inquisitor if use_inquisitor else ambassador)
+
+    player_actions = [Income, ForeignAid, Coup]
+    if teams:
+        player_actions.extend([Embezzle, Convert])
+    for card in cards:
+        player_actions.extend(card.actions)
+
+    actions = dict((action.command_name(), action) for action in player_actions)
+
+    commands = dict(response_action)
+    commands.update(game_action)
+
+    return RuleVariant(inquisitor=use_inquisitor,
+                       teams=teams,
+                       guessing=guessing,
+                       cards=cards,
+                       player_actions=tuple(player_actions),
+                       actions=MappingProxyType(actions),
+                       commands=MappingProxyType(commands),
+                       action_choices=", ".join(actions))
+
+
+variants = MappingProxyType(dict((options, _build_variant(*options))
+                                 for options in product((False, True), repeat=3)))
+
+
+def rule_variant(use_inquisitor, teams, guessing):
+    return variants[(bool(use_inquisitor), bool(teams), bool(guessing))]
@@ -0,0 +1,257 @@
+"""
+Process-pool sharding of games.
+
+Games are partitioned over worker processes by the crc32 of their name. Each worker owns a complete Instance and
+CoupCLIParser for its games, including their timers, so a slow game only holds back the other games of its shard.
+
+The IRC process runs a ShardRouter in place of the CoupCLIParser. The router forwards every command to the worker that
+owns the game it concerns and answers the commands that do not touch a game (help, stats, errors) itself. Workers
+send back batches of msgqueue events, the command's response first, followed by changes to their nick -> game index
+and their game list. The router merges the events into its own msgqueue in the order it receives them, so the events
+of one game keep their order. The router uses the index changes to route a player's later commands and answers
+'list' from the game lists.
+
+With a state directory, each worker records its games in its own subdirectory (see gamebot.coup.persistence). The
+games are only found again when the bot restarts with the same number of workers. With a statistics database, the
+workers and the router share it: the workers record the games they finish and every process answers '.stats' from it.
+"""
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from collections import deque
+from multiprocessing.connection import wait
+
+from gamebot.coup.bots import BotService
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.exceptions import CoupException, GameInvalidOperation
+from gamebot.coup.game import Instance
+from gamebot.coup.persistence import Recorder
+from gamebot.coup.stats import StatsStore
+from gamebot.logging import after_fork, stop_logging
+
+
+def shard_for(name, shards):
+    return zlib.crc32(name.encode("utf-8")) % shards
+
+
+class ShardInstance(Instance):
+    """ Instance of a worker. Records the changes to its nick index and game list for the router """
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.index_changes = dict()
+        self.game_changes = dict()
+
+    def add_game(self, name, game):
+        super().add_game(name, game)
+        self.game_changes[name] = game.long_name()
+
+    def remove_game(self, name):
+        super().remove_game(name)
+        self.game_changes[name] = None
+
+    def index_player(self, user, game):
+        super().index_player(user, game)
+        self.index_changes[user] = game.name
+
+    def unindex_player(self, user, game):
+        if self.user_games.get(user) is game:
+            self.index_changes[user] = None
+        super().unindex_player(user, game)
+
+
+def serve_shard(connection, seed=None, state_directory=None, stats_path=None, bot_think=1.0, bot_workers=1):
+    """ Worker process main loop. Runs commands from connection until it receives None """
+    after_fork()
+    recorder = None
+    if state_directory is None:
+        instance = ShardInstance(seed)
+    else:
+        recorder = Recorder(state_directory)
+        instance = recorder.recover(lambda: ShardInstance(seed))
+        # The router starts out knowing nothing about the recovered games
+        instance.index_changes = dict((user, game.name) for user, game in instance.user_games.items())
+        instance.game_changes = dict((name, game.long_name()) for name, game in instance.games.items())
+    if stats_path is not None:
+        instance.stats = StatsStore(stats_path)
+    parser = CoupCLIParser(instance)
+    # Each worker has a search pool of its own, so a bot that is thinking holds up neither its shard nor the others
+    bots = BotService(parser, workers=bot_workers, think_time=bot_think, start_method='spawn')
+    try:
+        while True:
+            if instance.msgqueue or instance.index_changes or instance.game_changes:
+                connection.send((list(instance.msgqueue), instance.index_changes, instance.game_changes))
+                instance.msgqueue.clear()
+                instance.index_changes = dict()
+                instance.game_changes = dict()
+
+            deadline = instance.next_event_time()
+            timeout = None if deadline is None else max(0, deadline - time.time())
+            if connection.poll(timeout):
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    # The router is gone. The worker is not a daemon, so it has to notice on its own
+                    request = None
+                if request is None:
+                    break
+                nick, command = request
+                response = parser.parse_input({'nick': nick, 'command': command})
+                if response is not None:
+                    # The IRC process replies before it sends the command's game events, so the reply goes first
+                    instance.msgqueue.appendleft(("private message", (nick, response)))
+            instance.checkevents()
+    finally:
+        # Also when the worker fails, so that its search pool does not outlive it
+        bots.close()
+        if recorder is not None:
+            recorder.close()
+        if instance.stats is not None:
+            instance.stats.close()
+        connection.close()
+        stop_logging()
+
+
+class RouterInstance(object):
+    """ Stands in for the Instance the IRC connection drives; merges the workers' events into msgqueue """
+    def __init__(self, router):
+        self.router = router
+        self.msgqueue = deque()
+
+    def next_event_time(self):
+        # Deadlines are run by the workers. Their events wake the loop through the readers
+        return None
+
+    def checkevents(self):
+        self.router.receive(0)
+
+
+class ShardRouter(object):
+    def __init__(self, shards, seed=None, state_directory=None, stats_path=None, bot_think=1.0, bot_workers=1):
+        self.instance = RouterInstance(self)
+        # Answers the commands that do not concern any game
+        self.local = CoupCLIParser(Instance(seed))
+        self.connections = []
+        self.processes = []
+        # Forked, so that the workers log to the handlers of this process (see gamebot.logging.after_fork)
+        context = multiprocessing.get_context('fork')
+        for shard in range(shards):
+            parent, child = context.Pipe()
+            directory = None
+            if state_directory is not None:
+                directory = os.path.join(state_directory, "shard{0}".format(shard))
+            process = context.Process(target=serve_shard,
+                                      args=(child, None if seed is None else seed + shard, directory, stats_path,
+                                            bot_think, bot_workers),
+                                      name="coup-shard-{0}".format(shard))
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+        self.shards = dict((connection, shard) for shard, connection in enumerate(self.connections))
+        if stats_path is not None:
+            # Opened once the workers are forked, so they do not inherit its connection and writer thread
+            self.local.instance.stats = StatsStore(stats_path)
+        self.open = list(self.connections)
+
+        # nick -> (shard, name) of the game they are in, as reported by the workers
+        self.user_games = dict()
+        # nick -> shard their commands go to. Also covers a create or join that is still on its way
+        self.routes = dict()
+        # game name -> printable name, for 'list'
+        self.game_names = dict()
+
+    def readers(self):
+        """ The pipes of the workers that are still running """
+        return list(self.open)
+
+    def parse_input(self, message):
+        user = message['nick']
+        arguments = message['command'].lower().split()
+        try:
+            values = self.local.complete_command(arguments, False)
+        except CoupException:
+            return self.local.parse_input(message)
+
+        action = values['command']
+        if action in ('create', 'join'):
+            shard = shard_for(values['name'], len(self.connections))
+            current = self.user_games.get(user)
+            if current is not None and current[0] != shard:
+                e = GameInvalidOperation("Player {0} is already in game '{1}'.".format(user, current[1]))
+                return "Error: {0} ".format(e.args)
+            if self.connections[shard] not in self.open:
+                e = GameInvalidOperation("Games named '{0}' cannot be hosted right now. Choose a different name"
+                                         .format(values['name']))
+                return "Error: {0} ".format(e.args)
+            self.routes[user] = shard
+        elif action == 'list':
+            return "\n".join(self.game_names[name] for name in sorted(self.game_names))
+        else:
+            shard = self.routes.get(user)
+            if shard is None:
+                return self.local.parse_input(message)
+
+        try:
+            self.connections[shard].send((user, message['command']))
+        except OSError:
+            self.lost(self.connections[shard])
+            e = GameInvalidOperation("Your game has been lost")
+            return "Error: {0} ".format(e.args)
+        return None
+
+    def lost(self, connection):
+        """ Forgets a worker that has exited, and the games and players it had """
+        if connection not in self.open:
+            return
+        shard = self.shards[connection]
+        logging.error("Shard %s has exited", shard)
+        self.open.remove(connection)
+        for user in [user for user, route in self.routes.items() if route == shard]:
+            del self.routes[user]
+        for user in [user for user, (route, _) in self.user_games.items() if route == shard]:
+            del self.user_games[user]
+        for name in [name for name in self.game_names if shard_for(name, len(self.connections)) == shard]:
+            del self.game_names[name]
+            self.instance.msgqueue.append(("destroy room", name))
+
+    def receive(self, timeout=None):
+        """ Merges every batch the workers have sent, waiting up to timeout seconds for the first one """
+        for connection in wait(self.open, timeout):
+            shard = self.shards[connection]
+            while connection.poll():
+                try:
+                    events, index_changes, game_changes = connection.recv()
+                except (EOFError, OSError):
+                    self.lost(connection)
+                    break
+                self.instance.msgqueue.extend(events)
+                for user, game in index_changes.items():
+                    if game is None:
+                        self.user_games.pop(user, None)
+                        if self.routes.get(user) == shard:
+                            del self.routes[user]
+                    else:
+                        self.user_games[user] = (shard, game)
+                        self.routes[user] = shard
+                for name, long_name in game_changes.items():
+                    if long_name is None:
+                        self.game_names.pop(name, None)
+                    else:
+                        self.game_names[name] = long_name
+
+    def close(self):
+        for connection in self.open:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(10)
+            if process.is_alive():
+                logging.error("Shard %s did not stop, terminating it", process.name)
+                process.terminate()
+                process.join()
+        if self.local.instance.stats is not None:
+            self.local.instance.stats.close()
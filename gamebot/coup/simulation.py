@@ -0,0 +1,227 @@
+"""
+Headless game simulation.
+
+Plays complete games in-process, without an IRC connection. Games are created, joined and started through
+CoupCLIParser.parse_input exactly like live games, and every move is then issued through CoupGame.run_command with the
+same arguments the CLI would have produced. Agents pick the moves; outbound messages go to a NullSink.
+
+A game ends when it has a winner (completed), when nobody has a decision to make and no deadline is pending
+(stalled), when an action raises something other than a CoupException (error), or after max_commands moves.
+"""
+import random
+import time
+import traceback
+from collections import namedtuple
+from itertools import combinations
+
+from gamebot.coup import resolution
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.dispatch import compile_parser
+from gamebot.coup.exceptions import CoupException
+from gamebot.coup.game import Instance
+from gamebot.coup.parsers import do_parser
+
+# Positional arguments of each '.do' action, e.g. 'steal' -> [('target', None)]
+_do_arguments = dict((name, spec.positionals) for name, spec in compile_parser(do_parser).subcommands.items())
+
+
+class NullSink(object):
+    """ Stands in for an instance's msgqueue and drops every outbound event """
+    __slots__ = ()
+
+    def append(self, item):
+        pass
+
+    appendleft = append
+
+    def popleft(self):
+        raise IndexError("pop from an empty NullSink")
+
+    def __len__(self):
+        return 0
+
+
+class RandomAgent(object):
+    """ Picks uniformly among the moves it is offered """
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, game, player, options):
+        return self.rng.choice(options)
+
+
+def turn_options(game, player):
+    """ Every '.do' move available to player, as (action, arguments) pairs ready for run_command """
+    opponents = [game.players[name] for name in game.seats if name != player.name]
+    options = []
+    for action in game.rules.player_actions:
+        name = action.command_name()
+        positionals = _do_arguments[name]
+        arguments = {'command': 'do', 'do': name}
+        for dest, _ in positionals:
+            arguments[dest] = None
+        if any(dest == 'target' for dest, _ in positionals):
+            for opponent in opponents:
+                targeted = dict(arguments)
+                targeted['target'] = opponent
+                options.append(('do', targeted))
+        else:
+            options.append(('do', arguments))
+    return options
+
+
+def response_options(game, state, player):
+    """ The answers player may give to a declared action or counter """
+    options = [('accept', {'command': 'accept'})]
+    if state.phase == resolution.DECLARED:
+        if state.challenge_open:
+            options.append(('challenge', {'command': 'challenge', 'target': state.actor}))
+        if player in resolution.counter_candidates(game, state):
+            options.append(('counter', {'command': 'counter', 'with_role': None}))
+            for role in resolution.blockers[state.action]:
+                options.append(('counter', {'command': 'counter', 'with_role': role.name.lower()}))
+    else:
+        options.append(('challenge', {'command': 'challenge', 'target': state.blocker}))
+    return options
+
+
+def select_options(count, choose):
+    """ Every way of selecting choose of count cards, numbered from 1 as the players see them """
+    return [('select', {'command': 'select', 'cards': [str(x + 1) for x in cards]})
+            for cards in combinations(range(count), choose)]
+
+
+def pending_decisions(game):
+    """ Returns [(player, options)] for every player who is expected to make a move right now """
+    if not game.is_started or game.is_finished:
+        return []
+    state = game.event_queue.state
+    phase = state.phase
+    if phase == resolution.IDLE:
+        player = game.players[game.current_player_name()]
+        return [(player, turn_options(game, player))]
+    if phase in (resolution.DECLARED, resolution.COUNTERED):
+        return [(game.players[name], response_options(game, state, game.players[name]))
+                for name in sorted(state.waiting)]
+
+    chooser = state.chooser
+    if phase == resolution.LOSE_INFLUENCE or phase == resolution.EXAMINE_SHOW:
+        options = select_options(chooser.influence_remaining(), 1)
+    elif phase == resolution.EXCHANGE:
+        options = select_options(chooser.influence_remaining() + len(state.drawn), chooser.influence_remaining())
+    elif phase == resolution.EXAMINE_DECIDE:
+        options = [('keep', {'command': 'keep'}), ('change', {'command': 'change'})]
+    else:
+        return []
+    return [(chooser, options)]
+
+
+def command_text(action, arguments):
+    """ The chat command for a move in the form CoupGame.run_command takes it """
+    words = [action]
+    if action == 'do':
+        words.append(arguments['do'])
+    for key in ('target', 'with_role'):
+        value = arguments.get(key)
+        if value is not None:
+            words.append(str(value))
+    words.extend(arguments.get('cards', ()))
+    return " ".join(words)
+
+
+GameResult = namedtuple('GameResult', 'outcome turns commands rejected winner error')
+
+
+class Simulation(object):
+    def __init__(self, players=4, inquisitor=True, teams=False, guessing=False, seed=None, agent=RandomAgent,
+                 max_commands=2000):
+        self.players = players
+        self.create_command = "create sim"
+        if not inquisitor:
+            self.create_command += " --amb"
+        if teams:
+            self.create_command += " --teams"
+        if guessing:
+            self.create_command += " --guess"
+        self.rng = random.Random(seed)
+        self.agent = agent
+        self.max_commands = max_commands
+
+    def setup(self):
+        instance = Instance(seed=self.rng.getrandbits(64))
+        instance.msgqueue = NullSink()
+        cliparser = CoupCLIParser(instance)
+        names = ["player{0}".format(x) for x in range(self.players)]
+
+        commands = [(names[0], self.create_command)] + [(name, "join sim") for name in names[1:]]
+        commands.append((names[0], "start"))
+        for nick, command in commands:
+            response = cliparser.parse_input({'nick': nick, 'command': command})
+            if response.startswith("Error:"):
+                raise RuntimeError("Simulation setup failed on '{0}': {1}".format(command, response))
+
+        game = instance.find_game_by_name("sim")
+        agents = dict((name, self.agent(random.Random(self.rng.getrandbits(64)))) for name in names)
+        return instance, game, agents
+
+    def play(self):
+        instance, game, agents = self.setup()
+        timers = instance.timers
+        turns = commands = rejected = 0
+
+        while commands < self.max_commands:
+            if game.is_finished:
+                return GameResult("completed", turns, commands, rejected, game.winner.name, None)
+
+            decisions = pending_decisions(game)
+            if not decisions:
+                deadline = timers.next_deadline()
+                if deadline is None:
+                    return GameResult("stalled", turns, commands, rejected, None, None)
+                # Nobody is going to answer; jump straight to the deadline
+                timers.run_due(deadline)
+                continue
+
+            player, options = decisions[self.rng.randrange(len(decisions))]
+            agent = agents[player.name]
+            while options:
+                choice = agent.choose(game, player, options)
+                action, arguments = choice
+                commands += 1
+                try:
+                    game.run_command(action, player, dict(arguments))
+                except CoupException:
+                    rejected += 1
+                    options = [x for x in options if x is not choice]
+                    continue
+                except Exception:
+                    return GameResult("error", turns, commands, rejected, None, traceback.format_exc())
+                if action == 'do':
+                    turns += 1
+                break
+            else:
+                return GameResult("stalled", turns, commands, rejected, None, None)
+
+        return GameResult("limit", turns, commands, rejected, None, None)
+
+
+def run_batch(games, seed=None, **options):
+    """
+    Plays games with one variant and returns a summary dictionary: elapsed seconds, the count of each outcome, turns,
+    commands, and the distinct error tracebacks seen
+    """
+    simulation = Simulation(seed=seed, **options)
+    summary = {'games': 0, 'turns': 0, 'commands': 0, 'rejected': 0, 'errors': {},
+               'completed': 0, 'stalled': 0, 'error': 0, 'limit': 0}
+    started = time.time()
+    for _ in range(games):
+        result = simulation.play()
+        summary['games'] += 1
+        summary[result.outcome] += 1
+        summary['turns'] += result.turns
+        summary['commands'] += result.commands
+        summary['rejected'] += result.rejected
+        if result.error is not None:
+            summary['errors'][result.error] = summary['errors'].get(result.error, 0) + 1
+    summary['elapsed'] = time.time() - started
+    return summary
@@ -0,0 +1,202 @@
+"""
+Packed game state.
+
+A PackedState is the part of a CoupGame that matters for search and analysis, in one small bytearray:
+
+  byte 0      number of seats
+  byte 1      current seat
+  byte 2      turn phase (gamebot.coup.resolution)
+  byte 3      treasury
+  bytes 4-9   court deck, as a count per role
+  4 per seat  coins, cards in hand, revealed cards, team
+
+Cards are role indexes into gamebot.coup.influence.roles. A seat's hand and revealed cards are each a byte holding up to
+two cards, one per nibble, stored as index + 1 so that 0 is an empty slot. Seats are in turn order and include the
+players who are out.
+
+Every byte value has its own Zobrist key. The hash key is kept up to date by the setters, which only XOR out the old
+and XOR in the new key of the byte they change, so cloning and hashing a state cost no more than copying fifty bytes.
+"""
+import random
+
+from gamebot.coup.game import CoupGame
+from gamebot.coup.influence import roles
+from gamebot.coup.resolution import IDLE
+
+SEATS, CURRENT, PHASE, TREASURY = range(4)
+DECK = 4
+PLAYERS = DECK + len(roles)
+COINS, HAND, REVEALED, TEAM = range(4)
+STRIDE = 4
+
+role_index = dict((role, index) for index, role in enumerate(roles))
+
+_zobrist_random = random.Random(0x5eed)
+zobrist = [[_zobrist_random.getrandbits(64) for _ in range(256)]
+           for _ in range(PLAYERS + STRIDE * CoupGame.PLAYER_LIMIT)]
+
+
+def pack_cards(cards):
+    """ Packs up to two role indexes into a byte """
+    if len(cards) > 2:
+        raise ValueError("A seat holds at most two cards, got {0}".format(len(cards)))
+    value = 0
+    for shift, card in zip((0, 4), cards):
+        value |= (card + 1) << shift
+    return value
+
+
+def unpack_cards(value):
+    cards = []
+    while value:
+        cards.append((value & 0xf) - 1)
+        value >>= 4
+    return cards
+
+
+class PackedState(object):
+    __slots__ = ('data', 'key')
+
+    def __init__(self, data, key=None):
+        self.data = data
+        if key is None:
+            key = 0
+            for offset, value in enumerate(data):
+                key ^= zobrist[offset][value]
+        self.key = key
+
+    @classmethod
+    def empty(cls, seats):
+        data = bytearray(PLAYERS + STRIDE * seats)
+        data[SEATS] = seats
+        return cls(data)
+
+    @classmethod
+    def from_game(cls, game):
+        names = game.seats.seats
+        state = cls.empty(len(names))
+        data = state.data
+        data[CURRENT] = game.seats.current
+        data[PHASE] = game.event_queue.phase
+        data[TREASURY] = getattr(game, 'treasury', 0)
+        for card in game.court_deck:
+            data[DECK + role_index[card]] += 1
+        for seat, name in enumerate(names):
+            player = game.players[name]
+            base = PLAYERS + STRIDE * seat
+            data[base + COINS] = player.cash()
+            data[base + HAND] = pack_cards([role_index[card] for card in player.available_influence])
+            data[base + REVEALED] = pack_cards([role_index[card] for card in player.revealed_influence])
+            data[base + TEAM] = player.team
+        return cls(data)
+
+    def apply(self, game):
+        """ Writes this state into game, which must have the same seats. The court deck is reshuffled """
+        names = game.seats.seats
+        if len(names) != self.data[SEATS]:
+            raise ValueError("State has {0} seats, game has {1}".format(self.data[SEATS], len(names)))
+        if self.phase != IDLE or game.event_queue.phase != IDLE:
+            raise ValueError("States can only be applied between turns")
+
+        seats = game.seats
+        for seat, name in enumerate(names):
+            if self.alive(seat) and name not in seats:
+                raise ValueError("{0} is out of the game and cannot be seated again".format(name))
+        for seat, name in enumerate(names):
+            player = game.players[name]
+            player.coins = self.coins(seat)
+            player.available_influence[:] = [roles[card] for card in self.hand(seat)]
+            player.revealed_influence[:] = [roles[card] for card in self.revealed(seat)]
+            player.set_team(self.team(seat))
+            if player.dead():
+                seats.remove(name)
+
+        game.court_deck[:] = [role for index, role in enumerate(roles) for _ in range(self.deck_count(index))]
+        game.rng.shuffle(game.court_deck)
+        if game.teams:
+            game.treasury = self.treasury
+        if seats.alive[self.current]:
+            seats.current = self.current
+            seats.resume = None
+
+    def clone(self):
+        return PackedState(bytearray(self.data), self.key)
+
+    def freeze(self):
+        return bytes(self.data)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedState) and self.key == other.key and self.data == other.data
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self.key
+
+    def _set(self, offset, value):
+        old = self.data[offset]
+        if old != value:
+            self.data[offset] = value
+            self.key ^= zobrist[offset][old] ^ zobrist[offset][value]
+
+    @property
+    def seats(self):
+        return self.data[SEATS]
+
+    @property
+    def current(self):
+        return self.data[CURRENT]
+
+    @current.setter
+    def current(self, seat):
+        self._set(CURRENT, seat)
+
+    @property
+    def phase(self):
+        return self.data[PHASE]
+
+    @phase.setter
+    def phase(self, phase):
+        self._set(PHASE, phase)
+
+    @property
+    def treasury(self):
+        return self.data[TREASURY]
+
+    @treasury.setter
+    def treasury(self, coins):
+        self._set(TREASURY, coins)
+
+    def deck_count(self, role):
+        return self.data[DECK + role]
+
+    def set_deck_count(self, role, count):
+        self._set(DECK + role, count)
+
+    def coins(self, seat):
+        return self.data[PLAYERS + STRIDE * seat + COINS]
+
+    def set_coins(self, seat, coins):
+        self._set(PLAYERS + STRIDE * seat + COINS, coins)
+
+    def hand(self, seat):
+        return unpack_cards(self.data[PLAYERS + STRIDE * seat + HAND])
+
+    def set_hand(self, seat, cards):
+        self._set(PLAYERS + STRIDE * seat + HAND, pack_cards(cards))
+
+    def revealed(self, seat):
+        return unpack_cards(self.data[PLAYERS + STRIDE * seat + REVEALED])
+
+    def set_revealed(self, seat, cards):
+        self._set(PLAYERS + STRIDE * seat + REVEALED, pack_cards(cards))
+
+    def team(self, seat):
+        return self.data[PLAYERS + STRIDE * seat + TEAM]
+
+    def set_team(self, seat, team):
+        self._set(PLAYERS + STRIDE * seat + TEAM, team)
+
+    def alive(self, seat):
+        return self.data[PLAYERS + STRIDE * seat + HAND] != 0
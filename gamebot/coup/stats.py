@@ -0,0 +1,192 @@
+"""
+Player statistics.
+
+A StatsStore keeps finished games in an SQLite database in WAL mode. The history is in two tables, games and
+game_players. Alongside it the store maintains per-player aggregates, which are updated in the same transaction as
+the history:
+
+  player_stats   games played, games won, bluffs made and bluffs that were caught, one row per player
+  role_wins      games won per role the winner still held at the end, one row per player and role
+
+so '.stats <player>' reads two rows by primary key instead of going over the history.
+
+Writes do not happen on the network thread. record() only turns the game into a plain result and queues it; a
+writer thread of the store's own commits the queued results in batches, one transaction per batch. A batch is
+written once batch results are queued or flush_interval seconds after the first one, whichever comes first. Reads
+use a connection of their own, which WAL lets run alongside the writer, so a result shows up in '.stats' once its
+batch is committed.
+
+Several processes may share a database, as the workers of gamebot.coup.sharding do.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+schema = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    finished REAL NOT NULL,
+    winner TEXT NOT NULL,
+    players INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game INTEGER NOT NULL REFERENCES games (id),
+    player TEXT NOT NULL COLLATE NOCASE,
+    won INTEGER NOT NULL,
+    roles TEXT NOT NULL,
+    bluffs INTEGER NOT NULL,
+    bluffs_caught INTEGER NOT NULL,
+    PRIMARY KEY (game, player)
+);
+CREATE TABLE IF NOT EXISTS player_stats (
+    player TEXT PRIMARY KEY COLLATE NOCASE,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    bluffs INTEGER NOT NULL,
+    bluffs_caught INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS role_wins (
+    player TEXT NOT NULL COLLATE NOCASE,
+    role TEXT NOT NULL,
+    wins INTEGER NOT NULL,
+    PRIMARY KEY (player, role)
+) WITHOUT ROWID;
+"""
+
+update_player = """
+INSERT INTO player_stats (player, games, wins, bluffs, bluffs_caught) VALUES (?, 1, ?, ?, ?)
+ON CONFLICT (player) DO UPDATE SET games = games + 1, wins = wins + excluded.wins, bluffs = bluffs + excluded.bluffs,
+    bluffs_caught = bluffs_caught + excluded.bluffs_caught
+"""
+
+update_role = """
+INSERT INTO role_wins (player, role, wins) VALUES (?, ?, 1)
+ON CONFLICT (player, role) DO UPDATE SET wins = wins + 1
+"""
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # WAL keeps the database consistent on a crash at NORMAL; only the last commits may be lost
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def game_result(game, finished=None):
+    """ The plain data of a finished game that the store keeps """
+    players = []
+    for player in game.players.values():
+        players.append((player.name, player is game.winner, [card.name for card in player.available_influence],
+                        player.bluffs, player.bluffs_caught))
+    return {'name': game.name, 'finished': time.time() if finished is None else finished,
+            'winner': game.winner.name, 'players': players}
+
+
+def percentage(part, whole):
+    return "{0:.0f}%".format(100.0 * part / whole) if whole else "-"
+
+
+class StatsStore(object):
+    def __init__(self, path, batch=64, flush_interval=1.0):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.batch = batch
+        self.flush_interval = flush_interval
+
+        self.reader = connect(path)
+        self.reader.executescript(schema)
+        self.results = queue.Queue()
+        self.written = 0
+        self.thread = threading.Thread(target=self.write_results, name="coup-stats", daemon=True)
+        self.thread.start()
+
+    # Network thread
+    def record(self, game):
+        self.results.put(game_result(game))
+
+    def player_stats(self, player):
+        """ The aggregates of a player as a dict, or None if they have not finished a game """
+        row = self.reader.execute("SELECT player, games, wins, bluffs, bluffs_caught FROM player_stats "
+                                  "WHERE player = ?", (player,)).fetchone()
+        if row is None:
+            return None
+        stats = dict(zip(('player', 'games', 'wins', 'bluffs', 'bluffs_caught'), row))
+        stats['role_wins'] = dict(self.reader.execute("SELECT role, wins FROM role_wins WHERE player = ? "
+                                                      "ORDER BY wins DESC, role", (player,)))
+        return stats
+
+    def describe(self, player):
+        stats = self.player_stats(player)
+        if stats is None:
+            return "No finished games for {0}".format(player)
+        lines = ["{0}: {1} games, {2} won ({3})".format(stats['player'], stats['games'], stats['wins'],
+                                                       percentage(stats['wins'], stats['games']))]
+        if stats['role_wins']:
+            lines.append("Wins holding: {0}".format(", ".join(
+                "{0} {1}".format(role, wins) for role, wins in stats['role_wins'].items())))
+        successful = stats['bluffs'] - stats['bluffs_caught']
+        lines.append("Bluffs: {0}, {1} got through ({2})".format(stats['bluffs'], successful,
+                                                                 percentage(successful, stats['bluffs'])))
+        return "\n".join(lines)
+
+    def flush(self):
+        """ Waits until every result recorded so far is committed """
+        self.results.join()
+
+    def close(self):
+        self.results.put(None)
+        self.thread.join()
+        self.reader.close()
+
+    # Writer thread
+    def write_results(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            batch = [self.results.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.results.get(timeout=remaining) if remaining > 0 else
+                                 self.results.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            try:
+                self.write_batch(connection, batch)
+            except sqlite3.Error:
+                logging.exception("Could not write %s game result(s) to %s", len(batch), self.path)
+            finally:
+                for _ in range(len(batch) + (0 if running else 1)):
+                    self.results.task_done()
+        connection.close()
+
+    def write_batch(self, connection, batch):
+        if not batch:
+            return
+        with connection:
+            connection.execute("BEGIN")
+            for result in batch:
+                cursor = connection.execute("INSERT INTO games (name, finished, winner, players) VALUES (?, ?, ?, ?)",
+                                            (result['name'], result['finished'], result['winner'],
+                                             len(result['players'])))
+                game = cursor.lastrowid
+                for player, won, roles, bluffs, caught in result['players']:
+                    connection.execute("INSERT INTO game_players (game, player, won, roles, bluffs, bluffs_caught) "
+                                       "VALUES (?, ?, ?, ?, ?, ?)", (game, player, int(won), ",".join(roles), bluffs,
+                                                                     caught))
+                    connection.execute(update_player, (player, int(won), bluffs, caught))
+                    if won:
+                        for role in sorted(set(roles)):
+                            connection.execute(update_role, (player, role))
+        self.written += len(batch)
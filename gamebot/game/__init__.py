@@ -1,9 +1,13 @@
 from collections import OrderedDict
 from gamebot.coup.exceptions import GameInvalidOperation, GamePermissionError
 from gamebot.game.player import BasePlayer
+from gamebot.game.seating import SeatRing
 
 
 class BaseGame(object):
+    # Set once the game's room has been given back, so that it is only given back once
+    room_released = False
+
     def __init__(self, instance, game_creator, max_players, parameters):
         self.is_started = False
         self.instance = instance
@@ -12,9 +16,9 @@ class BaseGame(object):
         self.game_creator = game_creator
         self.max_players = max_players
 
+        # Name lookup; turn order lives in self.seats
         self.players = OrderedDict()
-
-        self.current_player = 0
+        self.seats = SeatRing()
 
         self.events = list()
 
@@ -26,7 +30,12 @@ class BaseGame(object):
         self.instance.msgqueue.append(("create room", self.name))
 
     def __del__(self):
-        self.instance.msgqueue.append(("destroy room", self.name))
+        self.release_room()
+
+    def release_room(self):
+        if not self.room_released:
+            self.room_released = True
+            self.instance.msgqueue.append(("destroy room", self.name))
 
     def add_player(self, player, password):
         if not isinstance(player, BasePlayer):
@@ -44,8 +53,26 @@ class BaseGame(object):
         if len(self.players) == self.max_players:
             raise GameInvalidOperation("No more room, already full.")
 
+        current_game = self.instance.user_games.get(player.name)
+        if current_game is not None:
+            raise GameInvalidOperation("Player {0} is already in game '{1}'.".format(player.name, current_game.name))
+
         self.players[player.name] = player
-        self.instance.msgqueue.append(("invite", (player.name, self.name)))
+        self.seats.add(player.name)
+        self.instance.index_player(player.name, self)
+        if not player.is_bot:
+            self.instance.msgqueue.append(("invite", (player.name, self.name)))
+
+    def remove_player(self, name):
+        """ Takes a player out of a game that has not started. The last player to leave closes the game """
+        del self.players[name]
+        self.seats = SeatRing(self.players)
+        if not self.players:
+            self.instance.remove_game(self.name)
+            self.release_room()
+        elif self.game_creator == name:
+            self.game_creator = next(iter(self.players))
+            self.add_message_to_queue(self.game_creator, "You are now the owner of game '{0}'".format(self.name))
 
     def is_creator(self, user):
         return user == self.game_creator
@@ -53,10 +80,14 @@ class BaseGame(object):
     def start(self):
         raise NotImplementedError
 
+    @property
+    def current_player(self):
+        return self.seats.current
+
     def current_player_name(self):
         if len(self.players) == 0:
             raise GameInvalidOperation('There are no players in this game yet')
-        return list(self.players.items())[self.current_player][0]
+        return self.seats.current_name()
 
     def long_name(self):
         if self.password is None:
@@ -71,26 +102,33 @@ class BaseGame(object):
         return self.players[name]
 
     def my_turn(self, user):
-        return user == list(self.players.items())[self.current_player][0]
+        return user == self.seats.current_name()
 
     def advance_to_next_player(self):
-        self.current_player = (self.current_player + 1) % len(self.players)
+        self.seats.advance()
+
+    def eliminate_player(self, name):
+        """ Takes a dead or forfeited player out of the turn order """
+        self.seats.remove(name)
 
     def progress_to_next_turn(self):
-        alive_players = [x for x in self.players if not x.dead()]
+        previous = self.current_player_name()
+        self.advance_to_next_player()
+        while self.players[self.current_player_name()].dead():
+            self.eliminate_player(self.current_player_name())
+            self.advance_to_next_player()
 
-        if len(alive_players) == 1:
+        if len(self.seats) == 1 or self.current_player_name() == previous:
+            winner = self.current_player_name()
             for player in self.players:
-                self.add_message_to_queue(player.name, "Player {0} has won!".format(alive_players[0]))
+                self.add_message_to_queue(player, "Player {0} has won!".format(winner))
         else:
-            self.advance_to_next_player()
-            while self.players[self.current_player_name()].dead():
-                print("{0} is dead... skipping".format(self.current_player_name()))
-                self.advance_to_next_player()
-
             self.add_message_to_queue(self.current_player_name(), "It is your turn. Please choose an action.")
 
     def add_message_to_queue(self, user, message):
+        player = self.players.get(user)
+        if player is not None and player.is_bot:
+            return
         self.instance.msgqueue.append(("private message", (user, message)))
 
     def broadcast_message(self, message):
@@ -1,14 +1,36 @@
+import random
 import time
 from collections import deque
 
 
 from gamebot.coup.exceptions import GameInvalidOperation, GameNotFoundException
+from gamebot.game.timers import TimerService
 
 
 class BaseInstance(object):
-    def __init__(self):
+    def __init__(self, seed=None):
         self.games = dict()
         self.msgqueue = deque()
+        # nick -> game the user is playing in, kept in sync with the games' player lists
+        self.user_games = dict()
+        # Turn deadlines of every game, keyed by game name
+        self.timers = TimerService()
+        # Seeds each game's own random generator, so a seeded instance plays out reproducibly
+        self.rng = random.Random(seed)
+        # Journals commands and deadlines and takes snapshots, see gamebot.coup.persistence
+        self.recorder = None
+        # Finished games and per-player statistics, see gamebot.coup.stats
+        self.stats = None
+        # Plays the bot players, see gamebot.coup.bots
+        self.bots = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['recorder'] = None
+        state['stats'] = None
+        state['bots'] = None
+        state['msgqueue'] = deque()
+        return state
 
     def add_game(self, name, game):
         if not self.game_exists(name):
@@ -16,6 +38,26 @@ class BaseInstance(object):
         else:
             raise GameInvalidOperation("A game with this name already exists")
 
+    def remove_game(self, name):
+        game = self.find_game_by_name(name)
+        del self.games[name]
+        self.timers.cancel(name)
+        for player_name in game.players:
+            self.unindex_player(player_name, game)
+
+    def finish_game(self, game):
+        """ Called by a game once it has a winner """
+        if self.stats is not None:
+            self.stats.record(game)
+        self.remove_game(game.name)
+
+    def index_player(self, user, game):
+        self.user_games[user] = game
+
+    def unindex_player(self, user, game):
+        if self.user_games.get(user) is game:
+            del self.user_games[user]
+
     def game_exists(self, name):
         return name in self.games
 
@@ -26,20 +68,34 @@ class BaseInstance(object):
         return self.games[name]
 
     def find_user_game(self, user):
-        for _, game in self.games.items():
-            if user in game.players:
-                return game
+        game = self.user_games.get(user)
+        if game is not None:
+            return game
 
         raise GameNotFoundException("User {0} does not appear to be in a game".format(user))
 
     def get_stats(self, player_name=None):
-        pass  # TODO get statistics
+        if self.stats is None:
+            raise GameInvalidOperation("Statistics are not being kept")
+        return self.stats.describe(player_name)
 
     def print_games(self):
-        games = [game.long_name() for _, game in self.games]
+        games = [game.long_name() for game in self.games.values()]
         return "\n".join(games)
 
+    def next_event_time(self):
+        deadlines = [self.timers.next_deadline()]
+        if self.recorder is not None:
+            deadlines.append(self.recorder.next_deadline())
+        if self.bots is not None:
+            deadlines.append(self.bots.next_deadline())
+        deadlines = [x for x in deadlines if x is not None]
+        return min(deadlines) if deadlines else None
+
     def checkevents(self):
-        for _, game in self.games.item():
-            if time.time() > game.event_queue.next_event:
-                game.event_queue.trigger()
+        now = time.time()
+        self.timers.run_due(now)
+        if self.bots is not None:
+            self.bots.poll(now)
+        if self.recorder is not None:
+            self.recorder.poll(now)
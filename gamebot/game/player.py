@@ -2,6 +2,9 @@ from gamebot.game.team import BaseTeam
 
 
 class BasePlayer(object):
+    # Bot players are seated by the bot and have no IRC user to message
+    is_bot = False
+
     def __init__(self, name, team=BaseTeam.UNASSIGNED):
         self._name = name
         self._team = team
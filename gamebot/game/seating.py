@@ -0,0 +1,94 @@
+class SeatRing(object):
+    """
+    Turn order of a game.
+
+    Seats are a fixed array in play order. The seats still in play are linked into a ring through the next/prev
+    arrays, so the current player, advancing to the next player and removing a player on death or forfeit are all
+    O(1) no matter how many players have already been removed.
+    """
+    def __init__(self, names=()):
+        self.seats = []
+        self.index = dict()
+        self.next = []
+        self.prev = []
+        self.alive = []
+        self.current = None
+        # Living seat that precedes the current seat after the current player was removed mid-turn
+        self.resume = None
+        self.living = 0
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return self.living
+
+    def __iter__(self):
+        """ Living players in turn order, starting with the current player """
+        if not self.living:
+            return
+        seat = self.current if self.alive[self.current] else self.next[self.resume]
+        for _ in range(self.living):
+            yield self.seats[seat]
+            seat = self.next[seat]
+
+    def __contains__(self, name):
+        seat = self.index.get(name)
+        return seat is not None and self.alive[seat]
+
+    def add(self, name):
+        if name in self.index:
+            raise ValueError("{0} already has a seat".format(name))
+        seat = len(self.seats)
+        self.seats.append(name)
+        self.index[name] = seat
+        self.alive.append(True)
+        if self.current is None:
+            self.next.append(seat)
+            self.prev.append(seat)
+            self.current = seat
+        else:
+            # The ring is in seat order, so a new seat goes right before the lowest living seat
+            first = self.first_living()
+            last = self.prev[first]
+            self.next.append(first)
+            self.prev.append(last)
+            self.next[last] = seat
+            self.prev[first] = seat
+        self.living += 1
+
+    def first_living(self):
+        seat = self.current if self.alive[self.current] else self.next[self.resume]
+        # Walking backwards from any living seat, the lowest seat is the one whose predecessor is higher
+        while self.prev[seat] < seat:
+            seat = self.prev[seat]
+        return seat
+
+    def remove(self, name):
+        seat = self.index[name]
+        if not self.alive[seat]:
+            return
+        self.alive[seat] = False
+        self.living -= 1
+        before, after = self.prev[seat], self.next[seat]
+        self.next[before] = after
+        self.prev[after] = before
+        if self.resume == seat:
+            self.resume = before if self.living else None
+        if seat == self.current:
+            self.resume = before if self.living else None
+
+    def current_name(self):
+        if self.current is None:
+            return None
+        return self.seats[self.current]
+
+    def advance(self):
+        """ Moves the turn to the next living seat and returns its player's name """
+        if not self.living:
+            return None
+        if self.alive[self.current]:
+            self.current = self.next[self.current]
+        else:
+            self.current = self.next[self.resume]
+        self.resume = None
+        return self.seats[self.current]
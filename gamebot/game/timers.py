@@ -0,0 +1,81 @@
+import heapq
+import itertools
+
+
+class TimerService(object):
+    """
+    Central deadline scheduler shared by every game of an instance.
+
+    Deadlines live in a min-heap keyed by time, with at most one live deadline per key (usually a game). Cancelling or
+    rescheduling a key marks its old heap entry dead instead of searching for it, so every operation is O(log n) and
+    the dead entries are dropped when they reach the top of the heap.
+    """
+    def __init__(self):
+        self.heap = []
+        self.entries = dict()
+        self.counter = itertools.count()
+        # Called with the key of each deadline just before it fires, e.g. to journal it
+        self.listener = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['listener'] = None
+        return state
+
+    def __len__(self):
+        return len(self.entries)
+
+    def schedule(self, key, when, callback):
+        """ Sets the deadline for key, replacing any deadline it already had """
+        self.cancel(key)
+        entry = [when, next(self.counter), key, callback]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+
+    def cancel(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[3] = None
+
+    def deadline(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def _discard_cancelled(self):
+        heap = self.heap
+        while heap and heap[0][3] is None:
+            heapq.heappop(heap)
+
+    def next_deadline(self):
+        """ Time of the earliest live deadline, or None """
+        self._discard_cancelled()
+        if not self.heap:
+            return None
+        return self.heap[0][0]
+
+    def run_due(self, now):
+        """ Fires every deadline at or before now, earliest first. Returns the number fired """
+        fired = 0
+        heap = self.heap
+        while True:
+            self._discard_cancelled()
+            if not heap or heap[0][0] > now:
+                return fired
+            when, _, key, callback = heapq.heappop(heap)
+            del self.entries[key]
+            if self.listener is not None:
+                self.listener(key)
+            callback()
+            fired += 1
+
+    def fire(self, key):
+        """ Fires the deadline of key right away, wherever it is in time. Returns False if key has no deadline """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        callback = entry[3]
+        entry[3] = None
+        callback()
+        return True
@@ -1,30 +1,158 @@
+"""
+Asynchronous logging.
+
+The root logger has a single handler, which puts records on a bounded queue. A listener thread takes them off and
+formats and writes them with the stream and file handlers added by log_to_stream and log_to_file. A slow terminal or
+disk then holds up the listener instead of the thread that logged. When the queue is full, records are dropped
+rather than waited for; the listener reports how many it missed once it catches up.
+
+Records are formatted by the listener, so log calls should pass their arguments separately ('%s' style) and only
+pass values that will not change afterwards. The root logger's level follows the most verbose handler, so calls
+below every handler's level return before a record is made.
+
+A forked process inherits the queue but not the listener thread, and possibly a lock the thread held. It has to
+call after_fork before it logs, which gives it a queue and a listener of its own that write to the same handlers.
+
+Records may carry structured fields as extra: nick, game, command and latency (in seconds). The formatter appends
+the ones a record has.
+"""
+import atexit
 import logging
+import logging.handlers
+import queue
+
+QUEUE_SIZE = 10000
+
+fields = ('nick', 'game', 'command', 'latency')
+
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        values = []
+        for field in fields:
+            value = record.__dict__.get(field)
+            if value is None:
+                continue
+            if field == 'latency':
+                values.append("latency={0:.2f}ms".format(value * 1000))
+            else:
+                values.append("{0}={1}".format(field, value))
+        if values:
+            text += " {" + " ".join(values) + "}"
+        return text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """ Queues records without formatting them, and drops them when the queue is full """
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Listener(logging.handlers.QueueListener):
+    def __init__(self, record_queue, source):
+        super().__init__(record_queue, respect_handler_level=True)
+        self.source = source
+        self.reported = 0
+        self.running = False
+
+    def start(self):
+        super().start()
+        self.running = True
+
+    def stop(self):
+        super().stop()
+        self.running = False
+
+    def enqueue_sentinel(self):
+        # Waits for room, so the writer still gets to the end of a full queue
+        self.queue.put(self._sentinel)
+
+    def handle(self, record):
+        dropped = self.source.dropped
+        if dropped != self.reported:
+            warning = logging.LogRecord('gamebot.logging', logging.WARNING, __file__, 0,
+                                        "Log queue full, dropped %d record(s)", (dropped - self.reported,), None)
+            self.reported = dropped
+            super().handle(warning)
+        super().handle(record)
+
 
 __base_logger = logging.getLogger()
-__base_handler = logging.NullHandler()
-__base_formatter = logging.Formatter(fmt='%(name)s: %(message)s - [%(levelname)s] '
-                                         '(%(funcName)s) %(filename)s:%(lineno)d')
+__base_formatter = StructuredFormatter(fmt='%(name)s: %(message)s - [%(levelname)s] '
+                                           '(%(funcName)s) %(filename)s:%(lineno)d')
+__base_handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+__listener = Listener(__base_handler.queue, __base_handler)
 
-__base_handler.setFormatter(__base_formatter)
 __base_logger.addHandler(__base_handler)
-__base_logger.setLevel(logging.DEBUG)
+# Nothing is written until a handler is added, so nothing below a warning needs to be made into a record
+__base_logger.setLevel(logging.WARNING)
 
 
-def log_to_stream(stream, level):
+def _add_handler(handler, level):
     global __base_formatter
     global __base_logger
+    global __listener
 
-    handler = logging.StreamHandler(stream)
     handler.setFormatter(__base_formatter)
     handler.setLevel(level)
-    __base_logger.addHandler(handler)
+
+    running = __listener.running
+    if running:
+        __listener.stop()
+    __listener.handlers = __listener.handlers + (handler,)
+    __listener.start()
+    if not running:
+        atexit.register(stop_logging)
+
+    __base_logger.setLevel(min(x.level for x in __listener.handlers))
+
+
+def log_to_stream(stream, level):
+    _add_handler(logging.StreamHandler(stream), level)
 
 
 def log_to_file(filename, level):
-    global __base_formatter
+    _add_handler(logging.FileHandler(filename), level)
+
+
+def dropped_records():
+    global __base_handler
+
+    return __base_handler.dropped
+
+
+def stop_logging():
+    """ Writes out the queued records and stops the listener thread """
+    global __listener
+
+    if __listener.running:
+        __listener.stop()
+
+
+def after_fork():
+    """ Restarts logging in a forked process, see above """
+    global __base_handler
     global __base_logger
+    global __listener
 
-    handler = logging.FileHandler(filename)
-    handler.setFormatter(__base_formatter)
-    handler.setLevel(level)
-    __base_logger.addHandler(handler)
+    handlers = __listener.handlers
+    running = __listener.running
+    __base_logger.removeHandler(__base_handler)
+    __base_handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+    __listener = Listener(__base_handler.queue, __base_handler)
+    __listener.handlers = handlers
+    __base_logger.addHandler(__base_handler)
+    if running:
+        # The process leaves through os._exit, which skips atexit, so it has to call stop_logging itself
+        __listener.start()
@@ -0,0 +1,74 @@
+"""
+Runs the hot path microbenchmarks, saves them as a baseline or compares them with one
+"""
+from __future__ import print_function
+import sys
+import os
+import argparse
+
+scripts_dir = os.path.dirname(__file__)
+source_dir = os.path.abspath(os.path.join(scripts_dir, '..', 'gamebot'))
+sys.path.append(source_dir)
+base_directory = os.path.abspath(os.path.join(source_dir, '..'))
+sys.path.append(base_directory)
+
+import benchmarks.cases
+from benchmarks.runner import run_all, save_baseline, load_baseline, compare
+
+default_baseline = os.path.join(base_directory, 'benchmarks', 'baseline.json')
+
+
+def print_results(results):
+    print("{:<34} {:>14} {:>14} {:>14}".format('benchmark', 'ops/sec', 'peak B/op', 'retained B/op'))
+    for result in results:
+        print("{:<34} {:>14.0f} {:>14.1f} {:>14.1f}".format(*result))
+
+
+def print_comparison(comparisons):
+    print("{:<34} {:>10} {:>10}".format('benchmark', 'speed', 'memory'))
+    for comparison in comparisons:
+        speed = "new" if comparison.speed is None else "{:.2f}x".format(comparison.speed)
+        memory = "-" if comparison.memory is None else "{:.2f}x".format(comparison.memory)
+        print("{:<34} {:>10} {:>10}{}".format(comparison.name, speed, memory,
+                                              "  REGRESSION" if comparison.regressed else ""))
+
+
+def main(args):
+    """
+    Benchmark Loop
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('action', choices=['run', 'save', 'compare', 'list'],
+                        help='run and print, save as the baseline, compare with the baseline, or list benchmarks')
+    parser.add_argument('benchmarks', nargs='*', help='only run benchmarks starting with these names')
+    parser.add_argument('-b', '--baseline', default=default_baseline, help='baseline file')
+    parser.add_argument('-r', '--rounds', type=int, default=5, help='timed rounds per benchmark; the best one counts')
+    parser.add_argument('-x', '--scale', type=float, default=1.0, help='scales the operations per round')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+                        help='relative slowdown or memory growth that counts as a regression')
+
+    args = parser.parse_args(args)
+
+    if args.action == 'list':
+        for name in benchmarks.runner.benchmarks:
+            print(name)
+        return 0
+
+    results = run_all(args.benchmarks, args.rounds, args.scale)
+    print_results(results)
+
+    if args.action == 'save':
+        save_baseline(args.baseline, results)
+        print("Saved baseline to {}".format(args.baseline))
+    elif args.action == 'compare':
+        comparisons = compare(results, load_baseline(args.baseline), args.tolerance)
+        print()
+        print_comparison(comparisons)
+        if any(comparison.regressed for comparison in comparisons):
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
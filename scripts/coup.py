@@ -16,6 +16,10 @@ from gamebot.logging import log_to_file, log_to_stream
 from gamebot.bots import irc_simple
 from gamebot.coup.game import Instance
 from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.persistence import Recorder
+from gamebot.coup.sharding import ShardRouter
+from gamebot.coup.stats import StatsStore
+from gamebot.coup.bots import BotService
 
 core = logging.getLogger('core')
 
@@ -65,8 +69,33 @@ def main(args):
                        default='')
     group.add_argument('-s', '--server', action='store', help='IRC server address to connect to',
                        default='wilhelm.freenode.net')
+    group.add_argument('-N', '--connections', action='store', type=int, dest='connections',
+                       help='connections to spread outbound messages over. The extra ones use the nicknames '
+                            '<nickname>_2, <nickname>_3, ... which must be registered with the same password',
+                       default=1)
+    group.add_argument('--warm-rooms', action='store', type=int, dest='warm_rooms',
+                       help='free game rooms to keep joined; more are joined as games start, without a limit',
+                       default=2)
     group.add_argument('-u', '--use-ssl', action='store_true', dest='ssl', help='enables the use of SSL',
                        default=False)
+    group.add_argument('-e', '--event-loop', action='store_true', dest='event_driven',
+                       help='sleep in select() between network and game events instead of polling the socket',
+                       default=False)
+    group.add_argument('-w', '--workers', action='store', type=int, dest='workers',
+                       help='number of worker processes to spread the games over. 0 runs every game in the bot process',
+                       default=0)
+    group.add_argument('-D', '--state-dir', action='store', dest='state_dir',
+                       help='directory to keep game snapshots and the command journal in, so games survive a restart',
+                       default=None)
+    group.add_argument('-b', '--stats-db', action='store', dest='stats_db',
+                       help='SQLite database to keep finished games and player statistics in, for .stats',
+                       default=None)
+    group.add_argument('--bot-workers', action='store', type=int, dest='bot_workers',
+                       help='processes that search the moves of bot players, in each worker process with --workers',
+                       default=2)
+    group.add_argument('--bot-think', action='store', type=float, dest='bot_think',
+                       help='seconds a bot player may think about a decision, at most half the action time',
+                       default=2.0)
 
     group = parser.add_argument_group('Logging options', 'Options given to the logging framework')
 
@@ -129,16 +158,48 @@ def main(args):
         if args.stream:
             core.info('logging to stream, stream=%s', args.stream)
 
-    instance = Instance()
-    cliparser = CoupCLIParser(instance)
+    readers = None
+    recorder = None
+    instance = None
+    bots = None
+    if args.workers > 0:
+        cliparser = ShardRouter(args.workers, state_directory=args.state_dir, stats_path=args.stats_db,
+                                bot_think=args.bot_think, bot_workers=max(1, args.bot_workers))
+        readers = cliparser.readers
+    else:
+        if args.state_dir:
+            recorder = Recorder(args.state_dir)
+            instance = recorder.recover(Instance)
+        else:
+            instance = Instance()
+        # Attached after recovery, as the games that finish while the journal is replayed were recorded before
+        if args.stats_db:
+            instance.stats = StatsStore(args.stats_db)
+        cliparser = CoupCLIParser(instance)
+        bots = BotService(cliparser, workers=max(1, args.bot_workers), think_time=args.bot_think)
 
-    connection = irc_simple.irc_connection(parser=cliparser,
-                                           channellist=args.channels.split(','),
-                                           botnick=args.nickname,
-                                           botpass=args.password,
-                                           server=args.server,
-                                           usessl=args.ssl)
-    connection.run()
+    try:
+        connection = irc_simple.irc_connection(parser=cliparser,
+                                               channellist=args.channels.split(','),
+                                               botnick=args.nickname,
+                                               botpass=args.password,
+                                               server=args.server,
+                                               usessl=args.ssl,
+                                               event_driven=args.event_driven,
+                                               readers=readers,
+                                               warm_rooms=args.warm_rooms)
+        for number in range(2, args.connections + 1):
+            connection.add_link("{0}_{1}".format(args.nickname, number), args.password)
+        connection.run()
+    finally:
+        if bots is not None:
+            bots.close()
+        if args.workers > 0:
+            cliparser.close()
+        if recorder is not None:
+            recorder.close()
+        if instance is not None and instance.stats is not None:
+            instance.stats.close()
 
 if __name__ == '__main__':
     sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""
+Load tests the IRC bot against a local loopback server with simulated players and reports command to reply latency
+and excess flood
+"""
+from __future__ import print_function
+import sys
+import os
+import argparse
+import logging
+
+scripts_dir = os.path.dirname(__file__)
+source_dir = os.path.abspath(os.path.join(scripts_dir, '..', 'gamebot'))
+sys.path.append(source_dir)
+base_directory = os.path.abspath(os.path.join(source_dir, '..'))
+sys.path.append(base_directory)
+
+from gamebot.logging import log_to_stream
+from gamebot.bots.loopback import LoopbackServer
+from gamebot.coup.loadgen import LoadGenerator
+
+core = logging.getLogger('core')
+
+
+def main(args):
+    """
+    Load Test Loop
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-g', '--games', type=int, default=8, help='concurrent games')
+    parser.add_argument('-n', '--players', type=int, default=4, help='players per game')
+    parser.add_argument('-t', '--duration', type=float, default=60.0, help='seconds to run for at most')
+    parser.add_argument('-T', '--think', type=float, default=0.0, help='seconds each game waits between commands')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='seed for reproducible move choices')
+    parser.add_argument('--rate', type=float, default=2.0, help='server flood control: lines per second')
+    parser.add_argument('--burst', type=int, default=5, help='server flood control: burst')
+    parser.add_argument('--max-backlog', type=int, dest='max_backlog', default=20,
+                        help='server flood control: queued lines that count as excess flood')
+    parser.add_argument('-k', '--kill', action='store_true',
+                        help='disconnect the bot on excess flood instead of only reporting it')
+    parser.add_argument('--bot-rate', type=float, dest='bot_rate', default=None,
+                        help='override the lines per second the bot allows itself')
+    parser.add_argument('--bot-burst', type=int, dest='bot_burst', default=None,
+                        help='override the burst the bot allows itself')
+    parser.add_argument('-N', '--connections', type=int, default=1,
+                        help='connections the bot spreads its outbound messages over, each with its own nick')
+    parser.add_argument('-d', '--debug', action='store_true', help='enables debug output to stderr')
+
+    args = parser.parse_args(args)
+
+    if args.debug:
+        log_to_stream(sys.stderr, logging.DEBUG)
+
+    server = LoopbackServer(rate=args.rate, burst=args.burst, max_backlog=args.max_backlog, kill_on_flood=args.kill)
+    server.start()
+    try:
+        generator = LoadGenerator(server, games=args.games, players=args.players, seed=args.seed, think=args.think,
+                                  bot_rate=args.bot_rate, bot_burst=args.bot_burst, connections=args.connections)
+        report = generator.run(args.duration)
+    finally:
+        server.stop()
+
+    print("{} game(s), {} finished, {} command(s) in {:.1f}s ({:.1f}/sec)".format(
+        report.games, report.finished, report.commands, report.elapsed, report.commands / max(report.elapsed, 1e-9)))
+    print("{} answered, {} silent, {} rejected, {} timed out".format(len(report.latencies), report.silent,
+                                                                     report.errors, report.timeouts))
+    if report.time_to_ready is not None:
+        print("bot ready after {:.1f}ms".format(report.time_to_ready * 1000))
+    print("latency ms: {}".format(report.latency_summary()))
+    if len(report.lines_by_nick) > 1:
+        print("lines delivered: {}".format(", ".join("{} {}".format(nick, lines) for nick, lines in
+                                                    sorted(report.lines_by_nick.items()))))
+    if not report.flood_events:
+        print("No excess flood")
+    for event in report.flood_events:
+        print("Excess flood from {} after {:.2f}s and {} lines, {} queued{}".format(
+            event.nick, event.elapsed, event.lines, event.backlog, "; disconnected" if event.killed else ""))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
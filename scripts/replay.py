@@ -0,0 +1,73 @@
+"""
+Replays recorded command streams as fast as possible, checks their output and reports per-command latency
+"""
+from __future__ import print_function
+import sys
+import os
+import argparse
+import logging
+
+scripts_dir = os.path.dirname(__file__)
+source_dir = os.path.abspath(os.path.join(scripts_dir, '..', 'gamebot'))
+sys.path.append(source_dir)
+base_directory = os.path.abspath(os.path.join(source_dir, '..'))
+sys.path.append(base_directory)
+
+from gamebot.logging import log_to_stream
+from gamebot.coup.replay import Replay, load_recording, write_recording
+
+core = logging.getLogger('core')
+
+
+def main(args):
+    """
+    Replay Loop
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('recordings', nargs='+', help='recordings or journal segments, replayed in the given order')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the replay instance')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='number of times to replay, for steadier timings')
+    parser.add_argument('-w', '--write', action='store', default=None,
+                        help='write the recording with the output of this replay to the given file')
+    parser.add_argument('-m', '--max-mismatches', type=int, dest='max_mismatches', default=10,
+                        help='number of output mismatches to report')
+    parser.add_argument('-d', '--debug', action='store_true', help='enables debug output to stderr')
+
+    args = parser.parse_args(args)
+
+    if args.debug:
+        log_to_stream(sys.stderr, logging.DEBUG)
+
+    records = load_recording(args.recordings)
+    replay = Replay(seed=args.seed, max_mismatches=args.max_mismatches)
+
+    result = None
+    best = None
+    for number in range(args.repeat):
+        result = replay.run(records, keep_output=args.write is not None and number == 0)
+        if number == 0 and args.write is not None:
+            write_recording(args.write, records, result.outputs)
+        if best is None or result.elapsed < best:
+            best = result.elapsed
+
+    print("{} record(s) in {:.1f} ms, {:.0f} records/sec".format(result.records, best * 1000,
+                                                                   result.records / max(best, 1e-9)))
+    print("{:<14} {:>8} {:>10} {:>10} {:>10} {:>10}".format('command', 'count', 'mean us', 'p50 us', 'p99 us',
+                                                            'max us'))
+    for row in result.summary():
+        print("{:<14} {:>8} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(*row))
+
+    if not result.checked:
+        print("No recorded output to check against")
+        return 0
+
+    for mismatch in result.mismatches:
+        print("--- record {} ({}):\n  expected: {}\n  actual:   {}".format(
+            mismatch.index, mismatch.record.get('c', mismatch.record.get('f')), mismatch.expected, mismatch.actual))
+    print("{} of {} record(s) checked, {} mismatch(es) shown".format(result.checked, result.records,
+                                                                    len(result.mismatches)))
+    return 1 if result.mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,115 @@
+"""
+Runs headless Coup games with random agents and reports engine throughput per rule variant
+"""
+from __future__ import print_function
+import sys
+import os
+import argparse
+import itertools
+import logging
+import multiprocessing
+
+scripts_dir = os.path.dirname(__file__)
+source_dir = os.path.abspath(os.path.join(scripts_dir, '..', 'gamebot'))
+sys.path.append(source_dir)
+base_directory = os.path.abspath(os.path.join(source_dir, '..'))
+sys.path.append(base_directory)
+
+from gamebot.logging import log_to_stream
+from gamebot.coup.simulation import run_batch
+
+core = logging.getLogger('core')
+
+
+def variant_name(inquisitor, teams, guessing):
+    parts = ['inquisitor' if inquisitor else 'ambassador']
+    if teams:
+        parts.append('teams')
+    if guessing:
+        parts.append('guessing')
+    return '+'.join(parts)
+
+
+def run_chunk(job):
+    games, seed, options = job
+    return run_batch(games, seed=seed, **options)
+
+
+def merge(summaries):
+    total = {'errors': {}}
+    for summary in summaries:
+        for key, value in summary.items():
+            if key == 'errors':
+                for error, count in value.items():
+                    total['errors'][error] = total['errors'].get(error, 0) + count
+            elif key == 'elapsed':
+                total[key] = max(total.get(key, 0), value)
+            else:
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+def main(args):
+    """
+    Simulation Loop
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-g', '--games', type=int, default=1000, help='games to play per variant')
+    parser.add_argument('-n', '--players', type=int, default=4, help='players per game')
+    parser.add_argument('-j', '--processes', type=int, default=1, help='worker processes to spread the games over')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='seed for reproducible runs')
+    parser.add_argument('-V', '--variant', action='append', dest='variants', default=None,
+                        help='only run this variant, e.g. ambassador+teams. May be repeated')
+    parser.add_argument('-e', '--show-errors', action='store_true', dest='show_errors',
+                        help='print every distinct engine error traceback')
+    parser.add_argument('-d', '--debug', action='store_true', help='enables debug output to stderr')
+
+    args = parser.parse_args(args)
+
+    if args.debug:
+        log_to_stream(sys.stderr, logging.DEBUG)
+
+    variants = []
+    for inquisitor, teams, guessing in itertools.product((True, False), (False, True), (False, True)):
+        name = variant_name(inquisitor, teams, guessing)
+        if args.variants is None or name in args.variants:
+            variants.append((name, {'players': args.players, 'inquisitor': inquisitor, 'teams': teams,
+                                    'guessing': guessing}))
+
+    pool = None
+    if args.processes > 1:
+        pool = multiprocessing.Pool(args.processes)
+
+    print("{:<30} {:>8} {:>9} {:>8} {:>7} {:>12} {:>12}".format('variant', 'games', 'completed', 'stalled', 'errors',
+                                                              'games/sec', 'turns/sec'))
+    for number, (name, options) in enumerate(variants):
+        seed = None if args.seed is None else args.seed * 1000 + number
+        if pool is None:
+            summary = run_batch(args.games, seed=seed, **options)
+        else:
+            chunk = -(-args.games // args.processes)
+            jobs = []
+            for worker in range(args.processes):
+                games = min(chunk, args.games - worker * chunk)
+                if games > 0:
+                    jobs.append((games, None if seed is None else seed * 100 + worker, options))
+            summary = merge(pool.map(run_chunk, jobs))
+
+        elapsed = max(summary['elapsed'], 1e-9)
+        print("{:<30} {:>8} {:>9} {:>8} {:>7} {:>12.1f} {:>12.1f}".format(
+            name, summary['games'], summary['completed'], summary['stalled'] + summary['limit'], summary['error'],
+            summary['games'] / elapsed, summary['turns'] / elapsed))
+
+        if args.show_errors:
+            for error, count in sorted(summary['errors'].items(), key=lambda x: -x[1]):
+                print("--- {} game(s):\n{}".format(count, error))
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
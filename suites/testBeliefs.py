@@ -0,0 +1,99 @@
+import pickle
+import random
+import unittest
+
+from gamebot.coup.beliefs import numpy
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.influence import contessa, duke, captain, assassin
+from gamebot.coup.ismcts import determinize
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class BeliefTester(unittest.TestCase):
+    def setUp(self):
+        self.instance = Instance(seed=1)
+        self.cliparser = CoupCLIParser(self.instance)
+        self.parse('alice', 'create one --amb')
+        self.parse('bob', 'join one')
+        self.parse('carol', 'join one')
+        self.parse('alice', 'start')
+        self.game = self.instance.find_game_by_name('one')
+        self.beliefs = self.game.beliefs
+        self.first, self.second, self.third = [self.game.players[name] for name in self.game.seats]
+        self.deal(self.first, contessa, captain)
+        self.deal(self.second, assassin, assassin)
+        self.deal(self.third, captain, contessa)
+
+    def parse(self, nick, command):
+        return self.cliparser.parse_input({'nick': nick, 'command': command})
+
+    def deal(self, player, *cards):
+        player.available_influence[:] = cards
+
+    def chance(self, observer, player, role):
+        chances = self.beliefs.probabilities(self.game, observer)
+        return chances[player.name][self.beliefs.role_index[role]]
+
+    def test_prior_follows_the_deck(self):
+        self.assertEqual(self.beliefs.deck.tolist(), [3] * 5)
+        # Two cards out of the 13 the first player cannot see, three of them Dukes
+        self.assertAlmostEqual(self.chance(self.first, self.second, duke), 1 - (10 * 9) / (13.0 * 12))
+        # The first player holds one of the three Contessas
+        self.assertLess(self.chance(self.first, self.second, contessa), self.chance(self.first, self.second, duke))
+
+    def test_tables_are_shared(self):
+        self.parse('dave', 'create two --amb')
+        self.parse('erin', 'join two')
+        self.parse('dave', 'start')
+        other = self.instance.find_game_by_name('two').beliefs
+        self.assertIs(other.tables, self.beliefs.tables)
+        self.assertIsNot(other.logs[2], self.beliefs.logs[2])
+        self.assertIs(pickle.loads(pickle.dumps(self.beliefs)).tables, self.beliefs.tables)
+
+    def test_claims_shift_beliefs(self):
+        before = self.chance(self.third, self.first, duke)
+        self.parse(self.first.name, 'do tax')
+        after = self.chance(self.third, self.first, duke)
+        self.assertGreater(after, before)
+        # Beliefs about the players who claimed nothing do not change
+        self.assertAlmostEqual(self.chance(self.second, self.third, duke), before)
+
+    def test_caught_bluff_rules_out_the_role(self):
+        self.parse(self.first.name, 'do tax')
+        self.parse(self.second.name, 'challenge {0}'.format(self.first.name))
+        self.assertAlmostEqual(self.chance(self.third, self.first, duke), 0.0, places=12)
+
+        # The first player loses a card, and what is known carries over to the last one
+        self.parse(self.first.name, 'select 1')
+        self.assertEqual(len(self.first.available_influence), 1)
+        self.assertAlmostEqual(self.chance(self.third, self.first, duke), 0.0, places=12)
+        self.assertEqual(self.beliefs.unseen(self.game, self.third)[self.beliefs.role_index[contessa]], 1)
+
+    def test_proven_claim_is_forgotten(self):
+        self.deal(self.first, duke, captain)
+        before = self.chance(self.third, self.first, duke)
+        self.parse(self.first.name, 'do tax')
+        self.parse(self.second.name, 'challenge {0}'.format(self.first.name))
+        self.assertAlmostEqual(self.chance(self.third, self.first, duke), before)
+
+    def test_hint(self):
+        self.parse(self.first.name, 'do tax')
+        self.instance.msgqueue.clear()
+        self.assertIsNone(self.parse(self.second.name, 'hint'))
+        kind, (user, message) = self.instance.msgqueue.pop()
+        self.assertEqual((kind, user), ("private message", self.second.name))
+        self.assertTrue(message.startswith("Likely cards. "))
+        self.assertIn("{0}: Duke".format(self.first.name), message)
+        self.assertNotIn("{0}:".format(self.second.name), message)
+
+    def test_determinize_fits_caught_bluffs(self):
+        self.parse(self.first.name, 'do tax')
+        self.parse(self.second.name, 'challenge {0}'.format(self.first.name))
+        rng = random.Random(3)
+        for _ in range(50):
+            determinize(self.game, self.third.name, rng)
+            self.assertNotIn(duke, self.first.available_influence)
+            self.assertEqual(len(self.first.available_influence), 2)
+            self.assertEqual(len(self.game.court_deck), 9)
+            self.assertEqual(self.third.available_influence, [captain, contessa])
@@ -0,0 +1,26 @@
+import unittest
+
+import benchmarks.cases
+from benchmarks.runner import benchmarks as registered, run_benchmark, compare, Result
+
+
+class BenchmarkTester(unittest.TestCase):
+    def test_benchmarks_run(self):
+        for name in registered:
+            result = run_benchmark(name, rounds=1, scale=0.01)
+            self.assertGreater(result.ops_per_sec, 0, name)
+
+    def test_compare(self):
+        baseline = {'fast': Result('fast', 1000.0, 100.0, 0.0), 'small': Result('small', 1000.0, 2.0, 0.0)}
+        results = [Result('fast', 700.0, 100.0, 0.0), Result('small', 1000.0, 30.0, 0.0), Result('new', 1.0, 0, 0)]
+
+        comparisons = dict((x.name, x) for x in compare(results, baseline, tolerance=0.2))
+        self.assertTrue(comparisons['fast'].regressed)
+        # A few bytes per operation either way are noise
+        self.assertIsNone(comparisons['small'].memory)
+        self.assertFalse(comparisons['small'].regressed)
+        self.assertIsNone(comparisons['new'].speed)
+
+
+if __name__ == '__main__':
+    unittest.main()
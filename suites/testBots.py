@@ -0,0 +1,119 @@
+import random
+import time
+import unittest
+
+from gamebot.coup.bots import BotService
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.player import BotPlayer
+from gamebot.coup.ismcts import determinize, freeze, sandbox, search
+from gamebot.coup.simulation import RandomAgent, command_text, pending_decisions
+
+
+def bot_game(bots=2, seed=3):
+    instance = Instance(seed=seed)
+    cliparser = CoupCLIParser(instance)
+    cliparser.parse_input({'nick': 'alice', 'command': 'create g'})
+    response = cliparser.parse_input({'nick': 'alice', 'command': 'start --bots {0}'.format(bots)})
+    return instance, cliparser, instance.find_game_by_name('g'), response
+
+
+class BotTester(unittest.TestCase):
+    def test_start_with_bots(self):
+        instance, _, game, response = bot_game()
+        self.assertEqual(response, "Game 'g' started")
+        self.assertEqual(sorted(game.players), ['alice', 'g.bot1', 'g.bot2'])
+        recipients = set(payload[0] for msg_type, payload in instance.msgqueue
+                         if msg_type in ("invite", "private message"))
+        self.assertEqual(recipients, set(['alice']))
+
+    def test_malformed_bot_count(self):
+        instance = Instance(seed=1)
+        cliparser = CoupCLIParser(instance)
+        cliparser.parse_input({'nick': 'alice', 'command': 'create g'})
+        self.assertEqual(cliparser.parse_input({'nick': 'alice', 'command': 'start --bots many'}),
+                         "Error: ('--bots takes a number of bot players',) ")
+
+    def test_bots_fit_in_the_game(self):
+        instance = Instance(seed=1)
+        cliparser = CoupCLIParser(instance)
+        cliparser.parse_input({'nick': 'alice', 'command': 'create g'})
+        game = instance.find_game_by_name('g')
+        self.assertTrue(cliparser.parse_input({'nick': 'alice', 'command': 'start --bots 10'}).startswith("Error:"))
+        self.assertEqual(list(game.players), ['alice'])
+
+        game.add_player(BotPlayer("g.bot1"), None)
+        self.assertEqual(cliparser.parse_input({'nick': 'alice', 'command': 'start --bots 1'}), "Game 'g' started")
+        self.assertEqual(sorted(game.players), ['alice', 'g.bot1', 'g.bot2'])
+
+    def test_sandbox(self):
+        instance, _, game, _ = bot_game()
+        queued = len(instance.msgqueue)
+        copied = sandbox(game)
+        player = copied.players[copied.current_player_name()]
+        copied.run_command('do', player, {'command': 'do', 'do': 'income'})
+        self.assertEqual(game.players[player.name].coins, 2)
+        self.assertEqual(copied.players[player.name].coins, 3)
+        self.assertEqual(len(instance.msgqueue), queued)
+        self.assertIsNot(copied.instance, instance)
+        self.assertEqual(list(copied.instance.games), ['g'])
+        self.assertIs(copied.event_queue.timers, copied.instance.timers)
+
+    def test_determinize(self):
+        _, _, game, _ = bot_game()
+        copied = sandbox(game)
+        before = sorted(card.name for player in copied.players.values() for card in player.available_influence)
+        before += sorted(card.name for card in copied.court_deck)
+        determinize(copied, 'alice', random.Random(1))
+        after = sorted(card.name for player in copied.players.values() for card in player.available_influence)
+        after += sorted(card.name for card in copied.court_deck)
+        self.assertEqual(sorted(before), sorted(after))
+        self.assertEqual(copied.players['alice'].available_influence, game.players['alice'].available_influence)
+
+    def test_search(self):
+        _, _, game, _ = bot_game()
+        data = freeze(game)
+        observer = game.current_player_name()
+        moves, iterations = search(data, observer, time.time() + 60, 1, max_iterations=200)
+        self.assertEqual(iterations, 200)
+        self.assertEqual(sum(visits for visits, _ in moves.values()), 200)
+        self.assertTrue(all(action == 'do' for action, _ in moves))
+
+        self.assertEqual(search(data, observer, time.time() - 1, 1), ({}, 0))
+
+    def play(self, workers):
+        instance, cliparser, game, _ = bot_game()
+        bots = BotService(cliparser, workers=workers, think_time=0.05, seed=1)
+        agent = RandomAgent(random.Random(2))
+        started = time.time()
+        try:
+            while not game.is_finished and time.time() - started < 60:
+                polled = time.time()
+                instance.checkevents()
+                if workers:
+                    self.assertLess(time.time() - polled, 0.05)
+                humans = [(player, options) for player, options in pending_decisions(game) if not player.is_bot]
+                if not humans:
+                    deadline = instance.next_event_time()
+                    if deadline is not None:
+                        time.sleep(max(0, deadline - time.time()))
+                    continue
+                player, options = humans[0]
+                options = list(options)
+                while options:
+                    choice = agent.choose(game, player, options)
+                    response = cliparser.parse_input({'nick': player.name, 'command': command_text(*choice)})
+                    if response is None or not response.startswith("Error:"):
+                        break
+                    options.remove(choice)
+        finally:
+            bots.close()
+        self.assertTrue(game.is_finished)
+        self.assertGreater(bots.stats['decisions'], 0)
+        self.assertGreater(bots.stats['iterations'], 0)
+
+    def test_bots_play_inline(self):
+        self.play(0)
+
+    def test_bots_play_in_pool(self):
+        self.play(2)
@@ -0,0 +1,76 @@
+import unittest
+
+from gamebot.coup.dispatch import DispatchTable
+from gamebot.coup.exceptions import MalformedCLICommand
+from gamebot.coup.parsers import command_parser
+
+commands = [
+    "create one",
+    "create one -p secret",
+    "create -p secret one",
+    "create one -a -t -g",
+    "create one -i -a",
+    "create one --amb --teams",
+    "create one --pass secret",
+    "create one --password=secret",
+    "create one -p",
+    "create one -p -a",
+    "create",
+    "create one two",
+    "create -x one",
+    "start",
+    "start one",
+    "join one",
+    "join one -p pw",
+    "join",
+    "list",
+    "stats",
+    "stats bob",
+    "stats bob alice",
+    "help",
+    "help create",
+    "do",
+    "do income",
+    "do foreign_aid",
+    "do steal bob",
+    "do steal",
+    "do assassinate bob",
+    "do assassinate bob duke",
+    "do coup bob duke extra",
+    "do fly",
+    "counter",
+    "counter duke",
+    "challenge bob",
+    "challenge",
+    "accept",
+    "select 1",
+    "select 1 2",
+    "select -1",
+    "select",
+    "status",
+    "forfeit now",
+    "bogus",
+    "-h",
+    "--",
+    "",
+]
+
+
+class DispatchTableTester(unittest.TestCase):
+    def test_matches_argparse(self):
+        table = DispatchTable(command_parser, {})
+
+        for command in commands:
+            arguments = command.split()
+            try:
+                expected = vars(command_parser.parse_args(arguments))
+            except MalformedCLICommand as e:
+                with self.assertRaises(MalformedCLICommand) as raised:
+                    table.parse(arguments)
+                self.assertEqual(raised.exception.args, e.args, command)
+            else:
+                self.assertEqual(table.parse(arguments), expected, command)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+from gamebot.bots.flood import TokenBucket, SendScheduler
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTester(unittest.TestCase):
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=5, clock=clock)
+
+        for _ in range(5):
+            self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertAlmostEqual(bucket.next_available(), clock.now + 0.5)
+
+        clock.now += 0.5
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+
+    def test_credits_are_capped(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=5, clock=clock)
+
+        clock.now += 60
+        sent = 0
+        while bucket.consume():
+            sent += 1
+        self.assertEqual(sent, 5)
+
+
+class SendSchedulerTester(unittest.TestCase):
+    def drain(self, scheduler):
+        sent = []
+        msg = scheduler.pop()
+        while msg is not None:
+            sent.append(msg)
+            msg = scheduler.pop()
+        return sent
+
+    def test_fifo_across_lanes(self):
+        clock = FakeClock()
+        scheduler = SendScheduler(clock=clock)
+
+        scheduler.push("a1", lane="a")
+        scheduler.push("b1", lane="b")
+        scheduler.push("a2", lane="a")
+
+        self.assertEqual(self.drain(scheduler), ["a1", "b1", "a2"])
+        self.assertEqual(len(scheduler), 0)
+        self.assertIsNone(scheduler.next_send_time())
+
+    def test_delay_only_holds_its_lane(self):
+        clock = FakeClock()
+        scheduler = SendScheduler(clock=clock)
+
+        scheduler.push("identify", delay=25)
+        scheduler.push("join")
+        scheduler.push("hello", lane="player")
+
+        self.assertEqual(self.drain(scheduler), ["identify", "hello"])
+        self.assertEqual(scheduler.next_send_time(), clock.now + 25)
+
+        clock.now += 25
+        self.assertEqual(self.drain(scheduler), ["join"])
+
+    def test_priority_and_credits(self):
+        clock = FakeClock()
+        scheduler = SendScheduler(clock=clock)
+
+        for x in range(7):
+            scheduler.push("line {}".format(x), lane="player")
+        scheduler.push("PONG", priority=True)
+
+        sent = self.drain(scheduler)
+        self.assertEqual(sent, ["PONG", "line 0", "line 1", "line 2", "line 3"])
+        self.assertEqual(scheduler.next_send_time(), clock.now + 0.5)
+
+        clock.now += 1
+        self.assertEqual(self.drain(scheduler), ["line 4", "line 5"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,10 @@ from argparse import Namespace
 
 from gamebot.game import BaseGame
 from gamebot.game.player import BasePlayer
+from gamebot.game.seating import SeatRing
 from gamebot.game.instance import BaseInstance
 
-from gamebot.coup.exceptions import GameInvalidOperation, GamePermissionError
+from gamebot.coup.exceptions import GameInvalidOperation, GamePermissionError, GameNotFoundException
 
 base_parameters = {'name': 'testgame',
                    'password': 'pass'}
@@ -109,3 +110,57 @@ class BaseGameTester(unittest.TestCase):
         self.assertTrue(game.my_turn(other.name))
         self.assertFalse(game.my_turn(me.name))
 
+
+class BaseInstanceTester(unittest.TestCase):
+    def test_user_index(self):
+        instance = BaseInstance()
+        game = BaseGame(instance, default_user, default_players, args)
+        other_game = BaseGame(instance, 'other', default_players, Namespace(name='othergame', password=None))
+        instance.add_game(game.name, game)
+        instance.add_game(other_game.name, other_game)
+
+        with self.assertRaises(GameNotFoundException):
+            instance.find_user_game(default_user)
+
+        game.add_player(BasePlayer(default_user), args.password)
+        self.assertIs(instance.find_user_game(default_user), game)
+
+        with self.assertRaises(GameInvalidOperation):
+            other_game.add_player(BasePlayer(default_user), None)
+
+        instance.remove_game(game.name)
+        with self.assertRaises(GameNotFoundException):
+            instance.find_user_game(default_user)
+
+        other_game.add_player(BasePlayer(default_user), None)
+        self.assertIs(instance.find_user_game(default_user), other_game)
+
+
+class SeatRingTester(unittest.TestCase):
+    def test_advance_and_remove(self):
+        seats = SeatRing(['a', 'b', 'c', 'd'])
+
+        self.assertEqual(seats.current_name(), 'a')
+        self.assertEqual(seats.advance(), 'b')
+
+        seats.remove('c')
+        self.assertEqual(len(seats), 3)
+        self.assertEqual(seats.advance(), 'd')
+        self.assertEqual(seats.advance(), 'a')
+        self.assertEqual(list(seats), ['a', 'b', 'd'])
+
+    def test_remove_current_player(self):
+        seats = SeatRing(['a', 'b', 'c', 'd'])
+        seats.advance()
+
+        # b forfeits during their own turn, then c dies before the turn passes
+        seats.remove('b')
+        self.assertEqual(seats.current_name(), 'b')
+        seats.remove('c')
+        self.assertEqual(seats.advance(), 'd')
+
+        seats.remove('a')
+        self.assertEqual(seats.advance(), 'd')
+        self.assertEqual(len(seats), 1)
+        self.assertFalse('a' in seats)
+        self.assertTrue('d' in seats)
@@ -0,0 +1,338 @@
+import socket
+import time
+import unittest
+
+from gamebot.bots.irc_simple import irc_connection
+from gamebot.bots.irc_protocol import LineFramer, tokenize, parse_bot_command
+from gamebot.coup.game import Instance
+from gamebot.coup.cli import CoupCLIParser
+
+
+def make_connection(**kwargs):
+    bot_side, server_side = socket.socketpair()
+    instance = Instance()
+    connection = irc_connection(CoupCLIParser(instance), ["#coup"], "coupbot", sock=bot_side, **kwargs)
+    return connection, server_side
+
+
+class LineFramerTester(unittest.TestCase):
+    def test_many_lines_per_read(self):
+        framer = LineFramer()
+
+        lines = framer.feed(b"PING :irc.example.net\r\n:a!b@c PRIVMSG coupbot :.list\r\n")
+        self.assertEqual(lines, ["PING :irc.example.net", ":a!b@c PRIVMSG coupbot :.list"])
+        self.assertEqual(framer.buffer, b"")
+
+    def test_line_split_across_reads(self):
+        framer = LineFramer()
+
+        self.assertEqual(framer.feed(b":a!b@c PRIVMSG coupbot :.cre"), [])
+        self.assertEqual(framer.feed(b"ate game\r"), [])
+        self.assertEqual(framer.feed(b"\nPING :x\r\n:a!b"), [":a!b@c PRIVMSG coupbot :.create game", "PING :x"])
+        self.assertEqual(framer.buffer, b":a!b")
+
+    def test_multibyte_split(self):
+        framer = LineFramer()
+        encoded = u"PRIVMSG #coup :caf\u00e9\r\n".encode("utf-8")
+
+        self.assertEqual(framer.feed(encoded[:-4]), [])
+        self.assertEqual(framer.feed(encoded[-4:]), [u"PRIVMSG #coup :caf\u00e9"])
+
+
+class TokenizerTester(unittest.TestCase):
+    def test_tokenize(self):
+        message = tokenize(":nick!user@host PRIVMSG #coup :hello there :)")
+        self.assertEqual(message.prefix, "nick!user@host")
+        self.assertEqual(message.nick, "nick")
+        self.assertEqual(message.command, "PRIVMSG")
+        self.assertEqual(message.params, ("#coup",))
+        self.assertEqual(message.trailing, "hello there :)")
+
+        message = tokenize(":irc.example.net 001 coupbot :Welcome")
+        self.assertEqual((message.command, message.params, message.trailing), ("001", ("coupbot",), "Welcome"))
+
+        message = tokenize("PING :irc.example.net")
+        self.assertEqual((message.prefix, message.command, message.trailing), (None, "PING", "irc.example.net"))
+
+        message = tokenize(":nick!user@host MODE #coup +o nick")
+        self.assertEqual((message.params, message.trailing), (("#coup", "+o", "nick"), None))
+
+    def test_bot_command(self):
+        command = parse_bot_command(":alice!a@host PRIVMSG coupbot :.do steal bob", "coupbot")
+        self.assertEqual(command['nick'], "alice")
+        self.assertEqual(command.command, "do steal bob")
+        self.assertEqual((command.user, command.host, command.sentto), ("a", "host", "coupbot"))
+        self.assertTrue(command.is_priv)
+
+        command = parse_bot_command(":alice!a@host PRIVMSG #coup :.list", "coupbot")
+        self.assertFalse(command.is_priv)
+
+        self.assertIsNone(parse_bot_command(":alice!a@host PRIVMSG #coup :hi all", "coupbot"))
+        self.assertIsNone(parse_bot_command(":alice!a@host PRIVMSG #coup :hi :.list", "coupbot"))
+        self.assertIsNone(parse_bot_command(":alice!a@host NOTICE coupbot :.list", "coupbot"))
+
+
+class IRCConnectionTester(unittest.TestCase):
+    def setUp(self):
+        self.connection, self.server = make_connection()
+
+    def tearDown(self):
+        self.connection.disconnect()
+        self.server.close()
+
+    def test_game_queue_drained_in_one_pass(self):
+        instance = self.connection.parser.instance
+        queued = len(self.connection.msgqueue)
+
+        instance.msgqueue.append(("private message", ("alice", "You have Duke and Captain.")))
+        instance.msgqueue.append(("private message", ("bob", "You have Contessa and Assassin.")))
+        instance.msgqueue.append(("private message", ("alice", "You are the first player.\nPlease choose an action.")))
+        self.connection.process_game_queue()
+
+        self.assertEqual(len(instance.msgqueue), 0)
+        self.assertEqual(len(self.connection.msgqueue), queued + 4)
+
+        pending = self.connection.msgqueue.pending()
+        self.assertEqual([x for x in pending if x.startswith("PRIVMSG alice")],
+                         ["PRIVMSG alice :You have Duke and Captain.\n",
+                          "PRIVMSG alice :You are the first player.\n",
+                          "PRIVMSG alice :Please choose an action.\n"])
+
+    def test_receive_several_commands_in_one_packet(self):
+        self.server.sendall(b":alice!a@host PRIVMSG coupbot :.create one\r\n"
+                            b":bob!b@host PRIVMSG coupbot :.join one\r\n")
+
+        lines = self.connection.process_send_recv()
+        for line in lines:
+            self.assertTrue(self.connection.handle_line(line))
+
+        game = self.connection.parser.instance.find_game_by_name('one')
+        self.assertEqual(list(game.players), ['alice', 'bob'])
+
+    def test_rooms_on_demand(self):
+        joins = [x for x in self.connection.msgqueue.pending() if x.startswith("JOIN")]
+        self.assertEqual(joins, ["JOIN #coup\n", "JOIN ##coup_gameroom_1\n", "JOIN ##coup_gameroom_2\n"])
+        self.assertTrue(self.connection.handle_line(":coupbot!coupbot@host JOIN ##coup_gameroom_1"))
+        self.assertEqual(self.connection.rooms.free[0][0], "##coup_gameroom_1")
+
+        instance = self.connection.parser.instance
+        for number in range(12):
+            instance.msgqueue.append(("create room", "game{0}".format(number)))
+        self.connection.process_game_queue()
+        self.assertEqual(self.connection.assigned_game_rooms["game0"], "##coup_gameroom_1")
+        self.assertEqual(self.connection.assigned_game_rooms["game11"], "##coup_gameroom_12")
+        self.assertIn("JOIN ##coup_gameroom_14\n", self.connection.msgqueue.pending())
+
+    def test_refused_room_moves_the_game(self):
+        instance = self.connection.parser.instance
+        self.assertTrue(self.connection.handle_line(":alice!a@host PRIVMSG coupbot :.create one"))
+        self.connection.process_game_queue()
+        self.assertEqual(self.connection.assigned_game_rooms["one"], "##coup_gameroom_1")
+        self.assertTrue(self.connection.handle_line(
+            ":server 474 coupbot ##Coup_gameroom_1 :Cannot join channel (+b)"))
+        self.assertEqual(self.connection.assigned_game_rooms["one"], "##coup_gameroom_4")
+        pending = self.connection.msgqueue.pending()
+        self.assertIn("JOIN ##coup_gameroom_4\n", pending)
+        self.assertIn("INVITE alice ##coup_gameroom_4\n", pending)
+        self.assertIn("one", instance.games)
+
+    def test_unknown_game_event(self):
+        self.connection.parser.instance.msgqueue.append(("bogus", None))
+        with self.assertRaises(TypeError):
+            self.connection.process_game_queue()
+
+
+class RegistrationTester(unittest.TestCase):
+    def tearDown(self):
+        self.connection.disconnect()
+        self.server.close()
+
+    def sent(self):
+        self.connection.send_pending()
+        self.server.setblocking(False)
+        try:
+            data = self.server.recv(65536)
+        except BlockingIOError:
+            return []
+        return data.decode("utf-8").splitlines()
+
+    def receive(self, *lines):
+        for line in lines:
+            self.connection.handle_line(line)
+
+    def test_joins_wait_for_welcome(self):
+        self.connection, self.server = make_connection()
+        self.assertEqual(self.sent(), ["NICK coupbot", "USER coupbot coupbot coupbot coupbot"])
+        self.assertEqual(self.sent(), [])
+        self.assertIsNone(self.connection.next_send_time())
+
+        self.receive(":irc.example.net 001 coupbot :Welcome")
+        self.assertEqual(self.sent(), ["JOIN #coup", "JOIN ##coup_gameroom_1", "JOIN ##coup_gameroom_2"])
+        self.assertIsNone(self.connection.time_to_ready())
+        self.receive(":coupbot!coupbot@host JOIN #coup")
+        self.assertGreaterEqual(self.connection.time_to_ready(), 0)
+
+    def test_joins_wait_for_nickserv(self):
+        self.connection, self.server = make_connection(botpass="secret")
+        self.assertEqual(self.sent(), ["PASS secret", "NICK coupbot", "USER coupbot coupbot coupbot coupbot"])
+        self.receive(":irc.example.net 001 coupbot :Welcome")
+        self.assertEqual(self.sent(), ["PRIVMSG nickserv :identify secret"])
+        self.assertEqual(self.sent(), [])
+        self.assertGreater(self.connection.next_send_time(), time.time() + 5)
+
+        self.receive(":NickServ!NickServ@services. NOTICE coupbot :You are now identified for coupbot.")
+        self.assertEqual(self.sent()[0], "JOIN #coup")
+
+    def test_nick_in_use(self):
+        self.connection, self.server = make_connection()
+        self.sent()
+        with self.assertLogs(level='WARNING'):
+            self.receive(":irc.example.net 433 * coupbot :Nickname is already in use")
+        self.assertEqual(self.sent(), ["NICK coupbot_"])
+        self.receive(":irc.example.net 001 coupbot_ :Welcome")
+        self.assertEqual(self.connection.botnick, "coupbot_")
+        self.assertEqual(self.sent()[0], "JOIN #coup")
+
+        self.assertTrue(self.connection.handle_line(":alice!a@host PRIVMSG coupbot_ :.create one"))
+        self.assertTrue(self.connection.parser.instance.game_exists('one'))
+
+    def test_every_nick_in_use(self):
+        self.connection, self.server = make_connection()
+        for _ in range(self.connection.nick_attempts):
+            self.receive(":irc.example.net 433 * coupbot :Nickname is already in use")
+        self.sent()
+        with self.assertLogs(level='ERROR'):
+            self.receive(":irc.example.net 433 * coupbot :Nickname is already in use")
+        self.assertEqual(self.sent(), [])
+
+    def test_not_registered(self):
+        self.connection, self.server = make_connection()
+        self.sent()
+        with self.assertLogs(level='WARNING'):
+            self.receive(":irc.example.net 451 * JOIN :You have not registered")
+        self.assertEqual(self.sent(), ["NICK coupbot", "USER coupbot coupbot coupbot coupbot"])
+
+    def test_welcome_timeout(self):
+        self.connection, self.server = make_connection()
+        self.sent()
+        self.assertLessEqual(self.connection.next_timeout(), self.connection.welcome_timeout)
+        self.connection.check_welcome(time.time())
+        self.assertEqual(self.sent(), [])
+        with self.assertLogs(level='WARNING'):
+            self.connection.check_welcome(time.time() + self.connection.welcome_timeout)
+        self.assertEqual(self.sent()[0], "JOIN #coup")
+        self.assertIsNone(self.connection.welcome_deadline())
+
+    def test_join_echo_in_other_case(self):
+        self.connection, self.server = make_connection()
+        self.receive(":irc.example.net 001 coupbot :Welcome", ":CoupBot!coupbot@host JOIN #Coup")
+        self.assertIsNotNone(self.connection.time_to_ready())
+        self.assertIn("#coup", self.connection.joined)
+
+
+class ConnectionPoolTester(unittest.TestCase):
+    def setUp(self):
+        self.connection, server = make_connection()
+        self.servers = [server]
+        for number in (2, 3):
+            bot_side, server_side = socket.socketpair()
+            self.connection.add_link("coupbot_{0}".format(number), sock=bot_side)
+            self.servers.append(server_side)
+        self.connection.process_game_queue()
+        for link, server in zip(self.connection.links, self.servers):
+            self.welcome(link, server, self.connection.channels + self.connection.rooms.rooms())
+
+    def welcome(self, link, server, channels):
+        """ Has the server register link and confirm its joins """
+        lines = [":irc.example.net 001 {0} :Welcome".format(link.botnick)]
+        lines.extend(":{0}!{0}@host JOIN {1}".format(link.botnick, channel) for channel in channels)
+        if link is self.connection:
+            for line in lines:
+                self.connection.handle_line(line)
+        else:
+            server.sendall("".join(line + "\r\n" for line in lines).encode("utf-8"))
+            self.connection.receive_links()
+        self.assertIsNotNone(link.ready_at)
+
+    def tearDown(self):
+        self.connection.disconnect()
+        for server in self.servers:
+            server.close()
+
+    def messages(self, link):
+        return [x for x in link.msgqueue.pending() if x.startswith("PRIVMSG") and "nickserv" not in x]
+
+    def test_links_join_the_channels(self):
+        link = self.connection.links[1]
+        pending = link.msgqueue.pending()
+        self.assertIn("NICK coupbot_2\n", pending)
+        self.assertIn("JOIN #coup\n", pending)
+        self.assertEqual(len([x for x in pending if x.startswith("JOIN")]),
+                         len(self.connection.channels) + len(self.connection.rooms))
+
+    def test_recipients_spread_and_keep_their_link(self):
+        instance = self.connection.parser.instance
+        for name in ("alice", "bob", "carol"):
+            instance.msgqueue.append(("private message", (name, "Hello {0}".format(name))))
+        instance.msgqueue.append(("private message", ("alice", "You have Duke and Captain.")))
+        self.connection.process_game_queue()
+
+        by_link = [self.messages(link) for link in self.connection.links]
+        self.assertTrue(all(by_link))
+        alice = [link for link, lines in zip(self.connection.links, by_link) if "PRIVMSG alice :Hello alice\n" in lines]
+        self.assertEqual(len(alice), 1)
+        self.assertEqual(self.messages(alice[0])[-1], "PRIVMSG alice :You have Duke and Captain.\n")
+
+    def test_only_ready_links_take_recipients(self):
+        bot_side, server_side = socket.socketpair()
+        self.servers.append(server_side)
+        link = self.connection.add_link("coupbot_4", sock=bot_side)
+        instance = self.connection.parser.instance
+        for number in range(12):
+            instance.msgqueue.append(("private message", ("player{0}".format(number), "Hello")))
+        self.connection.process_game_queue()
+        self.assertEqual(self.messages(link), [])
+
+        self.welcome(link, server_side, ["#coup"])
+        self.assertIs(self.connection.route("newcomer"), link)
+
+    def test_rooms_go_to_links_in_them(self):
+        instance = self.connection.parser.instance
+        instance.msgqueue.append(("create room", "one"))
+        self.connection.process_game_queue()
+        room = self.connection.assigned_game_rooms["one"]
+        # The bot is kicked from the room and the third link never got in, which leaves the second one
+        self.connection.handle_line(":chanop!c@host KICK {0} coupbot :bye".format(room))
+        self.assertNotIn(room.lower(), self.connection.joined)
+        self.connection.links[2].joined.discard(room.lower())
+
+        instance.msgqueue.extend(("game message", ("one", "Line {0}".format(number))) for number in range(3))
+        self.connection.process_game_queue()
+        in_room = [[x for x in self.messages(link) if x.startswith("PRIVMSG {0} ".format(room))]
+                   for link in self.connection.links]
+        self.assertEqual([len(x) for x in in_room], [0, 3, 0])
+
+    def test_commands_to_added_nicks(self):
+        self.servers[1].sendall(b":alice!a@host PRIVMSG coupbot_2 :.create one\r\n"
+                                b":bob!b@host PRIVMSG #coup :.create two\r\n")
+        self.connection.receive_links()
+        instance = self.connection.parser.instance
+        self.assertTrue(instance.game_exists('one'))
+        # Channel lines reach every link; the bot's own connection runs their commands
+        self.assertFalse(instance.game_exists('two'))
+        self.assertIn("PRIVMSG alice :Game 'one' created\n",
+                      [x for link in self.connection.links for x in self.messages(link)])
+
+    def test_lost_link_hands_its_lines_over(self):
+        link = self.connection.links[2]
+        link.sendmsg("alice", "first\nsecond")
+        self.servers[2].close()
+        self.connection.receive_links()
+
+        self.assertNotIn(link, self.connection.links)
+        self.assertEqual(self.messages(self.connection)[-2:], ["PRIVMSG alice :first\n", "PRIVMSG alice :second\n"])
+        self.assertIs(self.connection.route("alice"), self.connection)
+
+
+if __name__ == '__main__':
+    unittest.main()
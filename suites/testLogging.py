@@ -0,0 +1,94 @@
+import logging
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from gamebot.logging import DroppingQueueHandler, Listener, StructuredFormatter
+
+
+class Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class Counted(object):
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "counted"
+
+
+class LoggingTester(unittest.TestCase):
+    def setUp(self):
+        self.handler = DroppingQueueHandler(queue.Queue(3))
+        self.logger = logging.getLogger('suites.testLogging')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        self.output = Recorder()
+        self.output.setFormatter(StructuredFormatter(fmt='%(levelname)s %(message)s'))
+        self.listener = Listener(self.handler.queue, self.handler)
+        self.listener.handlers = (self.output,)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        if self.listener.running:
+            self.listener.stop()
+
+    def test_structured_fields(self):
+        self.logger.info("%s << .%s", "alice", "do income",
+                         extra={'nick': "alice", 'command': "do income", 'latency': 0.00125})
+        self.logger.debug("Assigning room %s", "#coup1", extra={'game': "one"})
+        self.listener.start()
+        self.listener.stop()
+        self.assertEqual(self.output.lines, ["INFO alice << .do income {nick=alice command=do income latency=1.25ms}",
+                                             "DEBUG Assigning room #coup1 {game=one}"])
+
+    def test_formatted_by_listener(self):
+        value = Counted()
+        self.logger.debug("value %s", value)
+        self.assertEqual(value.formatted, 0)
+        self.listener.start()
+        self.listener.stop()
+        self.assertEqual(value.formatted, 1)
+        self.assertEqual(self.output.lines, ["DEBUG value counted"])
+
+    def test_drops_on_overflow(self):
+        for number in range(5):
+            self.logger.info("record %d", number)
+        self.assertEqual(self.handler.dropped, 2)
+        self.listener.start()
+        self.listener.stop()
+        self.assertEqual(self.output.lines, ["WARNING Log queue full, dropped 2 record(s)", "INFO record 0",
+                                             "INFO record 1", "INFO record 2"])
+
+    def test_forked_process_logs(self):
+        script = (
+            "import logging, os, sys\n"
+            "from gamebot.logging import after_fork, log_to_file, stop_logging\n"
+            "log_to_file(sys.argv[1], logging.INFO)\n"
+            "logging.info('parent')\n"
+            "pid = os.fork()\n"
+            "if pid == 0:\n"
+            "    after_fork()\n"
+            "    logging.info('child')\n"
+            "    stop_logging()\n"
+            "    os._exit(0)\n"
+            "os.waitpid(pid, 0)\n")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log")
+            subprocess.run([sys.executable, "-c", script, path], check=True, timeout=30,
+                           env=dict(os.environ, PYTHONPATH=root))
+            with open(path) as log:
+                lines = [line.split(":")[1].split(" - ")[0].strip() for line in log]
+        self.assertEqual(sorted(lines), ["child", "parent"])
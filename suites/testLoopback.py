@@ -0,0 +1,89 @@
+import threading
+import unittest
+
+from gamebot.bots.loopback import LoopbackServer
+from gamebot.coup.loadgen import LoadGenerator, LoadReport, command_text
+
+
+class LoopbackTester(unittest.TestCase):
+    def setUp(self):
+        self.server = LoopbackServer()
+        self.server.start()
+        self.lines = dict()
+        self.condition = threading.Condition()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def add_user(self, nick):
+        self.lines[nick] = []
+
+        def deliver(line):
+            with self.condition:
+                self.lines[nick].append(line)
+                self.condition.notify_all()
+        self.server.add_user(nick, deliver)
+        self.assertTrue(self.server.wait_for_nick(nick, 5))
+
+    def wait_for(self, nick, count):
+        with self.condition:
+            self.assertTrue(self.condition.wait_for(lambda: len(self.lines[nick]) >= count, 5))
+        return self.lines[nick]
+
+    def test_ping_and_relay(self):
+        self.add_user('alice')
+        self.add_user('bob')
+        self.server.send_as('alice', 'PING :token')
+        self.server.send_as('alice', 'PRIVMSG bob :hello there')
+        self.assertEqual(self.wait_for('alice', 2)[1:], [':loopback PONG loopback :token'])
+        self.assertEqual(self.wait_for('bob', 2)[1:], [':alice!alice@loopback PRIVMSG bob :hello there'])
+
+    def test_channel(self):
+        self.add_user('alice')
+        self.add_user('bob')
+        self.server.send_as('alice', 'JOIN #room')
+        self.server.send_as('bob', 'JOIN #room')
+        self.server.send_as('bob', 'PRIVMSG #room :hi')
+        self.assertEqual(self.wait_for('alice', 4)[-1], ':bob!bob@loopback PRIVMSG #room :hi')
+
+    def test_command_text(self):
+        self.assertEqual(command_text('do', {'do': 'steal', 'target': 'bob'}), 'do steal bob')
+        self.assertEqual(command_text('keep', {'cards': ['duke', 'captain']}), 'keep duke captain')
+
+
+class LoadGeneratorTester(unittest.TestCase):
+    def run_load(self, duration, connections=1, **options):
+        server = LoopbackServer(**options)
+        server.start()
+        try:
+            generator = LoadGenerator(server, games=2, players=3, seed=3, bot_rate=100000, connections=connections)
+            return generator.run(duration)
+        finally:
+            server.stop()
+
+    def test_games_finish(self):
+        report = self.run_load(30, rate=100000, burst=100000)
+        self.assertEqual(report.finished, 2)
+        self.assertEqual(report.timeouts, 0)
+        self.assertTrue(report.latencies)
+        self.assertEqual(report.flood_events, [])
+        self.assertLess(report.time_to_ready, 1.0)
+
+    def test_no_latency_samples(self):
+        report = LoadReport()
+        self.assertIsNone(report.percentiles())
+        self.assertEqual(report.latency_summary(), "n/a")
+        report.latencies.append(0.002)
+        self.assertEqual(report.latency_summary(), "p50 2.0  p90 2.0  p99 2.0  max 2.0")
+
+    def test_connection_pool(self):
+        report = self.run_load(30, connections=3, rate=100000, burst=100000)
+        self.assertEqual(report.finished, 2)
+        self.assertEqual(report.timeouts, 0)
+        self.assertEqual(sorted(report.lines_by_nick), ['coupbot', 'coupbot_2', 'coupbot_3'])
+
+    def test_excess_flood(self):
+        report = self.run_load(2, rate=0.5, burst=1, max_backlog=3, kill_on_flood=True)
+        self.assertEqual(len(report.flood_events), 1)
+        self.assertEqual(report.flood_events[0].nick, 'coupbot')
+        self.assertTrue(report.flood_events[0].killed)
@@ -2,6 +2,8 @@ import unittest
 
 from gamebot.coup.game import Instance
 from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.actions import ExchangeOne, ExchangeTwo, Embezzle
+from gamebot.coup.exceptions import GameInvalidOperation
 
 
 class MyTestCase(unittest.TestCase):
@@ -36,6 +38,25 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(instance.msgqueue.popleft(), ('game message',
                                                        ('one', '{} takes income for 1 coin'.format(current))))
 
+    def test_rule_variants(self):
+        instance = Instance()
+        cliparser = CoupCLIParser(instance)
+
+        cliparser.parse_input({'nick': 'a', 'command': 'create one'})
+        cliparser.parse_input({'nick': 'b', 'command': 'create two'})
+        cliparser.parse_input({'nick': 'c', 'command': 'create three --amb -t'})
+        one, two, three = [instance.find_game_by_name(x) for x in ('one', 'two', 'three')]
+
+        self.assertIs(one.rules, two.rules)
+        self.assertIs(one.get_action_by_name('exchange'), ExchangeOne)
+        self.assertIs(three.get_action_by_name('exchange'), ExchangeTwo)
+        self.assertIs(three.get_action_by_name('embezzle'), Embezzle)
+        with self.assertRaises(GameInvalidOperation):
+            one.get_action_by_name('embezzle')
+
+        self.assertTrue(cliparser.parse_input({'nick': 'a', 'command': 'do income'}).startswith("Error:"))
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.persistence import Recorder, read_journal
+from gamebot.coup.state import PackedState
+
+
+class RecorderTester(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play(self, recorder):
+        instance = recorder.recover(lambda: Instance(seed=9))
+        cliparser = CoupCLIParser(instance)
+        for nick, command in [('a', 'create one'), ('b', 'join one'), ('c', 'join one'), ('a', 'start'),
+                              ('d', 'create two'), ('e', 'join two')]:
+            cliparser.parse_input({'nick': nick, 'command': command})
+        game = instance.find_game_by_name('one')
+        current = game.current_player_name()
+        cliparser.parse_input({'nick': current, 'command': 'do foreign_aid'})
+        # Nobody answers in time
+        instance.checkevents()
+        instance.timers.run_due(game.event_queue.next_event)
+        return instance
+
+    def recovered(self, **options):
+        recorder = Recorder(self.directory, **options)
+        instance = recorder.recover(lambda: Instance(seed=9))
+        recorder.close()
+        return recorder, instance
+
+    def assertSameGames(self, first, second):
+        self.assertEqual(sorted(first.games), sorted(second.games))
+        self.assertEqual(sorted(first.user_games), sorted(second.user_games))
+        one, two = first.find_game_by_name('one'), second.find_game_by_name('one')
+        self.assertEqual(PackedState.from_game(one), PackedState.from_game(two))
+        self.assertEqual(one.court_deck, two.court_deck)
+        self.assertEqual(one.rng.getstate(), two.rng.getstate())
+
+    def test_journal_replay(self):
+        recorder = Recorder(self.directory)
+        instance = self.play(recorder)
+        recorder.close()
+        self.assertEqual(len(read_journal(recorder.journal_path(recorder.segment))), 8)
+
+        recovered_recorder, recovered = self.recovered()
+        self.assertEqual(recovered_recorder.stats['recovered_records'], 8)
+        self.assertSameGames(instance, recovered)
+        self.assertIn(('create room', 'one'), recovered.msgqueue)
+        self.assertIn(('invite', ('c', 'one')), recovered.msgqueue)
+
+    def test_snapshots(self):
+        recorder = Recorder(self.directory, snapshot_records=3)
+        instance = self.play(recorder)
+        recorder.close()
+        self.assertEqual(recorder.stats['snapshots'], 2)
+        self.assertEqual(len(recorder.segments()), 1)
+
+        recovered_recorder, recovered = self.recovered()
+        self.assertLess(recovered_recorder.stats['recovered_records'], 3)
+        self.assertSameGames(instance, recovered)
+
+    def test_torn_record(self):
+        recorder = Recorder(self.directory)
+        instance = self.play(recorder)
+        recorder.close()
+        with open(recorder.journal_path(recorder.segment), 'a') as journal:
+            journal.write('{"t":1,"n":"e","c":"sta')
+
+        recovered_recorder, recovered = self.recovered()
+        self.assertSameGames(instance, recovered)
+        # The recovered state was folded into a snapshot and the torn journal removed
+        self.assertEqual(recovered_recorder.segments(), [recovered_recorder.segment])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, Recorder.snapshot_name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gamebot.coup.replay import Replay, load_recording, write_recording
+
+records = [{'t': 1.0, 'n': 'a', 'c': 'create one'},
+           {'t': 2.0, 'n': 'b', 'c': 'join one'},
+           {'t': 3.0, 'n': 'a', 'c': 'start'},
+           {'t': 4.0, 'n': 'a', 'c': 'do foreign_aid'},
+           {'t': 5.0, 'n': 'b', 'c': 'do income'},
+           {'t': 35.0, 'f': 'one'},
+           {'t': 36.0, 'n': 'b', 'c': 'status'}]
+
+
+class ReplayTester(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'recording.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replay(self):
+        result = Replay(seed=7).run(records, keep_output=True)
+        self.assertEqual(result.records, len(records))
+        self.assertEqual(result.checked, 0)
+        self.assertEqual(result.outputs[0], ["Game 'one' created", ('create room', 'one'), ('invite', ('a', 'one'))])
+        self.assertEqual(result.outputs[5], [('private message', ('b', 'It is your turn. Please choose an action.'))])
+        self.assertEqual(sorted(name for name, _, _, _, _, _ in result.summary()),
+                         ['(deadline)', 'create', 'do', 'join', 'start', 'status'])
+
+    def test_check_output(self):
+        result = Replay(seed=7).run(records, keep_output=True)
+        write_recording(self.path, records, result.outputs)
+
+        recorded = load_recording([self.path])
+        checked = Replay(seed=7).run(recorded)
+        self.assertEqual(checked.checked, len(records))
+        self.assertEqual(checked.mismatches, [])
+
+        # Another seed deals other cards, which shows in the start messages
+        diverged = Replay(seed=4).run(recorded)
+        self.assertTrue(diverged.mismatches)
+        self.assertEqual(diverged.mismatches[0].index, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+
+from gamebot.coup import resolution
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.exceptions import GameInvalidOperation
+from gamebot.coup.game import Instance
+from gamebot.coup.influence import contessa, duke, captain, assassin
+
+
+class ResolutionTester(unittest.TestCase):
+    def setUp(self):
+        self.instance = Instance(seed=1)
+        self.cliparser = CoupCLIParser(self.instance)
+        self.parse('alice', 'create one')
+        self.parse('bob', 'join one')
+        self.parse('carol', 'join one')
+        self.parse('alice', 'start')
+        self.game = self.instance.find_game_by_name('one')
+        self.first, self.second, self.third = [self.game.players[name] for name in self.game.seats]
+
+    def parse(self, nick, command):
+        return self.cliparser.parse_input({'nick': nick, 'command': command})
+
+    def deal(self, player, *cards):
+        player.available_influence[:] = cards
+
+    def test_income_needs_no_responses(self):
+        self.assertIsNone(self.parse(self.first.name, 'do income'))
+        self.assertEqual(self.first.cash(), 3)
+        self.assertEqual(self.game.event_queue.phase, resolution.IDLE)
+        self.assertEqual(self.game.current_player_name(), self.second.name)
+
+    def test_accepted_claim_resolves(self):
+        self.parse(self.first.name, 'do tax')
+        self.assertEqual(self.game.event_queue.phase, resolution.DECLARED)
+        self.assertTrue(self.parse(self.first.name, 'do income').startswith("Error:"))
+
+        self.parse(self.second.name, 'accept')
+        self.assertEqual(self.first.cash(), 2)
+        self.parse(self.third.name, 'accept')
+        self.assertEqual(self.first.cash(), 5)
+        self.assertEqual(self.game.current_player_name(), self.second.name)
+
+    def test_failed_challenge(self):
+        self.deal(self.first, duke, contessa)
+        self.deal(self.second, captain, assassin)
+        self.parse(self.first.name, 'do tax')
+        self.parse(self.second.name, 'challenge {0}'.format(self.first.name))
+
+        # The challenger picks the card they lose, then the tax goes through
+        self.assertEqual(self.game.event_queue.phase, resolution.LOSE_INFLUENCE)
+        self.assertTrue(self.parse(self.first.name, 'select 1').startswith("Error:"))
+        self.parse(self.second.name, 'select 2')
+        self.assertEqual(self.second.available_influence, [captain])
+        self.assertEqual(self.second.revealed_influence, [assassin])
+        self.assertEqual(self.first.cash(), 5)
+        self.assertEqual(self.first.influence_remaining(), 2)
+
+    def test_successful_challenge(self):
+        self.deal(self.first, captain, contessa)
+        self.parse(self.first.name, 'do tax')
+        self.parse(self.third.name, 'challenge {0}'.format(self.first.name))
+        self.parse(self.first.name, 'select 1')
+
+        self.assertEqual(self.first.revealed_influence, [captain])
+        self.assertEqual(self.first.cash(), 2)
+        self.assertEqual(self.game.current_player_name(), self.second.name)
+
+    def test_counter(self):
+        self.deal(self.second, duke, contessa)
+        self.parse(self.first.name, 'do foreign_aid')
+        self.assertTrue(self.parse(self.second.name, 'counter captain').startswith("Error:"))
+        self.parse(self.second.name, 'counter duke')
+        self.assertEqual(self.game.event_queue.phase, resolution.COUNTERED)
+
+        self.parse(self.first.name, 'accept')
+        self.parse(self.third.name, 'accept')
+        self.assertEqual(self.first.cash(), 2)
+        self.assertEqual(self.game.current_player_name(), self.second.name)
+
+    def test_timeout_resolves(self):
+        self.parse(self.first.name, 'do foreign_aid')
+        self.instance.timers.run_due(self.game.event_queue.next_event)
+        self.assertEqual(self.first.cash(), 4)
+
+    def test_mandatory_coup(self):
+        self.first.coins = 10
+        self.assertTrue(self.parse(self.first.name, 'do income').startswith("Error:"))
+        self.parse(self.first.name, 'do coup {0}'.format(self.second.name))
+        self.assertEqual(self.first.cash(), 3)
+        self.assertEqual(self.game.event_queue.state.chooser, self.second)
+
+    def test_winner(self):
+        self.parse(self.second.name, 'forfeit')
+        self.assertFalse(self.game.is_finished)
+        self.parse(self.third.name, 'forfeit')
+
+        self.assertTrue(self.game.is_finished)
+        self.assertIs(self.game.winner, self.first)
+        self.assertFalse(self.instance.game_exists('one'))
+        self.assertNotIn(self.first.name, self.instance.user_games)
+
+    def test_second_action_costs_nothing(self):
+        self.first.coins = 7
+        self.parse(self.first.name, 'do tax')
+        self.assertTrue(self.parse(self.first.name, 'do coup {0}'.format(self.second.name)).startswith("Error:"))
+        self.assertTrue(self.parse(self.first.name, 'do assassinate {0}'.format(self.second.name)).startswith("Error:"))
+        self.assertEqual(self.first.cash(), 7)
+
+    def test_rejected_action_is_not_announced(self):
+        self.parse(self.first.name, 'do tax')
+        self.instance.msgqueue.clear()
+        self.assertTrue(self.parse(self.first.name, 'do income').startswith("Error:"))
+        self.assertTrue(self.parse(self.first.name, 'do steal {0}'.format(self.second.name)).startswith("Error:"))
+        self.assertEqual(list(self.instance.msgqueue), [])
+
+    def test_forfeit_before_start(self):
+        self.parse('dave', 'create two')
+        self.parse('erin', 'join two')
+        self.parse('frank', 'join two')
+        self.parse('erin', 'forfeit')
+        game = self.instance.find_game_by_name('two')
+        self.assertEqual(list(game.players), ['dave', 'frank'])
+        self.assertEqual(list(game.seats), ['dave', 'frank'])
+        self.assertEqual(self.parse('erin', 'join two'), "Joined game 'two'")
+        self.assertEqual(list(game.seats), ['dave', 'frank', 'erin'])
+
+    def test_forfeit_while_exchanging(self):
+        self.parse('dave', 'create two --amb')
+        self.parse('erin', 'join two')
+        self.parse('frank', 'join two')
+        self.parse('dave', 'start')
+        game = self.instance.find_game_by_name('two')
+        actor, second, third = [game.players[name] for name in game.seats]
+
+        def cards():
+            return len(game.court_deck) + sum(len(player.available_influence) + len(player.revealed_influence)
+                                              for player in game.players.values())
+        self.assertEqual(cards(), 15)
+        self.parse(actor.name, 'do exchange')
+        self.parse(second.name, 'accept')
+        self.parse(third.name, 'accept')
+        self.assertEqual(game.event_queue.phase, resolution.EXCHANGE)
+        self.parse(actor.name, 'forfeit')
+        self.assertEqual(game.event_queue.phase, resolution.IDLE)
+        self.assertEqual(cards(), 15)
+
+    def test_creator_forfeits_before_start(self):
+        self.parse('dave', 'create two')
+        self.parse('erin', 'join two')
+        self.parse('dave', 'forfeit')
+        game = self.instance.find_game_by_name('two')
+        self.assertEqual(game.game_creator, 'erin')
+        self.assertIn(('private message', ('erin', "You are now the owner of game 'two'")), self.instance.msgqueue)
+
+        self.parse('erin', 'forfeit')
+        self.assertFalse(self.instance.game_exists('two'))
+        self.assertNotIn('erin', self.instance.user_games)
+        self.assertEqual([x for x in self.instance.msgqueue if x[0] == 'destroy room'], [('destroy room', 'two')])
+        del game
+        self.assertEqual(len([x for x in self.instance.msgqueue if x[0] == 'destroy room']), 1)
+
+    def test_unexpected_response(self):
+        with self.assertRaises(GameInvalidOperation):
+            self.game.run_command('accept', self.second, {'command': 'accept'})
+
+
+if __name__ == '__main__':
+    unittest.main()
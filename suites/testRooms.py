@@ -0,0 +1,99 @@
+import unittest
+
+from gamebot.bots.rooms import RoomPool
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RoomPoolTester(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.joins = []
+        self.parts = []
+        self.pool = RoomPool("#coup", self.joins.append, self.parts.append, warm=2, idle_time=60, clock=self.clock)
+        self.pool.start()
+
+    def join_all(self):
+        for room in self.joins:
+            self.pool.joined(room)
+
+    def test_starts_warm(self):
+        self.assertEqual(self.joins, ["##coup_gameroom_1", "##coup_gameroom_2"])
+        self.assertEqual(self.pool.available(), 2)
+
+    def test_grows_past_ten_games(self):
+        self.join_all()
+        rooms = [self.pool.take("game{0}".format(x)) for x in range(15)]
+        self.assertEqual(len(set(rooms)), 15)
+        self.assertEqual(rooms[0], "##coup_gameroom_2")
+        # Taking a room joins the next ones before they are needed
+        self.assertEqual(self.pool.available(), 2)
+        self.assertEqual(len(self.pool), 17)
+        self.assertEqual(self.pool.take("game3"), rooms[3])
+
+    def test_room_being_joined_is_handed_out(self):
+        first = self.pool.take("one")
+        self.assertEqual(first, "##coup_gameroom_1")
+        self.pool.joined(first)
+        self.assertEqual(self.pool.free, type(self.pool.free)())
+        self.assertEqual(self.pool.available(), 2)
+
+    def test_surplus_rooms_are_parted_when_idle(self):
+        self.join_all()
+        for x in range(4):
+            self.pool.take("game{0}".format(x))
+        self.join_all()
+        for x in range(4):
+            self.clock.now += 10
+            self.pool.release("game{0}".format(x))
+        # The two warm rooms have been free since they were joined
+        self.assertEqual(self.pool.next_deadline(), 1000.0 + 60)
+
+        self.pool.maintain(1000.0 + 15 + 60)
+        self.assertEqual(len(self.parts), 3)
+        self.assertEqual(self.pool.available(), 3)
+        self.assertEqual(self.pool.next_deadline(), 1000.0 + 20 + 60)
+        self.pool.maintain(1000.0 + 10000)
+        self.assertEqual(len(self.parts), 4)
+        self.assertIsNone(self.pool.next_deadline())
+
+        # Parted numbers are used again
+        for x in range(3):
+            self.pool.take("again{0}".format(x))
+        self.assertIn(self.joins[-1], self.parts)
+
+    def test_released_before_joined(self):
+        room = self.pool.take("one")
+        self.pool.release("one")
+        self.assertEqual(self.pool.free, type(self.pool.free)())
+        self.pool.joined(room)
+        self.assertEqual([x for x, _ in self.pool.free], [room])
+
+    def test_rooms_match_in_any_case(self):
+        pool = RoomPool("#Coup", self.joins.append, self.parts.append, warm=1, clock=self.clock)
+        pool.start()
+        self.assertEqual(self.joins[-1], "##coup_gameroom_1")
+        pool.joined("##Coup_GameRoom_1")
+        self.assertEqual([x for x, _ in pool.free], ["##coup_gameroom_1"])
+        self.assertEqual(pool.joining, {})
+
+    def test_refused_room_is_not_used_again(self):
+        room = self.pool.take("one")
+        self.assertEqual(self.pool.failed(room.upper()), ("one", "##coup_gameroom_4"))
+        self.assertEqual(self.pool.assigned["one"], "##coup_gameroom_4")
+        self.assertNotIn(room, self.pool.rooms())
+        self.assertIsNone(self.pool.failed("##coup_gameroom_2"))
+        self.assertEqual(self.pool.available(), 2)
+        self.assertNotIn(room, self.joins[2:])
+        self.assertIsNone(self.pool.failed("#elsewhere"))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import socket
+import unittest
+
+from gamebot.bots.irc_simple import irc_connection
+from gamebot.coup.sharding import ShardRouter, shard_for
+
+
+class ShardRouterTester(unittest.TestCase):
+    def setUp(self):
+        self.router = ShardRouter(2, seed=5, bot_think=0.1)
+        self.queue = self.router.instance.msgqueue
+
+    def tearDown(self):
+        self.router.close()
+
+    def parse(self, nick, command):
+        return self.router.parse_input({'nick': nick, 'command': command})
+
+    def pump(self, *expected):
+        """ Receives batches until every expected event has arrived, and returns every event seen """
+        events = []
+        while not all(event in events for event in expected):
+            self.router.receive(5)
+            events.extend(self.queue)
+            self.queue.clear()
+        return events
+
+    def test_routing(self):
+        # Two games that land on different shards
+        names = ['game{0}'.format(x) for x in range(10)]
+        first = names[0]
+        second = next(name for name in names if shard_for(name, 2) != shard_for(first, 2))
+
+        self.assertIsNone(self.parse('alice', 'create {0}'.format(first)))
+        self.assertIsNone(self.parse('carol', 'create {0}'.format(second)))
+        self.pump(('private message', ('alice', "Game '{0}' created".format(first))),
+                  ('private message', ('carol', "Game '{0}' created".format(second))))
+        self.assertEqual(self.parse('dave', 'list'), "\n".join(sorted([first, second])))
+
+        self.assertTrue(self.parse('alice', 'join {0}'.format(second)).startswith("Error:"))
+        self.assertIsNone(self.parse('bob', 'join {0}'.format(first)))
+        self.assertIsNone(self.parse('alice', 'start'))
+        events = self.pump(('private message', ('alice', "Game '{0}' started".format(first))))
+
+        # The reply to a command precedes the game events it caused
+        replies = [x for x in events if x[0] == 'private message' and x[1][0] == 'bob']
+        self.assertEqual(replies[0], ('private message', ('bob', "Joined game '{0}'".format(first))))
+
+        # Commands of users who are not in a game are answered locally
+        self.assertTrue(self.parse('dave', 'do income').startswith("Error:"))
+        self.assertTrue(self.parse('dave', 'help').startswith("Bot for playing Coup"))
+
+        self.assertIsNone(self.parse('bob', 'forfeit'))
+        self.pump(('game message', (first, 'bob has quit')))
+        self.assertNotIn('bob', self.router.user_games)
+        self.assertNotIn(first, self.router.game_names)
+
+    def test_bots_search_in_worker_pool(self):
+        self.assertIsNone(self.parse('alice', 'create one'))
+        self.assertIsNone(self.parse('alice', 'start --bots 1'))
+        self.pump(('private message', ('alice', "Game 'one' started")))
+        # Whoever goes first, the bot moves without alice having to wait for it
+        moved = False
+        while not moved:
+            self.router.receive(5)
+            for kind, payload in list(self.queue):
+                if kind == 'private message' and payload[1].startswith("It is your turn"):
+                    self.assertIsNone(self.parse('alice', 'do income'))
+                elif kind == 'game message' and payload[1].startswith("one.bot1 "):
+                    moved = True
+            self.queue.clear()
+        self.assertTrue(all(process.is_alive() for process in self.router.processes))
+
+    def test_dead_worker(self):
+        names = ['game{0}'.format(x) for x in range(10)]
+        lost = next(name for name in names if shard_for(name, 2) == 0)
+        other = next(name for name in names if shard_for(name, 2) == 1)
+        self.assertIsNone(self.parse('alice', 'create {0}'.format(lost)))
+        self.pump(('private message', ('alice', "Game '{0}' created".format(lost))))
+
+        # The worker exits as if it had failed
+        self.router.connections[0].send(None)
+        self.router.processes[0].join()
+        # The command is sent before the router has noticed
+        self.assertTrue(self.parse('alice', 'start').startswith("Error:"))
+        self.router.receive(0)
+        self.assertEqual(self.router.readers(), self.router.connections[1:])
+        self.assertNotIn('alice', self.router.user_games)
+        self.assertIn(('destroy room', lost), self.queue)
+        self.assertEqual(self.parse('dave', 'list'), "")
+
+        self.assertTrue(self.parse('bob', 'create {0}'.format(lost)).startswith("Error:"))
+        self.assertIsNone(self.parse('bob', 'create {0}'.format(other)))
+        self.pump(('private message', ('bob', "Game '{0}' created".format(other))))
+
+    def test_dead_worker_is_not_watched(self):
+        bot_side, server_side = socket.socketpair()
+        connection = irc_connection(self.router, ["#coup"], "coupbot", event_driven=True, sock=bot_side,
+                                    readers=self.router.readers)
+        try:
+            connection.watch_readers()
+            self.assertEqual(len(connection.watched), 2)
+
+            # The worker exits as if it had failed; its pipe is closed from then on
+            self.router.connections[0].send(None)
+            self.router.processes[0].join()
+            self.router.receive(5)
+            connection.watch_readers()
+            self.assertEqual(connection.watched, set(self.router.connections[1:]))
+            self.assertEqual(len(connection.selector.get_map()), 2)
+        finally:
+            connection.disconnect()
+            server_side.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from gamebot.coup.simulation import Simulation, NullSink, pending_decisions
+
+
+class SimulationTester(unittest.TestCase):
+    def test_setup_through_cli(self):
+        instance, game, agents = Simulation(players=3, seed=7).setup()
+
+        self.assertIsInstance(instance.msgqueue, NullSink)
+        self.assertTrue(game.is_started)
+        self.assertEqual(sorted(agents), sorted(game.players))
+
+        decisions = pending_decisions(game)
+        self.assertEqual(len(decisions), 1)
+        player, options = decisions[0]
+        self.assertEqual(player.name, game.current_player_name())
+        self.assertIn(('do', {'command': 'do', 'do': 'income'}), options)
+
+    def test_games_complete(self):
+        for teams in (False, True):
+            simulation = Simulation(players=4, teams=teams, seed=11)
+            for _ in range(20):
+                result = simulation.play()
+                self.assertEqual(result.outcome, "completed", result.error)
+
+    def test_reproducible(self):
+        first, second = Simulation(seed=3), Simulation(seed=3)
+
+        self.assertEqual([first.play() for _ in range(5)], [second.play() for _ in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
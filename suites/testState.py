@@ -0,0 +1,74 @@
+import unittest
+
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.influence import roles, duke
+from gamebot.coup.state import PackedState, pack_cards, unpack_cards, role_index
+
+
+class PackedStateTester(unittest.TestCase):
+    def setUp(self):
+        instance = Instance(seed=2)
+        cliparser = CoupCLIParser(instance)
+        for nick, command in [('a', 'create one -t'), ('b', 'join one'), ('c', 'join one'), ('a', 'start')]:
+            cliparser.parse_input({'nick': nick, 'command': command})
+        self.game = instance.find_game_by_name('one')
+
+    def test_pack_cards(self):
+        for cards in ([], [0], [5], [3, 1], [2, 2]):
+            self.assertEqual(unpack_cards(pack_cards(cards)), cards)
+        with self.assertRaises(ValueError):
+            pack_cards([0, 1, 2])
+
+    def test_from_game(self):
+        state = PackedState.from_game(self.game)
+        self.assertEqual(state.seats, 3)
+        self.assertEqual(state.current, self.game.seats.current)
+        self.assertEqual(sum(state.deck_count(x) for x in range(len(roles))), len(self.game.court_deck))
+        for seat, name in enumerate(self.game.seats.seats):
+            player = self.game.players[name]
+            self.assertEqual(state.coins(seat), 2)
+            self.assertEqual([roles[x] for x in state.hand(seat)], player.available_influence)
+            self.assertEqual(state.team(seat), player.team)
+
+        self.assertEqual(state, PackedState.from_game(self.game))
+
+    def test_incremental_hash(self):
+        state = PackedState.from_game(self.game)
+        copy = state.clone()
+        copy.set_coins(1, 7)
+        copy.set_hand(0, [role_index[duke]])
+        copy.set_revealed(0, [0])
+        copy.treasury = 3
+        copy.current = 2
+
+        self.assertEqual(state, PackedState.from_game(self.game))
+        self.assertNotEqual(copy, state)
+        self.assertEqual(copy.key, PackedState(bytearray(copy.data)).key)
+
+        copy.set_coins(1, 2)
+        copy.set_hand(0, state.hand(0))
+        copy.set_revealed(0, [])
+        copy.treasury = 0
+        copy.current = state.current
+        self.assertEqual(copy, state)
+        self.assertEqual(len(set([state, copy])), 1)
+
+    def test_apply(self):
+        state = PackedState.from_game(self.game)
+        state.set_coins(0, 9)
+        state.set_hand(2, [])
+        state.set_revealed(2, [0, 1])
+        state.current = 1
+        state.apply(self.game)
+
+        names = self.game.seats.seats
+        self.assertEqual(self.game.players[names[0]].cash(), 9)
+        self.assertTrue(self.game.players[names[2]].dead())
+        self.assertNotIn(names[2], self.game.seats)
+        self.assertEqual(self.game.current_player_name(), names[1])
+        self.assertEqual(PackedState.from_game(self.game), state)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+from argparse import Namespace
+
+from gamebot.coup.cli import CoupCLIParser
+from gamebot.coup.game import Instance
+from gamebot.coup.simulation import Simulation
+from gamebot.coup.stats import StatsStore, game_result
+
+
+class RecordedSimulation(Simulation):
+    def __init__(self, stats, **options):
+        super().__init__(**options)
+        self.stats = stats
+        self.games = []
+
+    def setup(self):
+        instance, game, agents = super().setup()
+        instance.stats = self.stats
+        self.games.append(game)
+        return instance, game, agents
+
+
+class StatsTester(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'stats.db')
+        self.store = StatsStore(self.path, flush_interval=0.01)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_aggregates(self):
+        simulation = RecordedSimulation(self.store, players=3, seed=5)
+        for _ in range(12):
+            self.assertEqual(simulation.play().outcome, "completed")
+        self.store.flush()
+        self.assertEqual(self.store.written, 12)
+
+        expected = dict()
+        for game in simulation.games:
+            for name, won, roles, bluffs, caught in game_result(game)['players']:
+                stats = expected.setdefault(name, {'games': 0, 'wins': 0, 'bluffs': 0, 'bluffs_caught': 0,
+                                                   'role_wins': {}})
+                stats['games'] += 1
+                stats['wins'] += won
+                stats['bluffs'] += bluffs
+                stats['bluffs_caught'] += caught
+                if won:
+                    for role in set(roles):
+                        stats['role_wins'][role] = stats['role_wins'].get(role, 0) + 1
+
+        self.assertTrue(any(stats['bluffs'] for stats in expected.values()))
+        for name, stats in expected.items():
+            stored = self.store.player_stats(name.upper())
+            self.assertEqual(stored.pop('player'), name)
+            self.assertEqual(stored, stats)
+        self.assertEqual(sum(stats['wins'] for stats in expected.values()), 12)
+
+    def test_stats_command(self):
+        instance = Instance(seed=1)
+        instance.stats = self.store
+        cliparser = CoupCLIParser(instance)
+        self.assertEqual(cliparser.parse_input({'nick': 'alice', 'command': 'stats'}), "No finished games for alice")
+
+        game = Namespace(name='one', winner=None, players={})
+        for name in ('alice', 'bob'):
+            game.players[name] = Namespace(name=name, available_influence=[], bluffs=2, bluffs_caught=1)
+        game.winner = game.players['alice']
+        game.winner.available_influence = [Namespace(name='Duke')]
+        self.store.record(game)
+        self.store.flush()
+
+        self.assertEqual(cliparser.parse_input({'nick': 'bob', 'command': 'stats alice'}),
+                         "alice: 1 games, 1 won (100%)\nWins holding: Duke 1\nBluffs: 2, 1 got through (50%)")
+
+    def test_not_kept(self):
+        cliparser = CoupCLIParser(Instance(seed=1))
+        self.assertEqual(cliparser.parse_input({'nick': 'alice', 'command': 'stats'}),
+                         "Error: ('Statistics are not being kept',) ")
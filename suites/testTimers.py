@@ -0,0 +1,52 @@
+import unittest
+
+from gamebot.game.timers import TimerService
+
+
+class TimerServiceTester(unittest.TestCase):
+    def test_fires_in_deadline_order(self):
+        timers = TimerService()
+        fired = []
+
+        timers.schedule('b', 20, lambda: fired.append('b'))
+        timers.schedule('a', 10, lambda: fired.append('a'))
+        timers.schedule('c', 30, lambda: fired.append('c'))
+
+        self.assertEqual(timers.next_deadline(), 10)
+        self.assertEqual(timers.run_due(25), 2)
+        self.assertEqual(fired, ['a', 'b'])
+        self.assertEqual(timers.next_deadline(), 30)
+        self.assertEqual(len(timers), 1)
+
+    def test_cancel_and_reschedule(self):
+        timers = TimerService()
+        fired = []
+
+        timers.schedule('game', 10, lambda: fired.append('first'))
+        timers.schedule('game', 15, lambda: fired.append('second'))
+        self.assertEqual(timers.deadline('game'), 15)
+
+        self.assertEqual(timers.run_due(12), 0)
+        self.assertEqual(timers.next_deadline(), 15)
+
+        timers.cancel('game')
+        self.assertIsNone(timers.next_deadline())
+        self.assertEqual(timers.run_due(100), 0)
+        self.assertEqual(fired, [])
+
+    def test_callback_can_reschedule(self):
+        timers = TimerService()
+        fired = []
+
+        def tick():
+            fired.append(len(fired))
+            if len(fired) < 3:
+                timers.schedule('game', 10 + len(fired), tick)
+
+        timers.schedule('game', 10, tick)
+        timers.run_due(100)
+        self.assertEqual(fired, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()